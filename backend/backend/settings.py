@@ -51,6 +51,7 @@ INSTALLED_APPS = [
     'classDiagram',
     'sequenceDiagram',
     'flowchart',
+    'codeModel',
     'corsheaders',
 ]
 
@@ -165,4 +166,87 @@ GENERATIVE_AI_API_KEY = config('GENERATIVE_AI_API_KEY')
 # to access the stored files:
 MEDIA_URL = '/uploads/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'uploads')
-MEDIA_LOGO = os.path.join(BASE_DIR, 'media', 'logo.png')
\ No newline at end of file
+MEDIA_LOGO = os.path.join(BASE_DIR, 'media', 'logo.png')
+
+# upload limits (archives and manifest uploads):
+UPLOAD_MAX_FILES = int(os.environ.get('UPLOAD_MAX_FILES', 20000))  # source files in one upload
+UPLOAD_MAX_FILE_BYTES = int(os.environ.get('UPLOAD_MAX_FILE_BYTES', 5 * 1024 * 1024))  # uncompressed size of one source file
+UPLOAD_MAX_TOTAL_BYTES = int(os.environ.get('UPLOAD_MAX_TOTAL_BYTES', 500 * 1024 * 1024))  # uncompressed size of all source files
+UPLOAD_BULK_BATCH_SIZE = int(os.environ.get('UPLOAD_BULK_BATCH_SIZE', 500))  # FileEntry rows per INSERT
+UPLOAD_IN_MEMORY_MAX_BYTES = int(os.environ.get('UPLOAD_IN_MEMORY_MAX_BYTES', 256 * 1024))  # smaller uploads skip the disk, 0 disables
+DATA_UPLOAD_MAX_NUMBER_FILES = UPLOAD_MAX_FILES  # Django refuses more than 100 files per request by default
+BLOB_DIR = os.environ.get('BLOB_DIR', os.path.join(BASE_DIR, 'blobs'))  # uploaded sources by sha256, shared by all uploads
+
+# where uploads, blobs and generated documents are stored:
+# 'local' keeps them in MEDIA_ROOT and BLOB_DIR, 's3' in an S3-compatible bucket (AWS, MinIO, ...) through django-storages and boto3
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'local')
+WORKSPACE_SCRATCH_DIR = os.environ.get('WORKSPACE_SCRATCH_DIR', os.path.join(BASE_DIR, 'cache', 'workspaces'))  # local copies of remote uploads while their jobs run
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},  # MEDIA_ROOT
+    'blobs': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+        'OPTIONS': {'location': BLOB_DIR, 'file_permissions_mode': 0o444},  # blobs are shared and never edited in place
+    },
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+if STORAGE_BACKEND == 's3':
+    S3_OPTIONS = {
+        'bucket_name': os.environ.get('STORAGE_BUCKET', 'devcanvas'),
+        'endpoint_url': os.environ.get('STORAGE_ENDPOINT_URL'),  # e.g. http://localhost:9000 for MinIO, unset for AWS
+        'access_key': os.environ.get('STORAGE_ACCESS_KEY'),
+        'secret_key': os.environ.get('STORAGE_SECRET_KEY'),
+        'region_name': os.environ.get('STORAGE_REGION'),
+        'file_overwrite': False,  # same renaming on name clashes as the local storage
+    }
+    STORAGES['default'] = {'BACKEND': 'storages.backends.s3.S3Storage', 'OPTIONS': {**S3_OPTIONS, 'location': 'uploads'}}
+    STORAGES['blobs'] = {'BACKEND': 'storages.backends.s3.S3Storage', 'OPTIONS': {**S3_OPTIONS, 'location': 'blobs'}}
+
+# background generation jobs:
+GENERATION_WORKERS = int(os.environ.get('GENERATION_WORKERS', 2))  # Concurrent generator runs per server process
+BATCH_MAX_DOC_IDS = int(os.environ.get('BATCH_MAX_DOC_IDS', 200))  # uploads one batch request may (re)generate
+BUNDLE_WORKERS = int(os.environ.get('BUNDLE_WORKERS', 4))  # generators of one bundle running at the same time
+BUNDLE_FORMAT = os.environ.get('BUNDLE_FORMAT', 'pdf')  # 'pdf': one merged PDF, 'zip': the separate documents in one archive
+RESULT_CACHE_DIR = os.environ.get('RESULT_CACHE_DIR', os.path.join(BASE_DIR, 'cache', 'results'))  # generated documents by source tree hash, empty disables
+RESULT_CACHE_MAX_BYTES = int(os.environ.get('RESULT_CACHE_MAX_BYTES', 1024 * 1024 * 1024))  # least recently used documents are evicted past this
+
+# history listing, served from the artifact catalog:
+HISTORY_PAGE_SIZE = int(os.environ.get('HISTORY_PAGE_SIZE', 50))  # documents per page unless the client asks for fewer or more
+HISTORY_MAX_PAGE_SIZE = int(os.environ.get('HISTORY_MAX_PAGE_SIZE', 200))
+
+# speculative pre-generation of an upload's other doc types while workers are idle:
+SPECULATION_DOC_TYPES = os.environ.get('SPECULATION_DOC_TYPES', 'class diagram,sequence diagram,flowchart').split(',')  # summaries are left out, they call the paid LLM API
+SPECULATION_BUDGET_SECONDS = int(os.environ.get('SPECULATION_BUDGET_SECONDS', 600))  # speculative run time per author per 24 hours, 0 disables
+SPECULATION_NICE = int(os.environ.get('SPECULATION_NICE', 19))  # CPU priority of the speculation thread and the renderers it starts
+
+# retention of uploads and generated documents:
+AUTHOR_QUOTA_BYTES = int(os.environ.get('AUTHOR_QUOTA_BYTES', 2 * 1024 * 1024 * 1024))  # uploads in flight plus results per author, 0 disables
+RESULT_MAX_AGE_DAYS = int(os.environ.get('RESULT_MAX_AGE_DAYS', 30))  # results unused for longer are deleted, 0 keeps them
+BLOB_MAX_AGE_DAYS = int(os.environ.get('BLOB_MAX_AGE_DAYS', 30))  # blobs of delta uploads no author sent or reused for longer are deleted, 0 keeps them
+WORKSPACE_MAX_AGE_HOURS = int(os.environ.get('WORKSPACE_MAX_AGE_HOURS', 24))  # workspaces left behind by jobs that never finished
+RETENTION_INTERVAL_SECONDS = int(os.environ.get('RETENTION_INTERVAL_SECONDS', 300))  # background collection period, 0 disables
+
+# per-file parse cache, keyed by file content hash:
+PARSE_CACHE_DIR = os.environ.get('PARSE_CACHE_DIR', os.path.join(BASE_DIR, 'cache', 'parse'))  # empty disables the cache
+PARSE_CACHE_MAX_BYTES = int(os.environ.get('PARSE_CACHE_MAX_BYTES', 256 * 1024 * 1024))  # least recently used entries are evicted past this
+
+# shared analysis worker pool:
+ANALYSIS_POOL_SIZE = int(os.environ.get('ANALYSIS_POOL_SIZE', 0))  # 0 uses one worker per core
+ANALYSIS_POOL_CHUNKSIZE = int(os.environ.get('ANALYSIS_POOL_CHUNKSIZE', 0))  # 0 sizes chunks from the number of files
+ANALYSIS_POOL_MAX_TASKS_PER_CHILD = int(os.environ.get('ANALYSIS_POOL_MAX_TASKS_PER_CHILD', 0))  # 0 keeps workers for the life of the server
+ANALYSIS_POOL_START_METHOD = os.environ.get('ANALYSIS_POOL_START_METHOD', 'forkserver' if os.name == 'posix' else 'spawn')
+ANALYSIS_FILE_TIMEOUT = float(os.environ.get('ANALYSIS_FILE_TIMEOUT', 20))  # seconds per file before it is skipped, 0 leaves only the pool watchdog's 300s limit
+ANALYSIS_MAX_FILE_BYTES = int(os.environ.get('ANALYSIS_MAX_FILE_BYTES', 2 * 1024 * 1024))  # larger files are skipped, 0 disables
+ANALYSIS_WORKER_MEMORY_MB = int(os.environ.get('ANALYSIS_WORKER_MEMORY_MB', 1024))  # address space limit per worker, 0 disables
+
+# class diagrams:
+CLASS_DIAGRAM_NODE_BUDGET = int(os.environ.get('CLASS_DIAGRAM_NODE_BUDGET', 60))  # most classes (or overview packages) laid out in one Graphviz call
+CLASS_DIAGRAM_RENDER_WORKERS = int(os.environ.get('CLASS_DIAGRAM_RENDER_WORKERS', 4))  # partitions rendered at the same time
+CLASS_DIAGRAM_MODE = os.environ.get('CLASS_DIAGRAM_MODE', 'partitioned')  # 'partitioned': overview, core and every partition, 'core': the core classes only
+CLASS_DIAGRAM_CORE_SIZE = int(os.environ.get('CLASS_DIAGRAM_CORE_SIZE', 25))  # most central classes drawn on the core page, the rest folded per package
+CLASS_DIAGRAM_EXTERNAL_TYPES = os.environ.get('CLASS_DIAGRAM_EXTERNAL_TYPES', 'collapse')  # base classes and interfaces outside the upload: 'collapse' into one node or 'drop'
+
+# Graphviz rendering of class diagrams and flowcharts:
+GRAPHVIZ_RENDER_SECONDS = float(os.environ.get('GRAPHVIZ_RENDER_SECONDS', 60))  # wall-clock budget of one diagram, fallback layouts included; then it becomes a table
+GRAPHVIZ_DOT_MAX_NODES = int(os.environ.get('GRAPHVIZ_DOT_MAX_NODES', 150))  # bigger graphs get a force-directed layout instead of dot
+GRAPHVIZ_DOT_MAX_DENSITY = float(os.environ.get('GRAPHVIZ_DOT_MAX_DENSITY', 4.0))  # edges per node beyond which dot's crossing minimization gets too slow
+GRAPHVIZ_NEATO_MAX_NODES = int(os.environ.get('GRAPHVIZ_NEATO_MAX_NODES', 500))  # bigger graphs use sfdp, the multiscale layout
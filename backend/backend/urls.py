@@ -18,6 +18,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from uploadMate.views import serve_artifact
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -27,6 +28,8 @@ urlpatterns = [
     path('classdiagram/', include('classDiagram.urls')),
     path('sequencediagram/', include('sequenceDiagram.urls')),
     path('flowcharts/', include('flowchart.urls')),
+    # Generated documents, with cache headers; ahead of the development media route
+    path(f"{settings.MEDIA_URL.lstrip('/')}<str:author>/results/<str:file_name>", serve_artifact, name='artifact'),
 ]
 
 # Serve media files during development
@@ -0,0 +1,215 @@
+import os
+import logging
+from collections import Counter, defaultdict, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+import pydot
+from django.conf import settings
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# A relationship drawn between two classes; kind is IS_A (base classes, interfaces) or HAS_A (compositions)
+Relation = namedtuple('Relation', ['source', 'target', 'kind', 'attributes'])
+IS_A = 'is-a'
+HAS_A = 'has-a'
+# Stands for every type outside the upload that classes extend or implement
+EXTERNAL_NODE = 'external_types'
+
+ROOT_PACKAGE = '(root)'
+OTHER_PACKAGES = '(other packages)'
+# Package names shown in a partition title before the rest are counted
+TITLE_PACKAGES = 3
+
+
+def package_of(file_path: str, directory: str) -> str:
+    """Package of the classes declared in a file: its folder inside the upload, dotted."""
+    folder = os.path.dirname(os.path.relpath(file_path, directory))
+    return folder.replace(os.sep, '.') if folder else ROOT_PACKAGE
+
+
+def new_diagram() -> pydot.Dot:
+    graph = pydot.Dot(graph_type='digraph')
+    graph.set_rankdir('TB')
+    graph.set_size('8.5,11')  # Set size to letter paper dimensions
+    return graph
+
+
+def connected_components(names: List[str], relations: List[Relation]) -> List[List[str]]:
+    """Connected groups of `names`, each in breadth-first order so neighbours stay close together."""
+    members = set(names)
+    neighbours = defaultdict(set)
+    for source, target, _, _ in relations:
+        if source in members and target in members and source != target:
+            neighbours[source].add(target)
+            neighbours[target].add(source)
+
+    seen = set()
+    components = []
+    for name in names:
+        if name in seen:
+            continue
+        seen.add(name)
+        component, pending = [], deque([name])
+        while pending:
+            current = pending.popleft()
+            component.append(current)
+            for neighbour in sorted(neighbours[current] - seen):
+                seen.add(neighbour)
+                pending.append(neighbour)
+        components.append(component)
+    return components
+
+
+def partition_title(packages: List[str]) -> str:
+    title = ', '.join(packages[:TITLE_PACKAGES])
+    if len(packages) > TITLE_PACKAGES:
+        title += f" and {len(packages) - TITLE_PACKAGES} more packages"
+    return title
+
+
+def partition_classes(classes: dict, relations: List[Relation], budget: int) -> List[Tuple[str, List[str]]]:
+    """
+    Split the classes into (title, class names) partitions of at most `budget` classes each.
+    Every package is a partition; a package too big for one layout is split by connected
+    component, and a component still too big is cut into runs of its breadth-first order.
+    Small components and small packages are packed together up to the budget, so the
+    document does not get a page per class.
+    """
+    by_package = defaultdict(list)
+    for class_name, class_info in classes.items():
+        by_package[class_info.package].append(class_name)
+
+    pieces = []
+    for package in sorted(by_package):
+        names = sorted(by_package[package])
+        if len(names) <= budget:
+            pieces.append((package, names))
+            continue
+        runs = []
+        for component in connected_components(names, relations):
+            for start in range(0, len(component), budget):
+                run = component[start:start + budget]
+                if runs and len(runs[-1]) + len(run) <= budget:
+                    runs[-1].extend(run)  # small components of the package share a page
+                else:
+                    runs.append(run)
+        pieces.extend((f"{package} (part {number})", run) for number, run in enumerate(runs, start=1))
+
+    partitions = []  # [packages, class names]
+    for package, names in pieces:
+        if partitions and len(partitions[-1][1]) + len(names) <= budget:
+            if partitions[-1][0][-1] != package:
+                partitions[-1][0].append(package)
+            partitions[-1][1].extend(names)
+        else:
+            partitions.append([[package], list(names)])
+    return [(partition_title(packages), names) for packages, names in partitions]
+
+
+def partition_graph(names: List[str], classes: dict, relations: List[Relation],
+                    class_node: Callable[[str, object], pydot.Node]) -> pydot.Dot:
+    """
+    The class diagram of one partition; relationships leaving it are left to the overview,
+    those with types outside the upload share one external node.
+    """
+    graph = new_diagram()
+    members = set(names)
+    for class_name in names:
+        graph.add_node(class_node(class_name, classes[class_name]))
+    external = False
+    for source, target, _, attributes in relations:
+        if source in members and target in members:
+            graph.add_edge(pydot.Edge(source, target, **attributes))
+        elif source == EXTERNAL_NODE and target in members:
+            external = True
+            graph.add_edge(pydot.Edge(source, target, **attributes))
+    if external:
+        graph.add_node(pydot.Node(EXTERNAL_NODE, label='external types', shape='box', style='dashed'))
+    return graph
+
+
+def overview_groups(packages: Dict[str, int], budget: int) -> Dict[str, str]:
+    """
+    Map every package (with its class count) to the node it is drawn as: the package itself,
+    or its parent packages cut to the deepest level that keeps the drawing within the budget.
+    When that level uses under a quarter of the budget (many sibling packages), the biggest
+    groups of the level below are kept instead and the rest share one OTHER_PACKAGES node.
+    """
+    paths = {package: package.split('.') for package in packages if package != ROOT_PACKAGE}
+    common = len(os.path.commonprefix(list(paths.values()))) if paths else 0
+    depth = max((len(path) for path in paths.values()), default=0)
+    finer = None
+    while True:
+        groups = {package: '.'.join(path[:depth]) or ROOT_PACKAGE for package, path in paths.items()}
+        if ROOT_PACKAGE in packages:
+            groups[ROOT_PACKAGE] = ROOT_PACKAGE
+        if len(set(groups.values())) <= budget or depth <= common:
+            break
+        finer = groups
+        depth -= 1
+
+    if finer is None or len(set(groups.values())) * 4 >= budget:
+        return groups
+    sizes = Counter()
+    for package, group in finer.items():
+        sizes[group] += packages[package]
+    kept = {group for group, _ in sizes.most_common(max(budget - 1, 1))}
+    return {package: group if group in kept else OTHER_PACKAGES for package, group in finer.items()}
+
+
+def package_overview(classes: dict, relations: List[Relation], budget: int) -> pydot.Dot:
+    """One node per package with its class count, one edge per pair of related packages with the relationship count."""
+    groups = overview_groups(Counter(class_info.package for class_info in classes.values()), budget)
+    class_group = {class_name: groups[class_info.package] for class_name, class_info in classes.items()}
+    counts = Counter(class_group.values())
+    node_ids = {group: f"package_{index}" for index, group in enumerate(sorted(counts))}
+
+    graph = new_diagram()
+    for group, node_id in node_ids.items():
+        graph.add_node(pydot.Node(node_id, label=f"{group}\\n{counts[group]} classes", shape='folder'))
+
+    links = defaultdict(int)
+    for source, target, _, _ in relations:
+        if source in class_group and target in class_group and class_group[source] != class_group[target]:
+            links[(class_group[source], class_group[target])] += 1
+    for (source, target), count in sorted(links.items()):
+        graph.add_edge(pydot.Edge(node_ids[source], node_ids[target], label=str(count)))
+    return graph
+
+
+def partitioned_diagrams(classes: dict, relations: List[Relation],
+                         class_node: Callable[[str, object], pydot.Node]) -> List[Tuple[str, pydot.Dot]]:
+    """The package overview followed by one diagram per partition, none over CLASS_DIAGRAM_NODE_BUDGET nodes."""
+    budget = max(settings.CLASS_DIAGRAM_NODE_BUDGET, 1)
+    diagrams = [('Package Overview', package_overview(classes, relations, budget))]
+    if any(relation.source == EXTERNAL_NODE for relation in relations):
+        budget = max(budget - 1, 1)  # room for the external node on every page
+    partitions = partition_classes(classes, relations, budget)
+    for title, names in partitions:
+        diagrams.append((title, partition_graph(names, classes, relations, class_node)))
+    logging.info(f"Split {len(classes)} classes into {len(partitions)} class diagrams of at most {budget} classes")
+    return diagrams
+
+
+def render_diagrams(diagrams: List[Tuple[str, pydot.Dot]], file_name: str,
+                    write_svg: Callable[[pydot.Dot, str], dict]) -> dict:
+    """
+    Render every diagram in its own Graphviz process, CLASS_DIAGRAM_RENDER_WORKERS at a time.
+    Returns {'diagrams': [{'title', 'svg_path' or 'table'}, ...]} in order, or the first error.
+    """
+    def render(numbered):
+        index, (title, graph) = numbered
+        return write_svg(graph, f"{file_name}-{index}")
+
+    with ThreadPoolExecutor(max_workers=max(settings.CLASS_DIAGRAM_RENDER_WORKERS, 1),
+                            thread_name_prefix='class-diagram') as pool:
+        results = list(pool.map(render, enumerate(diagrams)))
+
+    failed = next((result for result in results if result.get('error')), None)
+    if failed:
+        for result in results:
+            if 'svg_path' in result:
+                os.remove(result['svg_path'])
+        return failed
+    return {'diagrams': [{'title': title, **result} for (title, _), result in zip(diagrams, results)]}
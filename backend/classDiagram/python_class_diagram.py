@@ -1,9 +1,8 @@
-import ast
 import pydot
 import os
 import sys
 import logging
-import multiprocessing
+import tempfile
 from typing import Dict, List, Tuple
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -13,6 +12,12 @@ from reportlab.lib import colors
 from datetime import datetime
 from reportlab.lib.utils import ImageReader
 from django.conf import settings
+from codeModel.builder import get_codebase_model
+from codeModel.sources import resolve_workspace
+from .partitioning import HAS_A, IS_A, ROOT_PACKAGE, Relation, package_of, partitioned_diagrams, render_diagrams
+from .ranking import core_diagram
+from .rendering import graph_table, render_graph, svg_drawing
+from .simplify import simplify_relations
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -25,134 +30,103 @@ class ClassInfo:
         self.attributes: List[str] = []
         self.base_classes: List[str] = []
         self.compositions: List[Tuple[str, str]] = []  # (attribute_name, class_name)
+        self.package: str = ROOT_PACKAGE  # folder of the module declaring it
 
     def __str__(self):
         return f"ClassInfo(name={self.name}, methods={self.methods}, attributes={self.attributes}, base_classes={self.base_classes}, compositions={self.compositions})"
     
 class PythonDiagramGenerator:
-    def __init__(self, directory, author, doc_id):
-        self.directory = f"{settings.MEDIA_ROOT}/{author}/{directory}"
+    def __init__(self, directory, author, doc_id, workspace=None):
+        self.directory, self.sources = resolve_workspace(workspace, author, directory)  # upload folder, or the in-memory files of a small upload
         self.author = author
         self.doc_id = doc_id
+        self.diagnostics = []  # files skipped during analysis
         self.dir_name = directory
 
-    def analyze_file(self, file_path):
-        classes = {}
-        # uploaded_file_path = self.file_path
-        with open(file_path, 'r') as file:
-            try:
-                tree = ast.parse(file.read(), filename=file_path)
-            except SyntaxError as e:
-                logging.error(f"Syntax error in {file_path}: {e}")
-                return {'error':f'syntax error in {file_path}: {e}'}
+    def class_info_from_record(self, record) -> ClassInfo:
+        class_info = ClassInfo(record.name)
+        class_info.methods = [method.name for method in record.methods]
+        class_info.attributes = list(record.attributes)
+        class_info.base_classes = list(record.bases)
+        class_info.compositions = list(record.compositions)
+        return class_info
 
-            for node in ast.walk(tree):
-                if isinstance(node, ast.ClassDef):
-                    class_name = node.name
-                    class_info = ClassInfo(class_name)
-                    
-                    for item in node.body:
-                        if isinstance(item, ast.FunctionDef):
-                            class_info.methods.append(item.name)
-                        elif isinstance(item, ast.Assign):
-                            for target in item.targets:
-                                if isinstance(target, ast.Name):
-                                    class_info.attributes.append(target.id)
-                    
-                    # Handle base classes
-                    class_info.base_classes = [
-                        base.id if isinstance(base, ast.Name) else ast.unparse(base) 
-                        for base in node.bases
-                    ]
-                    
-                    # Detect composition relationships
-                    for item in node.body:
-                        if isinstance(item, ast.Assign):
-                            for target in item.targets:
-                                if isinstance(target, ast.Name) and isinstance(item.value, ast.Call):
-                                    if isinstance(item.value.func, ast.Name):
-                                        class_info.compositions.append((target.id, item.value.func.id))
-                    
-                    classes[class_name] = class_info
-
-        return classes
-    
-    def list_python_files(self) -> List[str]:
-        python_files = []
-        logging.info(f"Checking files in directory: {self.directory}")
-        for root, _, files in os.walk(self.directory):
-            for file in files:
-                full_path = os.path.join(root, file)
-                logging.info(f"Found file: {full_path}")
-                if file.endswith('.py'):
-                    python_files.append(full_path)
-                    logging.info(f"Identified Python file: {full_path}")
-        return python_files
-
-    def analyze_directory(self) -> Dict[str, ClassInfo]:
+    def analyze_directory(self, model=None) -> Dict[str, ClassInfo]:
         all_classes = {}
-        file_paths = self.list_python_files()
+        if model is None:
+            model = get_codebase_model(self.sources, 'python')
+        self.diagnostics = model.diagnostics()
         
-        if not file_paths:
+        if not model.files:
             logging.error(f"No Python files found in directory: {self.directory}")
             return all_classes
 
-        with multiprocessing.Pool() as pool:
-            results = pool.map(self.analyze_file, file_paths)
-            for result in results:
-                all_classes.update(result)
+        for file_model in model.parsed_files():
+            package = package_of(file_model.path, model.directory)
+            for record in file_model.classes:
+                class_info = self.class_info_from_record(record)
+                class_info.package = package
+                all_classes[record.name] = class_info
         
         if not all_classes:
-            logging.error(f"No classes found in any of the {len(file_paths)} Python files analyzed.")
+            logging.error(f"No classes found in any of the {len(model.files)} Python files analyzed.")
         else:
-            logging.info(f"Found {len(all_classes)} classes in {len(file_paths)} Python files.")
+            logging.info(f"Found {len(all_classes)} classes in {len(model.files)} Python files.")
         
         return all_classes
     
-    def generate_class_diagram(self, classes):
-        graph = pydot.Dot(graph_type='digraph')
-        graph.set_rankdir('TB')
-        graph.set_size('8.5,11')  # Set size to letter paper dimensions
-        graph.set_dpi('300')  # Increase DPI for better quality
-
-        if not classes:
-            logging.warning("No classes found to generate diagram.")
-            return graph
+    def class_node(self, class_name, class_info):
+        label = f'{{{class_name}|'
+        if class_info.attributes:
+            label += '\\n'.join(class_info.attributes) + '|'
+        label += '\\n'.join(class_info.methods) + '}'
+        return pydot.Node(class_name, label=label, shape='record')
 
+    def class_relations(self, classes):
+        # Every relationship as parsed; simplify_relations deals with types outside the upload
+        relations = []
         for class_name, class_info in classes.items():
-            label = f'{{{class_name}|'
-            if class_info.attributes:
-                label += '\\n'.join(class_info.attributes) + '|'
-            label += '\\n'.join(class_info.methods) + '}'
-            
-            node = pydot.Node(class_name, label=label, shape='record')
-            graph.add_node(node)
-
             for base_class in class_info.base_classes:
-                if base_class in classes:
-                    edge = pydot.Edge(base_class, class_name, label='inherits')
-                    graph.add_edge(edge)
+                relations.append(Relation(base_class, class_name, IS_A, {'label': 'inherits'}))
 
             for attr, comp_class in class_info.compositions:
-                if comp_class in classes:
-                    edge = pydot.Edge(class_name, comp_class, label=f'has {attr}', style='dashed')
-                    graph.add_edge(edge)
+                relations.append(Relation(class_name, comp_class, HAS_A, {'label': f'has {attr}', 'style': 'dashed'}))
+        return relations
 
-        # uploaded_file_name = os.path.splitext(os.path.basename(self.file_path))[0]
+    def generate_class_diagram(self, classes):
+        if not classes:
+            logging.warning("No classes found to generate diagram.")
+            return {'error': 'No classes found to generate diagram'}
+
+        relations = simplify_relations(classes, self.class_relations(classes))
+        if settings.CLASS_DIAGRAM_MODE == 'core':
+            # Only the most central classes, the rest folded per package
+            diagrams = [core_diagram(classes, relations, self.class_node)]
+        else:
+            # A package overview plus one page per partition, so no layout grows with the codebase
+            diagrams = partitioned_diagrams(classes, relations, self.class_node)
+            if len(classes) > settings.CLASS_DIAGRAM_CORE_SIZE:
+                diagrams.insert(1, core_diagram(classes, relations, self.class_node))
         file_name = f"class_diagram_{self.dir_name}"
-        result = self.safe_write_png(graph, file_name)
-        return result
+        return render_diagrams(diagrams, file_name, self.safe_write_svg)
     
-    def safe_write_png(self, graph, filename):
-        output_path = os.path.join(settings.MEDIA_URL, filename)
+    def safe_write_svg(self, graph, filename):
+        # The SVG only feeds the PDF, so it goes to a private temp file that process_file removes
+        fd, output_path = tempfile.mkstemp(prefix=f"{filename}-", suffix='.svg')
+        os.close(fd)
         try:
-            graph.write_png(output_path)
-            logging.info(f"Generated: {output_path}")
-            return {'img_path':output_path}
+            engine = render_graph(graph, output_path, 'svg')
         except Exception as e:
+            os.remove(output_path)
             logging.error(f"Error writing {filename}: {str(e)}")
-            logging.error(f"Make sure you have write permissions in {settings.MEDIA_URL}")
             return {'error':f'Error writing {filename}: {str(e)}'}
+        if engine is None:
+            # No layout finished within the render budget, the PDF lists the relationships instead
+            os.remove(output_path)
+            logging.warning(f"Showing {filename} as a table")
+            return {'table': graph_table(graph)}
+        logging.info(f"Generated: {output_path}")
+        return {'svg_path':output_path}
         
     def create_header_footer(self, canvas, doc):
         """Create a minimalist header and footer with separating lines"""
@@ -216,7 +190,7 @@ class PythonDiagramGenerator:
         
         canvas.restoreState()
 
-    def generate_pdf(self, diagram_path: str, output_path: str, classes: Dict[str, ClassInfo]):
+    def generate_pdf(self, diagrams: List[dict], output_path: str, classes: Dict[str, ClassInfo]):
         try:
             """Generate a comprehensive PDF report with class diagram and detailed analysis."""
             doc = SimpleDocTemplate(
@@ -274,23 +248,53 @@ class PythonDiagramGenerator:
             story.append(Spacer(1, 20))
             
             # Class Diagram Section
-            story.append(Paragraph("Class Diagram", styles['CustomHeading2']))
-            diagram_intro = Paragraph(
-                "The following UML class diagram illustrates the relationships between classes "
-                "in the codebase using standard UML notation.",
-                styles['CustomBody']
-            )
+            story.append(Paragraph("Class Diagrams", styles['CustomHeading2']))
+            if settings.CLASS_DIAGRAM_MODE == 'core':
+                diagram_intro = Paragraph(
+                    "The following diagram shows the most central classes of the codebase, ranked by "
+                    "PageRank over their inheritance and composition relationships. The remaining "
+                    "classes are folded into one node per package, labelled with their count.",
+                    styles['CustomBody']
+                )
+            else:
+                diagram_intro = Paragraph(
+                    "The first diagram gives an overview of the packages and how many relationships "
+                    "run between them, followed by the most central classes of large codebases. Each "
+                    "following page shows the classes of one part of the codebase (a package, or a "
+                    "connected group of classes of a large package) in standard UML notation.",
+                    styles['CustomBody']
+                )
             story.append(diagram_intro)
             story.append(Spacer(1, 10))
             
-            # Add diagram with KeepTogether to prevent awkward breaks
-            diagram_elements = [
-                Image(diagram_path, width=7*inch, height=7*inch),
-                Spacer(1, 10),
-                Paragraph("Figure 1: UML Class Diagram", styles['CustomBody'])
-            ]
-            story.append(KeepTogether(diagram_elements))
-            story.append(PageBreak())
+            # One page per diagram, each kept together to prevent awkward breaks
+            for number, diagram in enumerate(diagrams, start=1):
+                if 'table' in diagram:
+                    # Too big to lay out within the render budget: its relationships as a table, which may span pages
+                    story.append(Paragraph(
+                        f"Figure {number}: {diagram['title']} (listed as a table, its layout took too long)",
+                        styles['CustomBody']
+                    ))
+                    table = Table([["From", "Relationship", "To"]] + diagram['table'],
+                                  colWidths=[2.3*inch, 2.4*inch, 2.3*inch], repeatRows=1)
+                    table.setStyle(TableStyle([
+                        ('GRID', (0, 0), (-1, -1), 1, colors.Color(0.8, 0.8, 0.8)),
+                        ('BACKGROUND', (0, 0), (-1, 0), colors.Color(0.95, 0.95, 0.95)),
+                        ('TEXTCOLOR', (0, 0), (-1, -1), colors.Color(0.3, 0.3, 0.3)),
+                        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                        ('FONTSIZE', (0, 0), (-1, -1), 9),
+                        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+                    ]))
+                    story.append(table)
+                    story.append(PageBreak())
+                    continue
+                diagram_elements = [
+                    svg_drawing(diagram['svg_path'], 7*inch, 7*inch),  # vector, not a raster
+                    Spacer(1, 10),
+                    Paragraph(f"Figure {number}: {diagram['title']}", styles['CustomBody'])
+                ]
+                story.append(KeepTogether(diagram_elements))
+                story.append(PageBreak())
             
             # Detailed Class Analysis
             story.append(Paragraph("Detailed Class Analysis", styles['CustomHeading2']))
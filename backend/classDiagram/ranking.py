@@ -0,0 +1,88 @@
+import logging
+from collections import Counter, defaultdict
+from typing import Callable, List, Tuple
+import pydot
+from django.conf import settings
+from .partitioning import Relation, new_diagram, overview_groups
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+PAGERANK_DAMPING = 0.85
+PAGERANK_ITERATIONS = 50
+PAGERANK_TOLERANCE = 1e-6
+
+
+def rank_classes(classes: dict, relations: List[Relation]) -> List[str]:
+    """
+    Class names by PageRank over the inheritance/composition graph, most central first.
+    Relationships are drawn base -> subclass while the dependency runs the other way,
+    so every relationship links its two classes in both directions.
+    """
+    names = sorted(classes)
+    if not names:
+        return []
+    neighbours = {name: [] for name in names}
+    for source, target, _, _ in relations:
+        if source in neighbours and target in neighbours and source != target:
+            neighbours[source].append(target)
+            neighbours[target].append(source)
+
+    count = len(names)
+    rank = dict.fromkeys(names, 1 / count)
+    for _ in range(PAGERANK_ITERATIONS):
+        # Classes without relationships spread their rank evenly
+        dangling = sum(rank[name] for name in names if not neighbours[name])
+        updated = dict.fromkeys(names, (1 - PAGERANK_DAMPING + PAGERANK_DAMPING * dangling) / count)
+        for name in names:
+            if neighbours[name]:
+                share = PAGERANK_DAMPING * rank[name] / len(neighbours[name])
+                for neighbour in neighbours[name]:
+                    updated[neighbour] += share
+        change = sum(abs(updated[name] - rank[name]) for name in names)
+        rank = updated
+        if change < PAGERANK_TOLERANCE:
+            break
+    return sorted(names, key=lambda name: (-rank[name], name))
+
+
+def core_diagram(classes: dict, relations: List[Relation],
+                 class_node: Callable[[str, object], pydot.Node]) -> Tuple[str, pydot.Dot]:
+    """
+    One diagram of the CLASS_DIAGRAM_CORE_SIZE most central classes. Every other class is
+    folded into a node per package with its count, so the layout stays within
+    CLASS_DIAGRAM_NODE_BUDGET nodes however big the codebase is.
+    """
+    budget = max(settings.CLASS_DIAGRAM_NODE_BUDGET, 1)
+    ranked = rank_classes(classes, relations)
+    size = min(settings.CLASS_DIAGRAM_CORE_SIZE, budget)
+    if len(ranked) > size:
+        size = max(min(size, budget - 1), 1)  # room for at least one folded package
+    core, rest = ranked[:size], ranked[size:]
+    members = set(core)
+
+    groups = overview_groups(Counter(classes[name].package for name in rest), max(budget - size, 1))
+    folded = {name: groups[classes[name].package] for name in rest}
+    counts = Counter(folded.values())
+    node_ids = {group: f"folded_{index}" for index, group in enumerate(sorted(counts))}
+
+    graph = new_diagram()
+    for class_name in core:
+        graph.add_node(class_node(class_name, classes[class_name]))
+    for group, node_id in node_ids.items():
+        graph.add_node(pydot.Node(node_id, label=f"{group}\\n+{counts[group]} classes", shape='folder', style='dashed'))
+
+    # Relationships with folded classes become one counted edge per core class and package
+    links = defaultdict(int)
+    for source, target, _, attributes in relations:
+        if source in members and target in members:
+            graph.add_edge(pydot.Edge(source, target, **attributes))
+        elif source in members and target in folded:
+            links[(source, node_ids[folded[target]])] += 1
+        elif target in members and source in folded:
+            links[(node_ids[folded[source]], target)] += 1
+    for (source, target), count in sorted(links.items()):
+        graph.add_edge(pydot.Edge(source, target, label=str(count), style='dotted'))
+
+    logging.info(f"Core class diagram: {len(core)} of {len(classes)} classes, {len(node_ids)} folded packages")
+    return f"Core Classes (top {len(core)} of {len(classes)})", graph
@@ -0,0 +1,136 @@
+import os
+import time
+import logging
+import subprocess
+from typing import List, Optional, Tuple
+import pydot
+from django.conf import settings
+from reportlab.graphics.shapes import Drawing
+from svglib.svglib import svg2rlg
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Cheaper layout tried when an engine runs out of time or fails
+FALLBACK_ENGINE = {'dot': 'sfdp', 'neato': 'sfdp'}
+# Share of the remaining budget the first engine may use when a fallback is still to come
+FIRST_ATTEMPT_SHARE = 0.75
+
+
+def layout_options(engine: str, nodes: int) -> List[str]:
+    if engine == 'dot' and nodes > settings.GRAPHVIZ_DOT_MAX_NODES // 2:
+        # Fewer crossing minimization and network simplex passes on big hierarchies
+        return ['-Gmclimit=0.3', '-Gnslimit=2', '-Gnslimit1=2']
+    if engine == 'neato':
+        return ['-Goverlap=scale', '-Gsplines=false']
+    if engine == 'sfdp':
+        return ['-Goverlap=prism', '-Gsplines=false']
+    return []
+
+
+def choose_engine(graph: pydot.Dot) -> str:
+    """dot for hierarchies it lays out quickly, neato for bigger or denser graphs, sfdp beyond that."""
+    nodes = len(graph.get_nodes())
+    density = len(graph.get_edges()) / max(nodes, 1)
+    if nodes <= settings.GRAPHVIZ_DOT_MAX_NODES and density <= settings.GRAPHVIZ_DOT_MAX_DENSITY:
+        return 'dot'
+    if nodes <= settings.GRAPHVIZ_NEATO_MAX_NODES:
+        return 'neato'
+    return 'sfdp'
+
+
+def layout_plan(graph: pydot.Dot) -> List[Tuple[str, List[str]]]:
+    """The engines to try, with their options, best layout first."""
+    nodes = len(graph.get_nodes())
+    engine = choose_engine(graph)
+    plan = []
+    while engine:
+        plan.append((engine, layout_options(engine, nodes)))
+        engine = FALLBACK_ENGINE.get(engine)
+    return plan
+
+
+def render_graph(graph: pydot.Dot, output_path: str, output_format: str = 'svg') -> Optional[str]:
+    """
+    Render the graph within GRAPHVIZ_RENDER_SECONDS, all attempts included. A Graphviz process
+    still running when its time is up is killed and the next, cheaper engine gets the rest.
+    Returns the engine that succeeded, or None when none did (the caller shows a table instead).
+    Raises FileNotFoundError when Graphviz is not installed.
+    """
+    source = graph.to_string().encode('utf-8')
+    deadline = time.monotonic() + settings.GRAPHVIZ_RENDER_SECONDS
+    plan = layout_plan(graph)
+    for attempt, (engine, options) in enumerate(plan):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        timeout = remaining * FIRST_ATTEMPT_SHARE if attempt < len(plan) - 1 else remaining
+        started = time.monotonic()
+        try:
+            # subprocess.run kills the child when the timeout expires
+            subprocess.run([engine, f'-T{output_format}', *options, '-o', output_path],
+                           input=source, capture_output=True, timeout=timeout, check=True)
+        except subprocess.TimeoutExpired:
+            logging.warning(f"{engine} did not lay out {output_path} within {timeout:.0f}s, killed")
+            continue
+        except subprocess.CalledProcessError as e:
+            logging.warning(f"{engine} failed on {output_path}: {e.stderr.decode(errors='replace').strip()}")
+            continue
+        logging.info(f"Laid out {output_path} with {engine} in {time.monotonic() - started:.1f}s")
+        return engine
+    return None
+
+
+def node_title(node: pydot.Node) -> str:
+    """Class or package name a node shows: the first field of a record, the first line of a label."""
+    label = (node.get('label') or node.get_name()).strip('"')
+    if label.startswith('{'):
+        return label[1:].split('|', 1)[0].rstrip('}')
+    return label.split('\\n', 1)[0]
+
+
+def graph_table(graph: pydot.Dot) -> List[List[str]]:
+    """(from, relationship, to) rows standing in for a diagram that could not be laid out in time."""
+    titles = {node.get_name().strip('"'): node_title(node) for node in graph.get_nodes()}
+    rows = []
+    linked = set()
+    for edge in graph.get_edges():
+        source, target = edge.get_source().strip('"'), edge.get_destination().strip('"')
+        linked.update((source, target))
+        label = (edge.get('label') or '').strip('"').replace('\\n', '\n')
+        rows.append([titles.get(source, source), label, titles.get(target, target)])
+    rows.extend([title, '', ''] for name, title in titles.items() if name not in linked)
+    return rows
+
+
+def svg_drawing(svg_path: str, width: float, height: float) -> Drawing:
+    """
+    Load a Graphviz SVG as a ReportLab drawing scaled to fit width x height, keeping its
+    aspect ratio. It is embedded as vector graphics, so huge diagrams stay sharp when zoomed.
+    """
+    drawing = svg2rlg(svg_path)
+    if drawing is None:
+        raise ValueError(f"Could not read {svg_path}")
+    scale = min(width / drawing.width, height / drawing.height)
+    drawing.width, drawing.height = drawing.width * scale, drawing.height * scale
+    drawing.scale(scale, scale)
+    return drawing
+
+
+def graph_drawing(graph: pydot.Dot, svg_path: str, width: float, height: float) -> Optional[Drawing]:
+    """
+    Render the graph to svg_path and load it as a drawing (see svg_drawing), or None when no
+    layout finished within the render budget or the SVG could not be rendered or read, so the
+    caller can show a placeholder instead. svg_path is removed either way.
+    """
+    try:
+        if render_graph(graph, svg_path, 'svg') is None:
+            logging.warning(f"No layout of {svg_path}: every engine failed or ran out of its {settings.GRAPHVIZ_RENDER_SECONDS:g}s")
+            return None
+        return svg_drawing(svg_path, width, height)
+    except Exception as e:
+        logging.error(f"Could not render {svg_path}: {e}")
+        return None
+    finally:
+        if os.path.exists(svg_path):
+            os.remove(svg_path)
@@ -0,0 +1,102 @@
+import logging
+from collections import defaultdict, deque
+from typing import List
+from django.conf import settings
+from .partitioning import EXTERNAL_NODE, IS_A, Relation
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Labels kept on an edge that stands for several parallel relationships
+MERGED_LABELS = 3
+
+
+def collapse_external(classes: dict, relations: List[Relation]) -> List[Relation]:
+    """
+    Point base classes and interfaces from outside the upload at the one external node
+    (CLASS_DIAGRAM_EXTERNAL_TYPES = 'collapse') or leave them out ('drop'); the type name
+    moves into the edge label. Compositions with outside types are always left out.
+    """
+    collapsed = []
+    for relation in relations:
+        if relation.source in classes and relation.target in classes:
+            collapsed.append(relation)
+        elif (relation.kind == IS_A and relation.target in classes
+              and settings.CLASS_DIAGRAM_EXTERNAL_TYPES == 'collapse'):
+            label = f"{relation.attributes.get('label', '')} {relation.source}".strip()
+            collapsed.append(relation._replace(source=EXTERNAL_NODE, attributes={**relation.attributes, 'label': label}))
+    return collapsed
+
+
+def reduce_inheritance(relations: List[Relation]) -> List[Relation]:
+    """
+    Transitive reduction of the is-a relationships: drop A -> C when a longer is-a path
+    already leads from A to C (C extends B, B implements A, C implements A again).
+    """
+    children = defaultdict(set)
+    for source, target, kind, _ in relations:
+        if kind == IS_A and source != EXTERNAL_NODE and source != target:
+            children[source].add(target)
+
+    # Descendants in reverse topological order; a cycle (classes sharing a name) disables the reduction
+    parents = defaultdict(int)
+    for targets in children.values():
+        for target in targets:
+            parents[target] += 1
+    nodes = set(children) | set(parents)
+    pending = deque(node for node in nodes if not parents[node])
+    order = []
+    while pending:
+        node = pending.popleft()
+        order.append(node)
+        for target in children[node]:
+            parents[target] -= 1
+            if not parents[target]:
+                pending.append(target)
+    if len(order) < len(nodes):
+        logging.warning("Inheritance cycle between classes, skipping transitive reduction")
+        return relations
+
+    descendants = {}
+    for node in reversed(order):
+        reached = set()
+        for target in children[node]:
+            reached.add(target)
+            reached |= descendants[target]
+        descendants[node] = reached
+
+    def redundant(relation):
+        return relation.kind == IS_A and relation.source in children and any(
+            relation.target in descendants[child] for child in children[relation.source] if child != relation.target
+        )
+
+    return [relation for relation in relations if not redundant(relation)]
+
+
+def merge_parallel(relations: List[Relation]) -> List[Relation]:
+    """One edge per (source, target, kind), labelled with the labels of the relationships it stands for."""
+    groups = defaultdict(list)
+    for relation in relations:
+        groups[(relation.source, relation.target, relation.kind)].append(relation)
+
+    merged = []
+    for (source, target, kind), group in groups.items():
+        if len(group) == 1:
+            merged.append(group[0])
+            continue
+        labels = list(dict.fromkeys(relation.attributes['label'] for relation in group if relation.attributes.get('label')))
+        label = '\\n'.join(labels[:MERGED_LABELS])
+        if len(labels) > MERGED_LABELS:
+            label += f"\\n+{len(labels) - MERGED_LABELS} more"
+        attributes = {**group[0].attributes, 'label': label}
+        if len({relation.attributes.get('style') for relation in group}) > 1:
+            attributes.pop('style', None)
+        merged.append(Relation(source, target, kind, attributes))
+    return merged
+
+
+def simplify_relations(classes: dict, relations: List[Relation]) -> List[Relation]:
+    """Shrink the relationship graph before layout, so Graphviz gets a much smaller problem."""
+    simplified = merge_parallel(reduce_inheritance(collapse_external(classes, relations)))
+    logging.info(f"Simplified {len(relations)} class relationships to {len(simplified)} edges")
+    return simplified
@@ -1,3 +1,110 @@
-from django.test import TestCase
+from types import SimpleNamespace
+from django.test import SimpleTestCase
+from .partitioning import EXTERNAL_NODE, HAS_A, IS_A, OTHER_PACKAGES, ROOT_PACKAGE, Relation, overview_groups, partition_classes
+from .ranking import rank_classes
+from .simplify import MERGED_LABELS, merge_parallel, reduce_inheritance
 
-# Create your tests here.
+
+def classes_in(packages: dict) -> dict:
+    """{class name: class info} for {package: [class names]}."""
+    return {name: SimpleNamespace(package=package) for package, names in packages.items() for name in names}
+
+
+def relation(source, target, kind=IS_A, **attributes):
+    return Relation(source, target, kind, attributes)
+
+
+class PartitionTests(SimpleTestCase):
+    def test_every_class_lands_in_exactly_one_partition_within_the_budget(self):
+        classes = classes_in({'app': [f'A{i}' for i in range(7)], 'lib': ['L1', 'L2'], 'util': ['U1']})
+        partitions = partition_classes(classes, [], budget=3)
+        placed = [name for _, names in partitions for name in names]
+        self.assertEqual(sorted(placed), sorted(classes))
+        self.assertTrue(all(len(names) <= 3 for _, names in partitions))
+
+    def test_small_packages_share_a_partition(self):
+        partitions = partition_classes(classes_in({'a': ['A'], 'b': ['B'], 'c': ['C'], 'd': ['D']}), [], budget=3)
+        self.assertEqual(partitions, [('a, b, c', ['A', 'B', 'C']), ('d', ['D'])])
+
+    def test_a_big_package_is_split_along_its_connected_components(self):
+        classes = classes_in({'app': ['A', 'B', 'C', 'X', 'Y', 'Z']})
+        relations = [relation('A', 'B'), relation('B', 'C', HAS_A), relation('X', 'Y'), relation('Y', 'Z')]
+        partitions = partition_classes(classes, relations, budget=3)
+        self.assertEqual(partitions, [('app (part 1)', ['A', 'B', 'C']), ('app (part 2)', ['X', 'Y', 'Z'])])
+
+    def test_titles_count_the_packages_they_leave_out(self):
+        classes = classes_in({package: [package.upper()] for package in 'abcde'})
+        [(title, _)] = partition_classes(classes, [], budget=5)
+        self.assertEqual(title, 'a, b, c and 2 more packages')
+
+
+class OverviewGroupTests(SimpleTestCase):
+    def test_packages_are_kept_when_they_fit(self):
+        packages = {'app.models': 3, 'app.views': 2, ROOT_PACKAGE: 1}
+        self.assertEqual(overview_groups(packages, budget=5), {package: package for package in packages})
+
+    def test_packages_are_cut_to_their_parents_to_fit_the_budget(self):
+        packages = {'app.models.user': 1, 'app.models.order': 1, 'app.views.api': 1, 'lib.io': 1}
+        groups = overview_groups(packages, budget=3)
+        self.assertEqual(groups, {'app.models.user': 'app.models', 'app.models.order': 'app.models',
+                                  'app.views.api': 'app.views', 'lib.io': 'lib.io'})
+
+    def test_many_sibling_packages_keep_the_biggest_and_fold_the_rest(self):
+        packages = {f'app.p{i}': 1 for i in range(20)}
+        packages['app.p0'] = 10
+        packages['app.p1'] = 5
+        # 'app' alone would fill an eighth of the budget, so the biggest of its children stay
+        groups = overview_groups(packages, budget=8)
+        self.assertEqual(groups['app.p0'], 'app.p0')
+        self.assertEqual(groups['app.p1'], 'app.p1')
+        self.assertEqual(len(set(groups.values())), 8)
+        self.assertEqual(list(groups.values()).count(OTHER_PACKAGES), 13)
+
+
+class RankingTests(SimpleTestCase):
+    def test_the_hub_of_the_graph_ranks_first(self):
+        classes = classes_in({'app': ['Base', 'A', 'B', 'C', 'Loner']})
+        relations = [relation('Base', name) for name in ('A', 'B', 'C')] + [relation('A', 'B', HAS_A)]
+        ranked = rank_classes(classes, relations)
+        self.assertEqual(ranked[0], 'Base')
+        self.assertEqual(ranked[-1], 'Loner')
+        self.assertEqual(sorted(ranked), sorted(classes))
+
+    def test_relationships_count_for_both_ends(self):
+        # Subclasses and bases of the same class rank the same, whichever way the edges point
+        classes = classes_in({'app': ['Child', 'Middle', 'Parent']})
+        ranked = rank_classes(classes, [relation('Parent', 'Middle'), relation('Middle', 'Child')])
+        self.assertEqual(ranked, ['Middle', 'Child', 'Parent'])
+
+    def test_ties_and_outside_types_are_ordered_by_name(self):
+        classes = classes_in({'app': ['B', 'A']})
+        self.assertEqual(rank_classes(classes, [relation('Object', 'B'), relation('A', 'A')]), ['A', 'B'])
+        self.assertEqual(rank_classes({}, []), [])
+
+
+class SimplifyTests(SimpleTestCase):
+    def test_inheritance_implied_by_a_longer_path_is_dropped(self):
+        # Base -> Middle -> Leaf makes Base -> Leaf redundant; compositions are never reduced
+        relations = [relation('Base', 'Middle'), relation('Middle', 'Leaf'), relation('Base', 'Leaf'),
+                     relation('Base', 'Leaf', HAS_A)]
+        self.assertEqual(reduce_inheritance(relations),
+                         [relation('Base', 'Middle'), relation('Middle', 'Leaf'), relation('Base', 'Leaf', HAS_A)])
+
+    def test_external_edges_and_cycles_are_left_alone(self):
+        external = [relation(EXTERNAL_NODE, 'Middle'), relation('Middle', 'Leaf'), relation(EXTERNAL_NODE, 'Leaf')]
+        self.assertEqual(reduce_inheritance(external), external)
+        cycle = [relation('A', 'B'), relation('B', 'C'), relation('C', 'A'), relation('A', 'C')]
+        self.assertEqual(reduce_inheritance(cycle), cycle)
+
+    def test_parallel_relationships_become_one_labelled_edge(self):
+        relations = [relation('Shop', 'Item', HAS_A, label='items', style='solid'),
+                     relation('Shop', 'Item', HAS_A, label='featured', style='dashed'),
+                     relation('Shop', 'Item', HAS_A, label='items'),
+                     relation('Shop', 'Item', IS_A)]
+        merged = merge_parallel(relations)
+        self.assertEqual(merged, [relation('Shop', 'Item', HAS_A, label='items\\nfeatured'), relation('Shop', 'Item', IS_A)])
+
+    def test_merged_labels_are_capped(self):
+        relations = [relation('A', 'B', HAS_A, label=f'field{i}') for i in range(MERGED_LABELS + 2)]
+        [merged] = merge_parallel(relations)
+        self.assertEqual(merged.attributes['label'].split('\\n'), ['field0', 'field1', 'field2', '+2 more'])
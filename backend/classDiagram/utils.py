@@ -3,12 +3,13 @@ from django.conf import settings
 from .java_class_diagram import JavaClassDiagramGenerator
 from .python_class_diagram import PythonDiagramGenerator
 
-def process_file(directory, author, language, doc_id):
+def process_file(directory, author, language, doc_id, workspace=None, output_dir=None):
+    """Write the class diagram PDF into output_dir, by default the author's results folder."""
     # Validate the language
     if language == 'java':
-        process = JavaClassDiagramGenerator(directory, author, doc_id)
+        process = JavaClassDiagramGenerator(directory, author, doc_id, workspace)
     elif language == 'python':  # Fix typo
-        process = PythonDiagramGenerator(directory, author, doc_id)
+        process = PythonDiagramGenerator(directory, author, doc_id, workspace)
     else:
         return {'error': f"{language} not supported for class diagram generation"}
 
@@ -27,14 +28,27 @@ def process_file(directory, author, language, doc_id):
         return png_result
 
     # Prepare file paths and names
-    img_path = png_result['img_path']
-    media_root = settings.MEDIA_ROOT  # Use physical path for saving files
+    diagrams = png_result['diagrams']
+    for diagram in diagrams:
+        if 'table' in diagram:
+            process.diagnostics.append({
+                'file': '',
+                'kind': 'render',
+                'message': f"{diagram['title']}: no layout within {settings.GRAPHVIZ_RENDER_SECONDS:g}s, listed as a table",
+            })
+    output_dir = output_dir or os.path.join(settings.MEDIA_ROOT, author, "results")  # Use physical path for saving files
+    os.makedirs(output_dir, exist_ok=True)
     # uploaded_file_name = os.path.splitext(os.path.basename(file_path))[0]
     file_name = f"class_diagram_{directory}.pdf"
-    output_path = os.path.join(media_root, author, "results", file_name)  # Use media root for saving the file
+    output_path = os.path.join(output_dir, file_name)
 
     # Generate the PDF
-    pdf_result = process.generate_pdf(img_path, output_path, classes)
+    try:
+        pdf_result = process.generate_pdf(diagrams, output_path, classes)
+    finally:
+        for diagram in diagrams:
+            if 'svg_path' in diagram:
+                os.remove(diagram['svg_path'])
     
     if pdf_result.get('error'):  # Check for errors in PDF generation
         return pdf_result
@@ -42,5 +56,6 @@ def process_file(directory, author, language, doc_id):
     # Return the success response with file name and path
     return {
         'file_name': file_name,
-        'file_path': output_path
+        'file_path': output_path,
+        'diagnostics': process.diagnostics
     }
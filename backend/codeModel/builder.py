@@ -0,0 +1,221 @@
+import os
+import signal
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Union
+from django.conf import settings
+from .records import FileModel, ClassRecord
+from .python_model import analyze_python_source
+from .java_model import analyze_java_source
+from .cache import get_parse_cache, content_hash
+from .pool import imap_unordered
+from .sources import MemoryTree
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+LANGUAGE_EXTENSIONS = {
+    'python': ('.py',),
+    'java': ('.java',),
+}
+
+LANGUAGE_ANALYZERS = {
+    'python': analyze_python_source,
+    'java': analyze_java_source,
+}
+
+# Recently built codebase models, so several generators over one upload parse it once
+MODEL_MEMO_SIZE = 8
+_model_memo: 'OrderedDict[tuple, CodebaseModel]' = OrderedDict()
+_model_memo_lock = threading.Lock()
+
+
+class CodebaseModel:
+    """Parsed view of every source file of one language in a directory."""
+
+    def __init__(self, directory: str, language: str, files: List[FileModel]):
+        self.directory = directory
+        self.language = language
+        self.files = files
+
+    def parsed_files(self) -> List[FileModel]:
+        return [file_model for file_model in self.files if not file_model.error]
+
+    def failed_files(self) -> List[FileModel]:
+        return [file_model for file_model in self.files if file_model.error]
+
+    def classes(self) -> List[ClassRecord]:
+        return [record for file_model in self.parsed_files() for record in file_model.classes]
+
+    def diagnostics(self) -> List[dict]:
+        """One entry per file that was skipped, with the reason it was skipped."""
+        return [
+            {
+                'file': os.path.relpath(file_model.path, self.directory),
+                'kind': file_model.error_kind or 'parse',
+                'message': file_model.error,
+            }
+            for file_model in self.failed_files()
+        ]
+
+
+def list_source_files(directory: Union[str, MemoryTree], language: str) -> List[str]:
+    extensions = LANGUAGE_EXTENSIONS.get(language, ())
+    if isinstance(directory, MemoryTree):
+        return directory.list_source_files(extensions)
+    source_files = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for file in sorted(files):
+            if file.endswith(extensions):
+                source_files.append(os.path.join(root, file))
+    return source_files
+
+
+class AnalysisTimeout(Exception):
+    pass
+
+
+def raise_analysis_timeout(signum, frame):
+    raise AnalysisTimeout()
+
+
+def analyze_source_file(file_path: str, language: str, data: Optional[bytes] = None) -> FileModel:
+    """Read and parse one file, or the in-memory `data` of it; failures are reported on the returned model."""
+    try:
+        if data is None:
+            with open(file_path, 'r', encoding='utf-8') as file:
+                source = file.read()
+        else:
+            source = data.decode('utf-8')
+    except (OSError, UnicodeDecodeError) as e:
+        return FileModel(file_path, language).fail('read', f'Error reading file {file_path}: {e}')
+    return LANGUAGE_ANALYZERS[language](source, file_path)
+
+
+def analyze_source_task(task: tuple) -> FileModel:
+    """
+    Pool entry point; a task is a (file_path, language, timeout, data) tuple,
+    where data carries the contents of in-memory files and is None otherwise.
+    Slow, oversized or crashing files come back as failed models so one
+    bad file never takes the rest of the batch down with it.
+    """
+    file_path, language, timeout, data = task
+    use_alarm = timeout and hasattr(signal, 'SIGALRM')
+    if use_alarm:
+        signal.signal(signal.SIGALRM, raise_analysis_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return analyze_source_file(file_path, language, data)
+    except AnalysisTimeout:
+        return FileModel(file_path, language).fail('timeout', f'Analysis of {file_path} took longer than {timeout}s')
+    except MemoryError:
+        return FileModel(file_path, language).fail('memory', f'Analysis of {file_path} ran out of memory')
+    except Exception as e:
+        return FileModel(file_path, language).fail('crash', f'Analysis of {file_path} failed: {e!r}')
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+# Failures that depend only on the file contents; anything else is retried next time
+REUSABLE_ERRORS = (None, 'parse', 'read')
+
+
+def build_codebase_model(directory: Union[str, MemoryTree], language: str, file_paths: Optional[List[str]] = None) -> CodebaseModel:
+    """
+    Parse the source files of a directory or of an in-memory tree. Files analyzed before,
+    in this or an earlier upload, come from the parse cache by content hash, so only added
+    and modified files are analyzed again.
+    """
+    if language not in LANGUAGE_ANALYZERS:
+        raise ValueError(f"{language} is not supported")
+    if file_paths is None:
+        file_paths = list_source_files(directory, language)
+    tree = directory if isinstance(directory, MemoryTree) else None
+    if tree is not None:
+        directory = tree.root
+
+    files = {}
+    hashes = {}
+    pending = []
+    cache = get_parse_cache()
+    for path in file_paths:
+        try:
+            size = tree.size(path) if tree else os.path.getsize(path)
+        except OSError:
+            size = 0  # reported by analyze_source_file
+        if settings.ANALYSIS_MAX_FILE_BYTES and size > settings.ANALYSIS_MAX_FILE_BYTES:
+            files[path] = FileModel(path, language).fail(
+                'size', f'{path} is {size} bytes, larger than the {settings.ANALYSIS_MAX_FILE_BYTES} byte limit'
+            )
+            continue
+        if cache is None:
+            pending.append(path)
+            continue
+        try:
+            hashes[path] = tree.content_hash(path) if tree else content_hash(path)
+        except OSError:
+            pending.append(path)  # reported by analyze_source_file
+            continue
+
+        cached = cache.get(cache.key(hashes[path], language))
+        if cached is not None:
+            files[path] = cached.relocate(path)
+            continue
+        pending.append(path)
+
+    if pending:
+        # Results arrive as workers finish; each FileModel carries its own path
+        timeout = settings.ANALYSIS_FILE_TIMEOUT
+        tasks = [(path, language, timeout, tree.read_bytes(path) if tree else None) for path in pending]
+        for file_model in imap_unordered(analyze_source_task, tasks, task_timeout=timeout):
+            path = file_model.path
+            files[path] = file_model
+            # Timeouts and memory failures may pass on a quieter server, so only parse results are kept
+            if cache is not None and path in hashes and file_model.error_kind in REUSABLE_ERRORS:
+                cache.put(cache.key(hashes[path], language), file_model)
+        if cache is not None:
+            cache.evict()
+
+    files = [
+        files.get(path) or FileModel(path, language).fail('timeout', f'No analysis result for {path}')
+        for path in file_paths
+    ]
+    for file_model in files:
+        if file_model.error:
+            logging.error(file_model.error)
+
+    logging.info(f"Parsed {len(pending)} of {len(files)} {language} files in {directory} ({len(files) - len(pending)} reused)")
+    return CodebaseModel(directory, language, files)
+
+
+def directory_fingerprint(file_paths: List[str]) -> tuple:
+    fingerprint = []
+    for path in file_paths:
+        stat = os.stat(path)
+        fingerprint.append((path, stat.st_size, stat.st_mtime_ns))
+    return tuple(fingerprint)
+
+
+def get_codebase_model(directory: Union[str, MemoryTree], language: str) -> CodebaseModel:
+    """Return the model for a directory or an in-memory tree, reusing it while the files are unchanged."""
+    file_paths = list_source_files(directory, language)
+    if isinstance(directory, MemoryTree):
+        key = (directory.root, language, directory.fingerprint(file_paths))
+    else:
+        key = (directory, language, directory_fingerprint(file_paths))
+
+    with _model_memo_lock:
+        model = _model_memo.get(key)
+        if model is not None:
+            _model_memo.move_to_end(key)
+            return model
+
+    model = build_codebase_model(directory, language, file_paths)
+
+    with _model_memo_lock:
+        _model_memo[key] = model
+        while len(_model_memo) > MODEL_MEMO_SIZE:
+            _model_memo.popitem(last=False)
+    return model
@@ -0,0 +1,115 @@
+import os
+import pickle
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Optional
+from django.conf import settings
+from .records import FileModel
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Bump whenever the analyzers or the record layout change, so stale entries are never reused
+ANALYZER_VERSION = 2
+
+_parse_cache = None
+_parse_cache_lock = threading.Lock()
+
+
+def content_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """
+    Per-file analysis results on disk, keyed by (content hash, language, analyzer version).
+    Entries are pickled FileModels; a read refreshes the entry's mtime and eviction
+    removes the least recently used entries once the cache grows past max_bytes.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, file_hash: str, language: str) -> str:
+        return hashlib.sha256(f"{file_hash}:{language}:{ANALYZER_VERSION}".encode()).hexdigest()
+
+    def entry_path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.pickle")
+
+    def get(self, key: str) -> Optional[FileModel]:
+        path = self.entry_path(key)
+        try:
+            with open(path, 'rb') as file:
+                file_model = pickle.load(file)
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, TypeError) as e:
+            logging.warning(f"Dropping unreadable parse cache entry {path}: {e}")
+            self._remove(path)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return file_model
+
+    def put(self, key: str, file_model: FileModel):
+        path = self.entry_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary file first so readers never see a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as file:
+                pickle.dump(file_model, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning(f"Could not write parse cache entry {path}: {e}")
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+                total += stat.st_size
+
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+        logging.info(f"Parse cache trimmed to {total} bytes")
+
+    def _remove(self, path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def get_parse_cache() -> Optional[ParseCache]:
+    """Return the shared parse cache, or None when it is disabled in settings."""
+    global _parse_cache
+    if not settings.PARSE_CACHE_DIR:
+        return None
+    with _parse_cache_lock:
+        if _parse_cache is None:
+            _parse_cache = ParseCache(settings.PARSE_CACHE_DIR, settings.PARSE_CACHE_MAX_BYTES)
+        return _parse_cache
@@ -0,0 +1,82 @@
+import re
+import javalang
+from typing import List, Tuple
+from .records import Statement, CallSite, MethodRecord, ClassRecord, FileModel
+
+# Lexical patterns used for sequence diagrams; they also work on files javalang cannot parse
+CLASS_PATTERN = re.compile(r'class\s+(\w+)')
+CALL_PATTERN = re.compile(r'(\w+)\s*\.\s*(\w+)\s*\(')
+SKIPPED_CALL_TARGETS = {'system', 'out', 'err'}  # Skip system calls
+
+
+def java_statement(stmt) -> Statement:
+    """Reduce a javalang statement to its control-flow skeleton."""
+    kind = type(stmt).__name__
+    if isinstance(stmt, javalang.tree.IfStatement):
+        then_block = java_block([stmt.then_statement]) if stmt.then_statement else ()
+        else_block = java_block([stmt.else_statement]) if stmt.else_statement else ()
+        return Statement(kind, str(stmt.condition), (then_block, else_block))
+    if isinstance(stmt, (javalang.tree.ForStatement, javalang.tree.WhileStatement)):
+        if isinstance(stmt, javalang.tree.ForStatement):
+            # A classic for keeps its condition in `control`; an enhanced for (EnhancedForControl) has none
+            condition = getattr(stmt.control, 'condition', None)
+        else:
+            condition = stmt.condition
+        body = java_block([stmt.body]) if stmt.body else ()
+        return Statement(kind, str(condition) if condition else '', (body,))
+    if isinstance(stmt, javalang.tree.TryStatement):
+        catches = tuple(
+            Statement('CatchClause', ' | '.join(catch.parameter.types), (java_block(catch.block or []),))
+            for catch in stmt.catches or []
+        )
+        return Statement(kind, '', (java_block(stmt.block or []), catches))
+    if isinstance(stmt, javalang.tree.ReturnStatement):
+        return Statement(kind, str(stmt.expression), ())
+    return Statement(kind, '', ())
+
+
+def java_block(statements) -> Tuple[Statement, ...]:
+    return tuple(java_statement(stmt) for stmt in statements)
+
+
+def java_class(node) -> ClassRecord:
+    record = ClassRecord(node.name)
+    record.bases = (node.extends.name,) if node.extends else ()
+    record.interfaces = tuple(i.name for i in node.implements) if node.implements else ()
+    record.attributes = tuple(
+        f"{field.type.name} {declarator.name}"
+        for field in node.fields
+        for declarator in field.declarators
+    )
+    record.methods = tuple(
+        MethodRecord(method.name, java_block(method.body) if method.body else ())
+        for method in node.methods
+    )
+    return record
+
+
+def java_call_sites(content: str, class_name: str) -> List[CallSite]:
+    """Extract method calls like objectName.methodName() from the raw source."""
+    calls = []
+    for match in CALL_PATTERN.finditer(content):
+        object_name, method_name = match.groups()
+        if object_name.lower() not in SKIPPED_CALL_TARGETS:
+            calls.append(CallSite(class_name, object_name, method_name, ''))
+    return calls
+
+
+def analyze_java_source(content: str, file_path: str) -> FileModel:
+    file_model = FileModel(file_path, 'java')
+
+    match = CLASS_PATTERN.search(content)
+    if match:
+        file_model.primary_class = match.group(1)
+        file_model.calls = java_call_sites(content, file_model.primary_class)
+
+    try:
+        tree = javalang.parse.parse(content)
+    except (javalang.parser.JavaSyntaxError, javalang.tokenizer.LexerError) as e:
+        return file_model.fail('parse', f'Syntax error in file {file_path}' + (f': {e}' if str(e) else ''))
+
+    file_model.classes = [java_class(node) for _, node in tree.filter(javalang.tree.ClassDeclaration)]
+    return file_model
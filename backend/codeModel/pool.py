@@ -0,0 +1,201 @@
+import os
+import time
+import queue
+import atexit
+import signal
+import logging
+import itertools
+import threading
+import multiprocessing
+from functools import partial
+from django.conf import settings
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Modules every analysis worker needs; importing them up front keeps the first task fast
+WORKER_MODULES = ['codeModel.python_model', 'codeModel.java_model', 'codeModel.builder']
+
+# Extra time the parent allows one task on top of the workers' own timeouts
+POOL_GRACE_SECONDS = 10
+# How long one task may run when the caller gives it no timeout of its own (ANALYSIS_FILE_TIMEOUT = 0)
+UNTIMED_TASK_SECONDS = 300
+# How often the watchdog looks for hung or dead workers
+WATCHDOG_INTERVAL_SECONDS = 0.5
+
+_pool = None
+_pool_lock = threading.Lock()
+# Worker side: where the worker reports each task it starts and each chunk it finishes
+_heartbeats = None
+# Parent side: chunks sent to the pool and not delivered yet, chunk id -> (caller's result queue, seconds one task may run)
+_chunks = {}
+_chunks_lock = threading.Lock()
+_chunk_ids = itertools.count()
+
+
+def init_worker(memory_limit_mb: int = 0, heartbeats=None):
+    """Import the parsers once per worker process instead of once per task."""
+    global _heartbeats
+    _heartbeats = heartbeats
+    if memory_limit_mb:
+        try:
+            import resource
+        except ImportError:  # not available on Windows
+            logging.warning("Analysis worker memory limit is not supported on this platform")
+        else:
+            limit = memory_limit_mb * 1024 * 1024
+            _, hard = resource.getrlimit(resource.RLIMIT_AS)
+            if hard != resource.RLIM_INFINITY:
+                limit = min(limit, hard)
+            resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+    import ast  # noqa: F401
+    import javalang  # noqa: F401
+    for module in WORKER_MODULES:
+        __import__(module)
+
+
+def get_analysis_pool():
+    """Return the process-wide analysis pool, starting it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            context = multiprocessing.get_context(settings.ANALYSIS_POOL_START_METHOD)
+            if settings.ANALYSIS_POOL_START_METHOD == 'forkserver':
+                context.set_forkserver_preload(WORKER_MODULES)
+            # Written only between tasks, so a worker killed in the middle of one never holds its lock
+            heartbeats = context.SimpleQueue()
+            _pool = context.Pool(
+                processes=settings.ANALYSIS_POOL_SIZE or os.cpu_count(),
+                initializer=init_worker,
+                initargs=(settings.ANALYSIS_WORKER_MEMORY_MB, heartbeats),
+                maxtasksperchild=settings.ANALYSIS_POOL_MAX_TASKS_PER_CHILD or None
+            )
+            threading.Thread(target=watch_workers, args=(_pool, heartbeats), name='analysis-watchdog', daemon=True).start()
+            logging.info(f"Started analysis pool with {_pool._processes} workers")
+        return _pool
+
+
+def run_chunk(func, chunk_id: int, tasks: list) -> list:
+    """Pool entry point: run a chunk of tasks back to back, telling the watchdog when each one starts."""
+    pid = os.getpid()
+    results = []
+    for task in tasks:
+        _heartbeats.put((pid, chunk_id, time.time()))
+        results.append(func(task))
+    _heartbeats.put((pid, chunk_id, None))
+    return results
+
+
+def drop_chunk(chunk_id: int, reason: str):
+    """Tell the chunk's caller its results will never come."""
+    with _chunks_lock:
+        owner = _chunks.pop(chunk_id, None)
+    if owner is not None:
+        owner[0].put((chunk_id, None, reason))
+
+
+def watch_workers(pool, heartbeats):
+    """
+    Replace only the workers stuck on one task for longer than its caller allows, or that
+    died (crash, out of memory). Their chunks are reported lost to their callers; the pool
+    starts a fresh worker in their place and every other worker keeps going. Time a chunk
+    spends queued behind other callers' work does not count, only the task being run.
+    """
+    busy = {}  # worker pid -> (chunk id, time its current task started)
+    while _pool is pool:
+        # Taken before reading the heartbeats: a worker that finished its chunk and then exited has reported it by now
+        alive = {worker.pid for worker in list(pool._pool) if worker.exitcode is None}
+        while not heartbeats.empty():
+            pid, chunk_id, started = heartbeats.get()
+            if started is None:
+                busy.pop(pid, None)
+            else:
+                busy[pid] = (chunk_id, started)
+
+        now = time.time()
+        for pid, (chunk_id, started) in list(busy.items()):
+            with _chunks_lock:
+                owner = _chunks.get(chunk_id)
+            limit = owner[1] if owner else UNTIMED_TASK_SECONDS + POOL_GRACE_SECONDS
+            if pid not in alive:
+                del busy[pid]
+                drop_chunk(chunk_id, f"analysis worker {pid} died")
+            elif now - started > limit:
+                del busy[pid]
+                logging.error(f"Analysis worker {pid} spent {now - started:.0f}s on one task, replacing it")
+                try:
+                    os.kill(pid, getattr(signal, 'SIGKILL', signal.SIGTERM))
+                except OSError:
+                    pass
+                drop_chunk(chunk_id, f"analysis worker {pid} hung for {now - started:.0f}s")
+        time.sleep(WATCHDOG_INTERVAL_SECONDS)
+
+
+def deliver_chunk(results: queue.Queue, chunk_id: int, chunk_results: list):
+    with _chunks_lock:
+        _chunks.pop(chunk_id, None)
+    results.put((chunk_id, chunk_results, None))
+
+
+def fail_chunk(chunk_id: int, error: BaseException):
+    drop_chunk(chunk_id, f"chunk failed: {error!r}")
+
+
+def chunk_size(task_count: int) -> int:
+    """Chunk size from settings, or about four chunks per worker when unset."""
+    if settings.ANALYSIS_POOL_CHUNKSIZE:
+        return settings.ANALYSIS_POOL_CHUNKSIZE
+    workers = settings.ANALYSIS_POOL_SIZE or os.cpu_count()
+    chunks, extra = divmod(task_count, workers * 4)
+    return chunks + 1 if extra else max(chunks, 1)
+
+
+def imap_unordered(func, tasks: list, task_timeout: float = 0):
+    """
+    Stream results of func over tasks from the shared pool, in completion order.
+    Workers enforce their own per-task timeouts; as a safety net the watchdog replaces
+    a worker that spends more than task_timeout (UNTIMED_TASK_SECONDS when 0) plus
+    POOL_GRACE_SECONDS on one task. The rest of that worker's chunk is dropped, and
+    the callers sharing the pool lose nothing.
+    """
+    chunksize = chunk_size(len(tasks))
+    limit = (task_timeout or UNTIMED_TASK_SECONDS) + POOL_GRACE_SECONDS
+    pool = get_analysis_pool()
+    results = queue.Queue()
+    pending = set()
+    for start in range(0, len(tasks), chunksize):
+        chunk_id = next(_chunk_ids)
+        with _chunks_lock:
+            _chunks[chunk_id] = (results, limit)
+        pending.add(chunk_id)
+        pool.apply_async(
+            run_chunk, (func, chunk_id, tasks[start:start + chunksize]),
+            callback=partial(deliver_chunk, results, chunk_id), error_callback=partial(fail_chunk, chunk_id)
+        )
+
+    while pending:
+        try:
+            chunk_id, chunk_results, reason = results.get(timeout=WATCHDOG_INTERVAL_SECONDS * 4)
+        except queue.Empty:
+            if _pool is not pool:
+                logging.error(f"Analysis pool was shut down, {len(pending)} chunks got no result")
+                return
+            continue
+        if chunk_id not in pending:
+            continue  # delivered just as its worker was replaced
+        pending.discard(chunk_id)
+        if chunk_results is None:
+            logging.error(f"Dropped a chunk of {chunksize} analysis tasks: {reason}")
+            continue
+        yield from chunk_results
+
+
+@atexit.register
+def shutdown_analysis_pool(pool=None):
+    """Stop the shared pool; with `pool` given, only if it is still the current one."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and (pool is None or pool is _pool):
+            _pool.terminate()
+            _pool.join()
+            _pool = None
@@ -0,0 +1,107 @@
+import ast
+from typing import List, Tuple
+from .records import Statement, CallSite, MethodRecord, ClassRecord, FileModel
+
+# Statements whose nested bodies are kept in the control-flow skeleton
+COMPOUND_STATEMENTS = (ast.If, ast.For, ast.While, ast.Try)
+
+
+def python_statement(stmt: ast.stmt) -> Statement:
+    """Reduce an ast statement to its control-flow skeleton."""
+    kind = type(stmt).__name__
+    if isinstance(stmt, ast.If):
+        return Statement(kind, ast.unparse(stmt.test), (python_block(stmt.body), python_block(stmt.orelse)))
+    if isinstance(stmt, (ast.For, ast.While)):
+        return Statement(kind, '', (python_block(stmt.body), python_block(stmt.orelse)))
+    if isinstance(stmt, ast.Try):
+        blocks = [python_block(stmt.body)]
+        blocks.extend(python_block(handler.body) for handler in stmt.handlers)
+        blocks.append(python_block(stmt.orelse))
+        blocks.append(python_block(stmt.finalbody))
+        return Statement(kind, '', tuple(blocks))
+    return Statement(kind, '', ())
+
+
+def python_block(statements: List[ast.stmt]) -> Tuple[Statement, ...]:
+    return tuple(python_statement(stmt) for stmt in statements)
+
+
+def python_method(node: ast.FunctionDef) -> MethodRecord:
+    return MethodRecord(node.name, python_block(node.body), ast.get_docstring(node) or '')
+
+
+def python_class(node: ast.ClassDef, top_level: bool) -> ClassRecord:
+    record = ClassRecord(node.name, top_level)
+    attributes = []
+    compositions = []
+    methods = []
+
+    for item in node.body:
+        if isinstance(item, ast.FunctionDef):
+            methods.append(python_method(item))
+        elif isinstance(item, ast.Assign):
+            for target in item.targets:
+                if isinstance(target, ast.Name):
+                    attributes.append(target.id)
+                    # Detect composition relationships
+                    if isinstance(item.value, ast.Call) and isinstance(item.value.func, ast.Name):
+                        compositions.append((target.id, item.value.func.id))
+
+    record.bases = tuple(
+        base.id if isinstance(base, ast.Name) else ast.unparse(base)
+        for base in node.bases
+    )
+    record.attributes = tuple(attributes)
+    record.compositions = tuple(compositions)
+    record.methods = tuple(methods)
+    return record
+
+
+class ModelVisitor(ast.NodeVisitor):
+    """Single pass over the tree collecting classes and call sites."""
+
+    def __init__(self, file_model: FileModel):
+        self.file_model = file_model
+        self.current_class = None
+        self.depth = 0
+
+    def visit_ClassDef(self, node):
+        self.file_model.classes.append(python_class(node, top_level=self.depth == 0))
+        if self.file_model.primary_class is None:
+            self.file_model.primary_class = node.name
+        outer_class = self.current_class
+        self.current_class = node.name
+        self.depth += 1
+        self.generic_visit(node)
+        self.depth -= 1
+        self.current_class = outer_class
+
+    def visit_FunctionDef(self, node):
+        docstring = ast.get_docstring(node) or ''
+        for stmt in node.body:
+            if isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Call):
+                call = stmt.value
+                if isinstance(call.func, ast.Attribute) and isinstance(call.func.value, ast.Name):
+                    self.file_model.calls.append(
+                        CallSite(self.current_class, call.func.value.id, call.func.attr, docstring)
+                    )
+        self.depth += 1
+        self.generic_visit(node)
+        self.depth -= 1
+
+    def visit_AsyncFunctionDef(self, node):
+        self.depth += 1
+        self.generic_visit(node)
+        self.depth -= 1
+
+
+def analyze_python_source(source: str, file_path: str) -> FileModel:
+    file_model = FileModel(file_path, 'python')
+    try:
+        tree = ast.parse(source, filename=file_path)
+    except (SyntaxError, ValueError) as e:
+        return file_model.fail('parse', f'Syntax error in {file_path}: {e}')
+
+    ModelVisitor(file_model).visit(tree)
+    file_model.functions = [python_method(node) for node in tree.body if isinstance(node, ast.FunctionDef)]
+    return file_model
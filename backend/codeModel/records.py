@@ -0,0 +1,72 @@
+from collections import namedtuple
+from typing import List, Optional, Tuple
+
+# Control-flow skeleton of one statement.
+# kind:   AST node type name ('If', 'For', 'IfStatement', 'ReturnStatement', ...)
+# label:  short text shown for the statement (condition, return expression, caught type)
+# blocks: nested statement blocks, each a tuple of Statement
+Statement = namedtuple('Statement', ['kind', 'label', 'blocks'])
+
+# A call site found inside a method or function.
+# caller: class the call is made from (None for module level code)
+# target: object the method is called on
+# method: name of the called method
+CallSite = namedtuple('CallSite', ['caller', 'target', 'method', 'docstring'])
+
+
+class MethodRecord:
+    __slots__ = ('name', 'statements', 'docstring')
+
+    def __init__(self, name: str, statements: Tuple[Statement, ...] = (), docstring: str = ''):
+        self.name = name
+        self.statements = statements
+        self.docstring = docstring
+
+    def __repr__(self):
+        return f"MethodRecord(name={self.name}, statements={len(self.statements)})"
+
+
+class ClassRecord:
+    __slots__ = ('name', 'top_level', 'bases', 'interfaces', 'attributes', 'compositions', 'methods')
+
+    def __init__(self, name: str, top_level: bool = True):
+        self.name = name
+        self.top_level = top_level
+        self.bases: Tuple[str, ...] = ()
+        self.interfaces: Tuple[str, ...] = ()
+        self.attributes: Tuple[str, ...] = ()
+        self.compositions: Tuple[Tuple[str, str], ...] = ()  # (attribute_name, class_name)
+        self.methods: Tuple[MethodRecord, ...] = ()
+
+    def __repr__(self):
+        return f"ClassRecord(name={self.name}, bases={self.bases}, methods={[m.name for m in self.methods]})"
+
+
+class FileModel:
+    """Everything the generators need from one source file, extracted in a single parse."""
+    __slots__ = ('path', 'language', 'classes', 'functions', 'calls', 'primary_class', 'error', 'error_kind')
+
+    def __init__(self, path: str, language: str):
+        self.path = path
+        self.language = language
+        self.classes: List[ClassRecord] = []
+        self.functions: List[MethodRecord] = []  # module level functions
+        self.calls: List[CallSite] = []
+        self.primary_class: Optional[str] = None  # first class declared in the file
+        self.error: Optional[str] = None
+        self.error_kind: Optional[str] = None  # 'read', 'parse', 'size', 'timeout', 'memory' or 'crash'
+
+    def relocate(self, path: str) -> 'FileModel':
+        """Point a model loaded from the parse cache at the file it now stands for."""
+        if self.error:
+            self.error = self.error.replace(self.path, path)
+        self.path = path
+        return self
+
+    def fail(self, kind: str, message: str) -> 'FileModel':
+        self.error_kind = kind
+        self.error = message
+        return self
+
+    def __repr__(self):
+        return f"FileModel(path={self.path}, classes={len(self.classes)}, calls={len(self.calls)}, error={self.error})"
@@ -0,0 +1,51 @@
+import os
+import hashlib
+from typing import Dict, Iterable, List, Tuple, Union
+from django.conf import settings
+
+
+class MemoryTree:
+    """
+    Source files of a small upload, held in memory instead of an upload folder.
+    Files are addressed by virtual paths under `root`, so models and diagnostics
+    see the same layout the upload folder would have had.
+    """
+
+    def __init__(self, root: str, files: Dict[str, bytes]):
+        self.root = root
+        self.files = {os.path.join(root, relative_path): data for relative_path, data in files.items()}
+        self.hashes = {}
+
+    def list_source_files(self, extensions: Tuple[str, ...]) -> List[str]:
+        return sorted(path for path in self.files if path.endswith(extensions))
+
+    def items(self) -> Iterable[Tuple[str, bytes]]:
+        return sorted(self.files.items())
+
+    def size(self, path: str) -> int:
+        return len(self.files[path])
+
+    def read_bytes(self, path: str) -> bytes:
+        return self.files[path]
+
+    def content_hash(self, path: str) -> str:
+        if path not in self.hashes:
+            self.hashes[path] = hashlib.sha256(self.files[path]).hexdigest()
+        return self.hashes[path]
+
+    def fingerprint(self, paths: List[str]) -> tuple:
+        return tuple((path, self.content_hash(path)) for path in paths)
+
+    def total_bytes(self) -> int:
+        return sum(len(data) for data in self.files.values())
+
+
+def resolve_workspace(workspace: Union[str, MemoryTree, None], author: str, directory: str) -> Tuple[str, Union[str, MemoryTree]]:
+    """
+    (directory, sources) for a generator: the upload folder twice, or the virtual
+    root and the in-memory files. Without a workspace, the legacy <author>/<directory> folder.
+    """
+    if isinstance(workspace, MemoryTree):
+        return workspace.root, workspace
+    path = os.path.join(settings.MEDIA_ROOT, workspace or os.path.join(author, directory))
+    return path, path
@@ -0,0 +1,50 @@
+import time
+import threading
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from . import pool
+from .java_model import analyze_java_source
+
+
+def sleep_task(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+@override_settings(ANALYSIS_POOL_START_METHOD='fork', ANALYSIS_POOL_SIZE=2, ANALYSIS_POOL_CHUNKSIZE=1,
+                   ANALYSIS_POOL_MAX_TASKS_PER_CHILD=0, ANALYSIS_WORKER_MEMORY_MB=0)
+class AnalysisPoolTests(SimpleTestCase):
+    def setUp(self):
+        pool.shutdown_analysis_pool()
+        self.addCleanup(pool.shutdown_analysis_pool)
+        grace = mock.patch.object(pool, 'POOL_GRACE_SECONDS', 0)
+        grace.start()
+        self.addCleanup(grace.stop)
+
+    def test_hung_task_is_dropped_and_the_pool_keeps_serving(self):
+        results = list(pool.imap_unordered(sleep_task, [0, 30, 0, 0], task_timeout=1))
+        self.assertEqual(sorted(results), [0, 0, 0])
+        # The replaced worker leaves a working pool behind
+        self.assertEqual(list(pool.imap_unordered(sleep_task, [0.1], task_timeout=1)), [0.1])
+
+    def test_other_callers_keep_their_results(self):
+        other = []
+        thread = threading.Thread(target=lambda: other.extend(pool.imap_unordered(sleep_task, [0.2] * 6, task_timeout=5)))
+        thread.start()
+        self.assertEqual(list(pool.imap_unordered(sleep_task, [30], task_timeout=1)), [])
+        thread.join()
+        self.assertEqual(other, [0.2] * 6)
+
+    def test_untimed_tasks_still_have_a_limit(self):
+        with mock.patch.object(pool, 'UNTIMED_TASK_SECONDS', 1):
+            self.assertEqual(list(pool.imap_unordered(sleep_task, [30], task_timeout=0)), [])
+
+
+class JavaModelTests(SimpleTestCase):
+    def test_loops_keep_their_conditions(self):
+        source = 'class A { void f(int[] xs) { for (int i = 0; i < 3; i++) {} for (int x : xs) {} while (ready) {} } }'
+        [record] = analyze_java_source(source, 'A.java').classes
+        classic, enhanced, loop = record.methods[0].statements
+        self.assertIn('BinaryOperation', classic.label)
+        self.assertEqual(enhanced.label, '')
+        self.assertIn('member=ready', loop.label)
@@ -1,10 +1,13 @@
 import os
 import sys
-import javalang
+import shutil
 import pydot
 import logging
-import multiprocessing
 from django.conf import settings
+from codeModel.builder import get_codebase_model
+from codeModel.sources import resolve_workspace
+from codeModel.records import Statement
+from classDiagram.rendering import graph_drawing
 from typing import Dict, List, Tuple, Optional
 from reportlab.lib.pagesizes import letter
 from reportlab.platypus import (
@@ -23,7 +26,7 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 class MethodInfo:
     def __init__(self, name: str):
         self.name = name
-        self.statements: Optional[List[javalang.ast.Node]] = None
+        self.statements: Optional[List[Statement]] = None
 
 class ClassInfo:
     def __init__(self, name: str):
@@ -31,65 +34,36 @@ class ClassInfo:
         self.methods: Dict[str, MethodInfo] = {}
 
 class JavaFlowchartGenerator:
-    def __init__(self, directory, author, doc_id):
+    def __init__(self, directory, author, doc_id, workspace=None):
         # self.file_path = file_path
         self.author = author
         self.doc_id = doc_id
-        self.directory = f'{settings.MEDIA_ROOT}/{self.author}/{directory}'
-
-    def safe_write_png(self, graph, output_path):
-        current_dir = self.directory
-        filename = os.path.splitext(os.path.basename(output_path))[0]
-        try:
-            graph.write_png(output_path)
-            logging.info(f"Generated: {output_path}")
-        except Exception as e:
-            logging.error(f"Error writing {filename}: {str(e)}")
+        self.dir_name = directory
+        self.diagnostics = []  # files skipped during analysis
+        self.directory, self.sources = resolve_workspace(workspace, author, directory)  # upload folder, or the in-memory files of a small upload
+
+    def flowchart_flowable(self, graph, svg_path, title, styles):
+        """The flowchart as a vector drawing, or a placeholder when it could not be rendered."""
+        drawing = graph_drawing(graph, svg_path, 6 * inch, 4 * inch)
+        if drawing is not None:
+            return drawing
+        self.diagnostics.append({'file': '', 'kind': 'render', 'message': f"{title}: flowchart could not be drawn"})
+        return Paragraph(f"Flowchart of {title} could not be drawn (its layout failed or took too long).", self.placeholder_style)
+
+    def analyze_directory(self, model=None) -> Dict[str, ClassInfo]:
+        all_classes = {}
+        if model is None:
+            model = get_codebase_model(self.sources, 'java')
+        self.diagnostics = model.diagnostics()
 
-    def analyze_java_file(self, file_path: str) -> Dict[str, ClassInfo]:
-        classes = {}
-        with open(file_path, 'r', encoding='utf-8') as file:
-            content = file.read()
-        
-        try:
-            tree = javalang.parse.parse(content)
-        except javalang.parser.JavaSyntaxError:
-            logging.error(f"Syntax error in file: {file_path}")
-            return {}
-
-        for path, node in tree.filter(javalang.tree.ClassDeclaration):
-            class_name = node.name
-            class_info = ClassInfo(class_name)
-            
-            for method in node.methods:
+        for record in model.classes():
+            class_info = ClassInfo(record.name)
+            for method in record.methods:
                 method_info = MethodInfo(method.name)
-                if method.body:
-                    method_info.statements = method.body
+                if method.statements:
+                    method_info.statements = list(method.statements)
                 class_info.methods[method.name] = method_info
-            
-            classes[class_name] = class_info
-        
-        return classes
-
-    def list_java_files(self) -> List[str]:
-        java_files = []
-        for root, _, files in os.walk(self.directory):
-            for file in files:
-                if file.endswith('.java'):
-                    file_path = os.path.join(root, file)
-                    logging.info(f"Found Java file: {file_path}")
-                    print(file_path)
-                    java_files.append(file_path)
-        return java_files
-
-    def analyze_directory(self) -> Dict[str, ClassInfo]:
-        all_classes = {}
-        file_paths = self.list_java_files()
-        
-        with multiprocessing.Pool() as pool:
-            results = pool.map(self.analyze_java_file, file_paths)
-            for result in results:
-                all_classes.update(result)
+            all_classes[record.name] = class_info
         
         return all_classes
 
@@ -124,10 +98,10 @@ class JavaFlowchartGenerator:
         def process_block(statements, parent_node=None):
             nonlocal prev_node, final_node
             for i, stmt in enumerate(statements):
-                if isinstance(stmt, javalang.tree.IfStatement):
+                if stmt.kind == 'IfStatement':
                     # Create if-else diamond node
                     if_node = pydot.Node(f"if_{method_name}_{i}", 
-                                        label=f"If\n{stmt.condition}", 
+                                        label=f"If\n{stmt.label}", 
                                         shape="diamond", 
                                         style="filled", 
                                         fillcolor="lightyellow")
@@ -146,8 +120,9 @@ class JavaFlowchartGenerator:
                     graph.add_edge(pydot.Edge(if_node, true_block_node, label="Yes"))
 
                     # Process true block
-                    if stmt.then_statement:
-                        process_block([stmt.then_statement], true_block_node)
+                    then_block, else_block = stmt.blocks
+                    if then_block:
+                        process_block(then_block, true_block_node)
 
                     # False branch
                     false_block_node = pydot.Node(f"false_block_{method_name}_{i}", 
@@ -157,15 +132,15 @@ class JavaFlowchartGenerator:
                     graph.add_edge(pydot.Edge(if_node, false_block_node, label="No"))
 
                     # Process false block if exists
-                    if stmt.else_statement:
-                        process_block([stmt.else_statement], false_block_node)
+                    if else_block:
+                        process_block(else_block, false_block_node)
 
                     prev_node = if_node
 
-                elif isinstance(stmt, (javalang.tree.ForStatement, javalang.tree.WhileStatement)):
+                elif stmt.kind in ('ForStatement', 'WhileStatement'):
                     # Create loop node
                     loop_node = pydot.Node(f"loop_{method_name}_{i}", 
-                                        label=f"{type(stmt).__name__[:-9]} Loop\n{stmt.condition or ''}", 
+                                        label=f"{stmt.kind[:-9]} Loop\n{stmt.label}", 
                                         shape="diamond", 
                                         style="filled", 
                                         fillcolor="lightblue")
@@ -184,15 +159,15 @@ class JavaFlowchartGenerator:
                     graph.add_edge(pydot.Edge(loop_node, loop_body_node, label="Iterate"))
 
                     # Process loop body
-                    if stmt.body:
-                        process_block([stmt.body], loop_body_node)
+                    if stmt.blocks[0]:
+                        process_block(stmt.blocks[0], loop_body_node)
 
                     # Connect back to loop
                     graph.add_edge(pydot.Edge(loop_body_node, loop_node, style="dashed"))
 
                     prev_node = loop_node
 
-                elif isinstance(stmt, javalang.tree.TryStatement):
+                elif stmt.kind == 'TryStatement':
                     # Try block
                     try_node = pydot.Node(f"try_{method_name}_{i}", 
                                         label="Try Block", 
@@ -207,13 +182,14 @@ class JavaFlowchartGenerator:
                         graph.add_edge(pydot.Edge(prev_node, try_node))
 
                     # Process try block
-                    if stmt.block:
-                        process_block(stmt.block, try_node)
+                    try_block, catches = stmt.blocks
+                    if try_block:
+                        process_block(try_block, try_node)
 
                     # Process catch blocks
-                    for catch in stmt.catches:
+                    for catch in catches:
                         catch_node = pydot.Node(f"catch_{method_name}_{i}", 
-                                                label=f"Catch {catch.parameter.type.name}", 
+                                                label=f"Catch {catch.label}", 
                                                 shape="rectangle", 
                                                 style="filled", 
                                                 fillcolor="lightsalmon")
@@ -221,14 +197,14 @@ class JavaFlowchartGenerator:
                         graph.add_edge(pydot.Edge(try_node, catch_node))
 
                         # Process catch block
-                        if catch.block:
-                            process_block(catch.block, catch_node)
+                        if catch.blocks[0]:
+                            process_block(catch.blocks[0], catch_node)
 
                     prev_node = try_node
 
-                elif isinstance(stmt, javalang.tree.ReturnStatement):
+                elif stmt.kind == 'ReturnStatement':
                     return_node = pydot.Node(f"return_{method_name}_{i}", 
-                                            label=f"Return\n{stmt.expression}", 
+                                            label=f"Return\n{stmt.label}", 
                                             shape="parallelogram", 
                                             style="filled", 
                                             fillcolor="lightpink")
@@ -247,7 +223,7 @@ class JavaFlowchartGenerator:
                 else:
                     # Generic statement node
                     stmt_node = pydot.Node(f"stmt_{method_name}_{i}", 
-                                        label=type(stmt).__name__[:-9], 
+                                        label=stmt.kind[:-9], 
                                         shape="rectangle")
                     
                     # Connect to previous node
@@ -383,14 +359,13 @@ class JavaFlowchartGenerator:
     def generate_pdf(self, flowcharts, output_path):
         """Comprehensive PDF generation with improved formatting"""
         print("generating pdf!")
+        # The SVGs only feed the PDF, so they go to a private scratch folder, never the upload folder
+        scratch_dir = tempfile.mkdtemp(prefix='flowchart-')
         try:
             print("within try block")
-            temp_dir = self.directory  # Use self.directory instead of creating a temp dir
-            if not os.path.exists(temp_dir):
-                os.makedirs(temp_dir)  # Ensure the directory exists
-
             doc = SimpleDocTemplate(output_path, pagesize=letter)
             styles = getSampleStyleSheet()
+            self.placeholder_style = ParagraphStyle('FlowchartPlaceholder', parent=styles['Normal'], textColor=colors.Color(0.5, 0.5, 0.5))
             story = []
 
             title = Paragraph("Java Method Flowcharts", styles['Title'])
@@ -405,19 +380,12 @@ class JavaFlowchartGenerator:
                     method_title = Paragraph(f"Method: {method_name}", styles['Heading3'])
                     story.append(method_title)
 
-                    try:
-                        if flowchart:
-                            # Save PNG within self.directory
-                            png_path = os.path.join(temp_dir, f"{class_name}_{method_name}_flowchart.png")
-                            self.safe_write_png(flowchart, png_path)
-
-                            # Add the image to the PDF
-                            img = Image(png_path, width=6 * inch, height=4 * inch)
-                            story.append(img)
-                        else:
-                            story.append(Paragraph("No flowchart available (abstract method or interface)", styles['Normal']))
-                    except Exception as e:
-                        print(f"Error handling flowchart for {method_name}: {e}")
+                    if flowchart:
+                        # Added to the PDF as a vector drawing, or a placeholder if it could not be rendered
+                        svg_path = os.path.join(scratch_dir, f"{class_name}_{method_name}_flowchart.svg")
+                        story.append(self.flowchart_flowable(flowchart, svg_path, f"{class_name}.{method_name}", styles))
+                    else:
+                        story.append(Paragraph("No flowchart available (abstract method or interface)", styles['Normal']))
 
                     story.append(Spacer(1, 12))
 
@@ -429,3 +397,5 @@ class JavaFlowchartGenerator:
         except Exception as e:
             print(f"Error generating PDF: {e}")
             return {'error': str(e)}
+        finally:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
@@ -1,10 +1,14 @@
-import ast
 import pydot
 import os
 import sys
+import shutil
+import tempfile
 import logging
-import multiprocessing
 from django.conf import settings
+from codeModel.builder import get_codebase_model
+from codeModel.sources import resolve_workspace
+from codeModel.records import Statement
+from classDiagram.rendering import graph_drawing
 from typing import Dict, List, Tuple, Union
 from datetime import datetime
 from reportlab.lib.pagesizes import letter
@@ -20,7 +24,7 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 class FunctionInfo:
     def __init__(self, name: str):
         self.name = name
-        self.statements: List[ast.AST] = []
+        self.statements: List[Statement] = []
 
 class ClassInfo:
     def __init__(self, name: str):
@@ -33,10 +37,12 @@ class ClassInfo:
 
 
 class PythonFlowchartGenerator:
-    def __init__(self, directory, author, doc_id):
+    def __init__(self, directory, author, doc_id, workspace=None):
         self.author = author
         self.doc_id = doc_id
-        self.directory = f"{settings.MEDIA_ROOT}/{author}/{directory}"
+        self.dir_name = directory
+        self.diagnostics = []  # files skipped during analysis
+        self.directory, self.sources = resolve_workspace(workspace, author, directory)  # upload folder, or the in-memory files of a small upload
 
     def create_header_footer(self, canvas, doc):
         """Create a minimalist header and footer with separating lines"""
@@ -98,15 +104,15 @@ class PythonFlowchartGenerator:
         
         canvas.restoreState()
 
-    def safe_write_png(self, graph, filename):
-        output_path = os.path.join(self.directory, filename)
-        try:
-            graph.write_png(output_path)
-            logging.info(f"Generated: {output_path}")
-        except Exception as e:
-            logging.error(f"Error writing {filename}: {str(e)}")
+    def flowchart_flowable(self, graph, svg_path, title, styles):
+        """The flowchart as a vector drawing, or a placeholder when it could not be rendered."""
+        drawing = graph_drawing(graph, svg_path, 6*inch, 4*inch)
+        if drawing is not None:
+            return drawing
+        self.diagnostics.append({'file': '', 'kind': 'render', 'message': f"{title}: flowchart could not be drawn"})
+        return Paragraph(f"Flowchart of {title} could not be drawn (its layout failed or took too long).", self.placeholder_style)
 
-    def analyze_complexity(self, statements: List[ast.AST]) -> Dict:
+    def analyze_complexity(self, statements: List[Statement]) -> Dict:
         complexity = 1  # Base complexity
         control_structures = {
             'if': 0,
@@ -116,16 +122,16 @@ class PythonFlowchartGenerator:
         }
         
         for stmt in statements:
-            if isinstance(stmt, (ast.If, ast.For, ast.While)):
+            if stmt.kind in ('If', 'For', 'While'):
                 complexity += 1
             
-            if isinstance(stmt, ast.If):
+            if stmt.kind == 'If':
                 control_structures['if'] += 1
-            elif isinstance(stmt, ast.For):
+            elif stmt.kind == 'For':
                 control_structures['for'] += 1
-            elif isinstance(stmt, ast.While):
+            elif stmt.kind == 'While':
                 control_structures['while'] += 1
-            elif isinstance(stmt, ast.Try):
+            elif stmt.kind == 'Try':
                 control_structures['try'] += 1
         
         return {
@@ -147,51 +153,27 @@ class PythonFlowchartGenerator:
     #         logging.error(f"Error writing {filename}: {str(e)}")
     #         # return {'error':f'Error writing {filename}: {str(e)}'}
 
-    def analyze_python_file(self, file_path: str) -> Dict[str, Union[ClassInfo, FunctionInfo]]:
-        elements = {}
-        with open(file_path, 'r') as file:
-            try:
-                tree = ast.parse(file.read(), filename=file_path)
-            except SyntaxError as e:
-                logging.error(f"Syntax error in {file_path}: {e}")
-                return {'error':f'Syntax error in {file_path}: {e}'}
-
-            for node in ast.iter_child_nodes(tree):
-                if isinstance(node, ast.ClassDef):
-                    class_name = node.name
-                    class_info = ClassInfo(class_name)
-                    
-                    for item in node.body:
-                        if isinstance(item, ast.FunctionDef):
-                            method_info = FunctionInfo(item.name)
-                            method_info.statements = item.body
-                            class_info.methods[item.name] = method_info
-                    
-                    elements[class_name] = class_info
-                elif isinstance(node, ast.FunctionDef):
-                    function_name = node.name
-                    function_info = FunctionInfo(function_name)
-                    function_info.statements = node.body
-                    elements[function_name] = function_info
-
-        return elements
-
-    def list_python_files(self) -> List[str]:
-        python_files = []
-        for root, _, files in os.walk(self.directory):
-            for file in files:
-                if file.endswith('.py'):
-                    python_files.append(os.path.join(root, file))
-        return python_files
+    def function_info_from_record(self, record) -> FunctionInfo:
+        function_info = FunctionInfo(record.name)
+        function_info.statements = list(record.statements)
+        return function_info
 
-    def analyze_directory(self) -> Dict[str, Union[ClassInfo, FunctionInfo]]:
+    def analyze_directory(self, model=None) -> Dict[str, Union[ClassInfo, FunctionInfo]]:
         all_elements = {}
-        file_paths = self.list_python_files()
-        
-        with multiprocessing.Pool() as pool:
-            results = pool.map(self.analyze_python_file, file_paths)
-            for result in results:
-                all_elements.update(result)
+        if model is None:
+            model = get_codebase_model(self.sources, 'python')
+        self.diagnostics = model.diagnostics()
+
+        for file_model in model.parsed_files():
+            for record in file_model.classes:
+                if not record.top_level:
+                    continue
+                class_info = ClassInfo(record.name)
+                for method in record.methods:
+                    class_info.methods[method.name] = self.function_info_from_record(method)
+                all_elements[record.name] = class_info
+            for function in file_model.functions:
+                all_elements[function.name] = self.function_info_from_record(function)
         
         return all_elements
 
@@ -206,8 +188,8 @@ class PythonFlowchartGenerator:
 
         prev_node = start
         for i, stmt in enumerate(func_info.statements):
-            if isinstance(stmt, ast.If):
-                if_node = pydot.Node(f"if_{i}", label=f"If\n{ast.unparse(stmt.test)}", shape="diamond")
+            if stmt.kind == 'If':
+                if_node = pydot.Node(f"if_{i}", label=f"If\n{stmt.label}", shape="diamond")
                 graph.add_node(if_node)
                 graph.add_edge(pydot.Edge(prev_node, if_node))
                 
@@ -220,13 +202,13 @@ class PythonFlowchartGenerator:
                 graph.add_edge(pydot.Edge(if_node, false_node, label="No"))
                 
                 prev_node = if_node
-            elif isinstance(stmt, (ast.For, ast.While)):
-                loop_node = pydot.Node(f"loop_{i}", label=f"{type(stmt).__name__} loop", shape="diamond")
+            elif stmt.kind in ('For', 'While'):
+                loop_node = pydot.Node(f"loop_{i}", label=f"{stmt.kind} loop", shape="diamond")
                 graph.add_node(loop_node)
                 graph.add_edge(pydot.Edge(prev_node, loop_node))
                 prev_node = loop_node
             else:
-                node = pydot.Node(f"stmt_{i}", label=type(stmt).__name__)
+                node = pydot.Node(f"stmt_{i}", label=stmt.kind)
                 graph.add_node(node)
                 graph.add_edge(pydot.Edge(prev_node, node))
                 prev_node = node
@@ -249,11 +231,12 @@ class PythonFlowchartGenerator:
         return flowcharts
 
     def generate_pdf(self, flowcharts, output_path):
+        # The SVGs only feed the PDF, so they go to a private scratch folder, never the upload folder
+        scratch_dir = tempfile.mkdtemp(prefix='flowchart-')
         try:
-            current_dir = f"{settings.MEDIA_URL}/{self.author}"
-            current_dir = self.directory
             doc = SimpleDocTemplate(output_path, pagesize=letter)
             styles = getSampleStyleSheet()
+            self.placeholder_style = ParagraphStyle('FlowchartPlaceholder', parent=styles['Normal'], textColor=colors.Color(0.5, 0.5, 0.5))
             story = []
 
             title = Paragraph("Python Flowcharts", styles['Title'])
@@ -269,25 +252,22 @@ class PythonFlowchartGenerator:
                         method_title = Paragraph(f"Method: {method_name}", styles['Heading3'])
                         story.append(method_title)
 
-                        png_path = os.path.join(current_dir, f"{name}_{method_name}_flowchart.png")
-                        self.safe_write_png(flowchart, png_path)
-
-                        img = Image(png_path, width=6*inch, height=4*inch)
-                        story.append(img)
+                        svg_path = os.path.join(scratch_dir, f"{name}_{method_name}_flowchart.svg")
+                        story.append(self.flowchart_flowable(flowchart, svg_path, f"{name}.{method_name}", styles))
                         story.append(Spacer(1, 12))
                 else:  # Function
                     function_title = Paragraph(f"Function: {name}", styles['Heading2'])
                     story.append(function_title)
 
-                    png_path = os.path.join(current_dir, f"{name}_flowchart.png")
-                    self.safe_write_png(item, png_path)
-
-                    img = Image(png_path, width=6*inch, height=4*inch)
-                    story.append(img)
+                    svg_path = os.path.join(scratch_dir, f"{name}_flowchart.svg")
+                    story.append(self.flowchart_flowable(item, svg_path, name, styles))
                     story.append(Spacer(1, 12))
 
             # Build the PDF with header and footer
             doc.build(story, onFirstPage=self.create_header_footer, onLaterPages=self.create_header_footer)
             return {'message':'pdf successfully generated'}
         except Exception as e:
+            logging.exception(f"Error generating {output_path}")
             return {'error':'error in generating pdf'}
+        finally:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
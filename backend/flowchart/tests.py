@@ -1,3 +1,55 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from unittest import mock
+import pydot
+from django.test import SimpleTestCase
+from .python_flowcharts import PythonFlowchartGenerator
+from .java_flowcharts import JavaFlowchartGenerator
 
-# Create your tests here.
+
+def simple_graph():
+    graph = pydot.Dot(graph_type='digraph')
+    graph.add_edge(pydot.Edge('start', 'end'))
+    return graph
+
+
+class FlowchartPlaceholderTests(SimpleTestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir, ignore_errors=True)
+        self.output_path = os.path.join(self.output_dir, 'flowchart.pdf')
+
+    def generate(self, generator_class, flowcharts, render_result):
+        generator = generator_class('proj', 'alice', 1, self.output_dir)
+        rendered = []
+
+        def render_graph(graph, svg_path, output_format):
+            rendered.append(svg_path)
+            if isinstance(render_result, Exception):
+                raise render_result
+            open(svg_path, 'w').close()  # partial SVG left behind by a failed layout
+            return render_result
+
+        with mock.patch('classDiagram.rendering.render_graph', render_graph):
+            result = generator.generate_pdf(flowcharts, self.output_path)
+        return generator, result, rendered
+
+    def test_python_method_without_layout_gets_a_placeholder(self):
+        generator, result, rendered = self.generate(
+            PythonFlowchartGenerator, {'Shop': {'checkout': simple_graph()}, 'main': simple_graph()}, None
+        )
+        self.assertNotIn('error', result)
+        self.assertTrue(os.path.exists(self.output_path))
+        self.assertEqual([d['message'] for d in generator.diagnostics],
+                         ['Shop.checkout: flowchart could not be drawn', 'main: flowchart could not be drawn'])
+        self.assertFalse(any(os.path.exists(path) for path in rendered))
+
+    def test_java_method_that_fails_to_render_gets_a_placeholder(self):
+        generator, result, rendered = self.generate(
+            JavaFlowchartGenerator, {'Shop': {'checkout': simple_graph()}}, FileNotFoundError('dot')
+        )
+        self.assertNotIn('error', result)
+        self.assertTrue(os.path.exists(self.output_path))
+        self.assertEqual([d['message'] for d in generator.diagnostics], ['Shop.checkout: flowchart could not be drawn'])
+        self.assertFalse(any(os.path.exists(path) for path in rendered))
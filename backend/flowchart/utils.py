@@ -4,11 +4,12 @@ from django.conf import settings
 from django.utils.text import slugify
 import os
 
-def process_file(directory, author, language, doc_id):
+def process_file(directory, author, language, doc_id, workspace=None, output_dir=None):
+    """Write the flowchart PDF into output_dir, by default the author's results folder."""
     if language=='python':
-        process = PythonFlowchartGenerator(directory, author, doc_id)
+        process = PythonFlowchartGenerator(directory, author, doc_id, workspace)
     elif language == 'java':
-        process = JavaFlowchartGenerator(directory, author, doc_id)
+        process = JavaFlowchartGenerator(directory, author, doc_id, workspace)
     else:
         return {'error': f"{language} not supported for flowchart generation"}
     
@@ -27,7 +28,7 @@ def process_file(directory, author, language, doc_id):
     # media_root = settings.MEDIA_ROOT  # Use physical path for saving files
     safe_directory = slugify(directory)  # Converts "my directory" -> "my-directory"
     file_name = f"flowchart_{safe_directory}.pdf"
-    output_dir = os.path.join(settings.MEDIA_ROOT, author, "results")
+    output_dir = output_dir or os.path.join(settings.MEDIA_ROOT, author, "results")
     os.makedirs(output_dir, exist_ok=True)  # Creates the directory if it doesn't exist
     output_path = os.path.join(output_dir, file_name)
 
@@ -37,5 +38,6 @@ def process_file(directory, author, language, doc_id):
     # Return the success response with file name and path
     return {
         'file_name': file_name,
-        'file_path': output_path
+        'file_path': output_path,
+        'diagnostics': process.diagnostics
     }
\ No newline at end of file
@@ -1,12 +1,13 @@
 import os
-import re
 import logging
 from dataclasses import dataclass
 from datetime import datetime
-import glob
 from typing import List, Set
 import plantuml
 from django.conf import settings
+from codeModel.builder import get_codebase_model
+from codeModel.sources import resolve_workspace
+from codeModel.records import FileModel
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -30,13 +31,14 @@ class Message:
     file_source: str = ""
 
 class JavaSequenceDiagramGenerator:
-    def __init__(self, directory, author, doc_id):
+    def __init__(self, directory, author, doc_id, workspace=None):
         if directory is None:
             current_dir = os.path.dirname(os.path.abspath(__file__))
             project_root = os.path.dirname(current_dir)
             self.directory = os.path.join(project_root, 'testing', 'java')
+            self.sources = self.directory
         else:
-            self.directory = f'{settings.MEDIA_ROOT}/{author}/{directory}'
+            self.directory, self.sources = resolve_workspace(workspace, author, directory)  # upload folder, or the in-memory files of a small upload
 
         self.messages: List[Message] = []
         self.participants: Set[str] = set()
@@ -44,100 +46,73 @@ class JavaSequenceDiagramGenerator:
         self.files_analyzed: Set[str] = set()
         self.author = author
         self.doc_id = doc_id
+        self.dir_name = directory
+        self.diagnostics = []  # files skipped during analysis
         
-        if not os.path.exists(self.directory):
+        if isinstance(self.sources, str) and not os.path.exists(self.directory):
             raise ValueError(f"Directory does not exist: {self.directory}")
         
         logging.info(f"Initialized with directory: {self.directory}")
 
-    def _extract_class_name(self, content: str) -> str:
-        """Extract class name using regex."""
-        match = re.search(r'class\s+(\w+)', content)
-        return match.group(1) if match else None
-
-    def _extract_method_calls(self, content: str) -> List[tuple]:
-        """Extract method calls using regex patterns."""
-        # Pattern to match method calls like: objectName.methodName()
-        pattern = r'(\w+)\s*\.\s*(\w+)\s*\('
-        
-        method_calls = []
-        for match in re.finditer(pattern, content):
-            object_name, method_name = match.groups()
-            if object_name.lower() not in ['system', 'out', 'err']:  # Skip system calls
-                method_calls.append((object_name, method_name))
-        
-        return method_calls
-
-    def analyze_file(self, file_path: str):
-        try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                content = file.read()
-                
-                # Extract class name
-                class_name = self._extract_class_name(content)
-                if not class_name:
-                    logging.warning(f"Could not find class name in {file_path}")
-                    return {
-                        'status':'error',
-                        'error':f'Could not find class name in {file_path}'
-                    }
-
-                self.participants.add(class_name)
-                
-                # Extract method calls
-                method_calls = self._extract_method_calls(content)
-                
-                for object_name, method_name in method_calls:
-                    self.participants.add(object_name)
-                    
-                    # Determine message type based on method name
-                    message_type = 'dashed' if any(word in method_name.lower() 
-                                                 for word in ['get', 'fetch', 'retrieve', 'return']) else 'solid'
-                    
-                    description = (f"Method '{method_name}' called from {class_name} to {object_name}\n"
-                                 f"Source: {os.path.basename(file_path)}")
-                    
-                    self.messages.append(Message(
-                        from_participant=class_name,
-                        to_participant=object_name,
-                        message=f"{self.sequence_number}: {method_name}",
-                        sequence_number=self.sequence_number,
-                        message_type=message_type,
-                        description=description,
-                        file_source=file_path
-                    ))
-                    self.sequence_number += 1
-                
-                self.files_analyzed.add(file_path)
-                logging.info(f"Successfully analyzed: {os.path.basename(file_path)}")
-                return {
-                    'status':'success',
-                    'success':f"Successfully analyzed: {os.path.basename(file_path)}"
-                }
-                
-        except Exception as e:
-            logging.error(f"Error analyzing file {file_path}: {e}")
+    def analyze_file(self, file_model: FileModel):
+        file_path = file_model.path
+        class_name = file_model.primary_class
+        if not class_name:
+            logging.warning(f"Could not find class name in {file_path}")
             return {
                 'status':'error',
-                'error':f'Error analyzing file {file_path}: {e}'
+                'error':f'Could not find class name in {file_path}'
             }
 
-    def analyze_directory(self):
-        java_files = glob.glob(os.path.join(self.directory, "**/*.java"), recursive=True)
+        self.participants.add(class_name)
+        
+        for call in file_model.calls:
+            object_name, method_name = call.target, call.method
+            self.participants.add(object_name)
+            
+            # Determine message type based on method name
+            message_type = 'dashed' if any(word in method_name.lower() 
+                                         for word in ['get', 'fetch', 'retrieve', 'return']) else 'solid'
+            
+            description = (f"Method '{method_name}' called from {class_name} to {object_name}\n"
+                         f"Source: {os.path.basename(file_path)}")
+            
+            self.messages.append(Message(
+                from_participant=class_name,
+                to_participant=object_name,
+                message=f"{self.sequence_number}: {method_name}",
+                sequence_number=self.sequence_number,
+                message_type=message_type,
+                description=description,
+                file_source=file_path
+            ))
+            self.sequence_number += 1
+        
+        self.files_analyzed.add(file_path)
+        logging.info(f"Successfully analyzed: {os.path.basename(file_path)}")
+        return {
+            'status':'success',
+            'success':f"Successfully analyzed: {os.path.basename(file_path)}"
+        }
+
+    def analyze_directory(self, model=None):
+        if model is None:
+            model = get_codebase_model(self.sources, 'java')
+        self.diagnostics = model.diagnostics()
         
-        if not java_files:
+        if not model.files:
             logging.warning(f"No Java files found in {self.directory}")
             return {
                 'status':'error',
                 'error':f'No Java files found in {self.directory}'
             }
 
-        logging.info(f"Found {len(java_files)} Java files to analyze")
+        logging.info(f"Found {len(model.files)} Java files to analyze")
         success_count = 0
         
-        for file_path in java_files:
-            logging.info(f"Analyzing file: {os.path.basename(file_path)}")
-            if self.analyze_file(file_path):
+        for file_model in model.files:
+            logging.info(f"Analyzing file: {os.path.basename(file_model.path)}")
+            if self.analyze_file(file_model):
                 success_count += 1
         
         if success_count > 0:
@@ -187,24 +162,6 @@ skinparam sequence {
         plantuml_str += "@enduml"
         return plantuml_str
     
-    def _extract_class_name(self, content: str) -> str:
-        """Extract class name using regex."""
-        match = re.search(r'class\s+(\w+)', content)
-        return match.group(1) if match else None
-
-    def _extract_method_calls(self, content: str) -> List[tuple]:
-        """Extract method calls using regex patterns."""
-        # Pattern to match method calls like: objectName.methodName()
-        pattern = r'(\w+)\s*\.\s*(\w+)\s*\('
-        
-        method_calls = []
-        for match in re.finditer(pattern, content):
-            object_name, method_name = match.groups()
-            if object_name.lower() not in ['system', 'out', 'err']:  # Skip system calls
-                method_calls.append((object_name, method_name))
-        
-        return method_calls
-    
     def create_header_footer(self, canvas, doc):
         """Create a minimalist header and footer with separating lines"""
         canvas.saveState()
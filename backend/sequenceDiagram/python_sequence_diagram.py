@@ -1,15 +1,16 @@
-import ast
 import os
 import logging
 from dataclasses import dataclass
 from typing import List, Dict
 import plantuml
 from datetime import datetime
-import glob
 import sys
 import requests
 import io
 from django.conf import settings
+from codeModel.builder import get_codebase_model
+from codeModel.sources import resolve_workspace
+from codeModel.records import FileModel
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -30,13 +31,14 @@ class Message:
     file_source: str = ""
 
 class MultiFileSequenceDiagramGenerator:
-    def __init__(self, directory, author, doc_id):
+    def __init__(self, directory, author, doc_id, workspace=None):
         if directory is None:
             current_dir = os.path.dirname(os.path.abspath(__file__))
             project_root = os.path.dirname(current_dir)
             self.directory = os.path.join(project_root, 'testing', 'python_seq')
+            self.sources = self.directory
         else:
-            self.directory = f'{settings.MEDIA_ROOT}/{author}/{directory}'
+            self.directory, self.sources = resolve_workspace(workspace, author, directory)  # upload folder, or the in-memory files of a small upload
             
         self.messages = []
         self.participants = set()
@@ -44,26 +46,30 @@ class MultiFileSequenceDiagramGenerator:
         self.files_analyzed = set()
         self.author = author
         self.doc_id = doc_id
+        self.dir_name = directory
+        self.diagnostics = []  # files skipped during analysis
 
         
-        if not os.path.exists(self.directory):
+        if isinstance(self.sources, str) and not os.path.exists(self.directory):
             raise ValueError(f"Directory does not exist: {self.directory}")
         
         logging.info(f"Initialized with directory: {self.directory}")
 
-    def analyze_directory(self):
-        python_files = glob.glob(os.path.join(self.directory, "**/*.py"), recursive=True)
+    def analyze_directory(self, model=None):
+        if model is None:
+            model = get_codebase_model(self.sources, 'python')
+        self.diagnostics = model.diagnostics()
         
-        if not python_files:
+        if not model.files:
             logging.warning(f"No Python files found in {self.directory}")
             return {
                 'status':'error',
                 'error':f'No Python files found in {self.directory}'}
 
-        logging.info(f"Found {len(python_files)} Python files to analyze")
-        for file_path in python_files:
-            logging.info(f"Analyzing file: {os.path.basename(file_path)}")
-            self.analyze_file(file_path)
+        logging.info(f"Found {len(model.files)} Python files to analyze")
+        for file_model in model.files:
+            logging.info(f"Analyzing file: {os.path.basename(file_model.path)}")
+            self.analyze_file(file_model)
         
         if len(self.files_analyzed) > 0:
             return {'status':'success'}
@@ -71,83 +77,50 @@ class MultiFileSequenceDiagramGenerator:
             return {'status':'error',
                     'error':'no python files analyzed'}
 
-    def analyze_file(self, file_path: str):
-        try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                try:
-                    tree = ast.parse(file.read())
-                    self._analyze_tree(tree, file_path)
-                    self.files_analyzed.add(file_path)
-                    logging.info(f"Successfully analyzed: {os.path.basename(file_path)}")
-                    return {
-                        'status':'message',
-                        'message':f"Successfully analyzed: {os.path.basename(file_path)}"
-                    }
-                except SyntaxError as e:
-                    logging.error(f"Syntax error in {file_path}: {e}")
-                    return {
-                        'status':'error',
-                        'error':f'Syntax error in {file_path}: {e}'
-                    }
-        except Exception as e:
-            logging.error(f"Error reading file {file_path}: {e}")
+    def analyze_file(self, file_model: FileModel):
+        file_path = file_model.path
+        if file_model.error:
+            logging.error(file_model.error)
             return {
                 'status':'error',
-                'error':f'Error reading file {file_path}: {e}'
+                'error':file_model.error
             }
 
-    def _analyze_tree(self, tree, file_path):
-        class MethodVisitor(ast.NodeVisitor):
-            def __init__(self, outer, source_file):
-                self.outer = outer
-                self.current_class = None
-                self.current_method = None
-                self.source_file = source_file
-
-            def visit_ClassDef(self, node):
-                self.current_class = node.name
-                self.outer.participants.add(node.name)
-                self.generic_visit(node)
+        self.participants.update(record.name for record in file_model.classes)
+        for call in file_model.calls:
+            self._add_message(call, file_path)
+        self.files_analyzed.add(file_path)
+        logging.info(f"Successfully analyzed: {os.path.basename(file_path)}")
+        return {
+            'status':'message',
+            'message':f"Successfully analyzed: {os.path.basename(file_path)}"
+        }
 
-            def visit_FunctionDef(self, node):
-                self.current_method = node.name
-                docstring = ast.get_docstring(node)
-                
-                for stmt in node.body:
-                    if isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Call):
-                        self._analyze_call(stmt.value, docstring)
-                
-                self.generic_visit(node)
-
-            def _analyze_call(self, call, docstring=""):
-                if isinstance(call.func, ast.Attribute) and isinstance(call.func.value, ast.Name):
-                    from_participant = self.current_class or "System"
-                    to_participant = call.func.value.id
-                    message = call.func.attr
-                    logging.info(f"Adding message from {from_participant} to {to_participant} with message '{message}'")
-                    
-                    message_type = 'dashed' if any(word in message.lower() 
-                                                 for word in ['return', 'get', 'fetch', 'retrieve']) else 'solid'
-                    
-                    description = (f"Method '{message}' called from {from_participant} to {to_participant}\n"
-                                 f"Source: {os.path.basename(self.source_file)}")
-                    if docstring:
-                        description += f"\nDescription: {docstring}"
-
-                    self.outer.participants.add(to_participant)
-                    self.outer.messages.append(Message(
-                        from_participant=from_participant,
-                        to_participant=to_participant,
-                        message=f"{self.outer.sequence_number}: {message}",
-                        sequence_number=self.outer.sequence_number,
-                        message_type=message_type,
-                        description=description,
-                        file_source=self.source_file
-                    ))
-                    self.outer.sequence_number += 1
+    def _add_message(self, call, source_file):
+        from_participant = call.caller or "System"
+        to_participant = call.target
+        message = call.method
+        logging.info(f"Adding message from {from_participant} to {to_participant} with message '{message}'")
+        
+        message_type = 'dashed' if any(word in message.lower() 
+                                     for word in ['return', 'get', 'fetch', 'retrieve']) else 'solid'
+        
+        description = (f"Method '{message}' called from {from_participant} to {to_participant}\n"
+                     f"Source: {os.path.basename(source_file)}")
+        if call.docstring:
+            description += f"\nDescription: {call.docstring}"
 
-        visitor = MethodVisitor(self, file_path)
-        visitor.visit(tree)
+        self.participants.add(to_participant)
+        self.messages.append(Message(
+            from_participant=from_participant,
+            to_participant=to_participant,
+            message=f"{self.sequence_number}: {message}",
+            sequence_number=self.sequence_number,
+            message_type=message_type,
+            description=description,
+            file_source=source_file
+        ))
+        self.sequence_number += 1
         
 
     def generate_plantuml(self) -> str:
@@ -3,12 +3,13 @@ from django.conf import settings
 from .python_sequence_diagram import MultiFileSequenceDiagramGenerator
 from .java_sequence_diagram import JavaSequenceDiagramGenerator
 
-def process_file(directory, author, language, doc_id):
+def process_file(directory, author, language, doc_id, workspace=None, output_dir=None):
+    """Write the sequence diagram PDF into output_dir, by default the author's results folder."""
     # Validate the language
     if language == 'python':
-        process = MultiFileSequenceDiagramGenerator(directory, author, doc_id)
+        process = MultiFileSequenceDiagramGenerator(directory, author, doc_id, workspace)
     elif language == 'java':
-        process = JavaSequenceDiagramGenerator(directory, author, doc_id)
+        process = JavaSequenceDiagramGenerator(directory, author, doc_id, workspace)
     else:
         return {'error': f"{language} not supported for class diagram generation"}
 
@@ -18,7 +19,9 @@ def process_file(directory, author, language, doc_id):
         return analysis_result
     
     file_name = f"sequence_diagram_{directory}.pdf"
-    output_path = os.path.join(settings.MEDIA_ROOT, author, 'results', file_name)
+    output_dir = output_dir or os.path.join(settings.MEDIA_ROOT, author, 'results')
+    os.makedirs(output_dir, exist_ok=True)
+    output_path = os.path.join(output_dir, file_name)
 
     # Generate the PDF
     pdf_result = process.generate_pdf(output_path)
@@ -29,5 +32,6 @@ def process_file(directory, author, language, doc_id):
     # Return the success response with file name and path
         return {
             'file_name': file_name,
-            'file_path': output_path
+            'file_path': output_path,
+            'diagnostics': process.diagnostics
         }
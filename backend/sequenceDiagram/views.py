@@ -2,6 +2,7 @@ from django.shortcuts import render
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from uploadMate.models import FileNest, FileEntry
+from uploadMate.workspaces import WorkspaceGone, workspace_for
 from .models import SequenceDiagramNest, SequenceDiagramEntry
 from uploadMate.models import FileNest  # Import FileNest model to fetch uploaded code file
 from django.conf import settings
@@ -35,7 +36,12 @@ def generate_sequence_diagram_view(request, doc_id):
     language = file_nest.language
     directory = file_nest.dir_name
 
-    diagram_result = process_file(directory, author, language, doc_id)
+    try:
+        workspace = workspace_for(file_nest)
+    except WorkspaceGone as e:
+        return Response({'error': str(e)}, status=status.HTTP_410_GONE)
+
+    diagram_result = process_file(directory, author, language, doc_id, workspace)
 
     if diagram_result.get('error'):
         return Response({'error':diagram_result['error']})
@@ -51,5 +57,6 @@ def generate_sequence_diagram_view(request, doc_id):
     print('sequence diagram file generated')
     return Response({
         'message': 'Sequence Diagram generated successfully',
-        'file_url': file_url
+        'file_url': file_url,
+        'diagnostics': diagram_result.get('diagnostics', [])
     }, status=status.HTTP_200_OK)
@@ -5,6 +5,7 @@ from django.conf import settings
 from datetime import datetime
 from reportlab.lib import colors
 import google.generativeai as genai
+from codeModel.sources import MemoryTree, resolve_workspace
 
 genai.configure(api_key=settings.GENERATIVE_AI_API_KEY)
 
@@ -118,10 +119,11 @@ def generate_combined_pdf(contents, output_file):
 
 
 # Generate a summary for a single file
-def generate_file_summary(file_path):
-    """Generate a summary for a single file."""
+def generate_file_summary(file_path, code_content=None):
+    """Generate a summary for a single file; `code_content` skips reading it from disk."""
     try:
-        code_content = read_code_file(file_path)
+        if code_content is None:
+            code_content = read_code_file(file_path)
         combined_prompt = f"Summarize the code:\n\n{code_content}"
         
         model = genai.GenerativeModel("gemini-1.5-flash")
@@ -135,17 +137,23 @@ def generate_file_summary(file_path):
         return f"Error summarizing {file_path}: {str(e)}"
 
 # Process a directory of files
-def process_directory(directory, author):
-    dir_path = f"{settings.MEDIA_ROOT}/{author}/{directory}"
+def process_directory(directory, author, workspace=None, output_dir=None):
+    dir_path, sources = resolve_workspace(workspace, author, directory)
     """Process a directory and generate a combined summary PDF."""
     summaries = []
-    for root, _, files in os.walk(dir_path):
-        for file_name in files:
-            file_path = os.path.join(root, file_name)
-            summary = generate_file_summary(file_path)
-            summaries.append(f"File: {file_name}\n\n{summary}")
-
-    output_dir = os.path.join(settings.MEDIA_ROOT, author, "results")
+    if isinstance(sources, MemoryTree):
+        # Small uploads are summarized straight from the upload buffers
+        for file_path, data in sources.items():
+            summary = generate_file_summary(file_path, data.decode('utf-8', errors='replace'))
+            summaries.append(f"File: {os.path.basename(file_path)}\n\n{summary}")
+    else:
+        for root, _, files in os.walk(dir_path):
+            for file_name in files:
+                file_path = os.path.join(root, file_name)
+                summary = generate_file_summary(file_path)
+                summaries.append(f"File: {file_name}\n\n{summary}")
+
+    output_dir = output_dir or os.path.join(settings.MEDIA_ROOT, author, "results")
     os.makedirs(output_dir, exist_ok=True)
 
     output_file_name = f"summary_{directory}.pdf"
@@ -155,10 +163,10 @@ def process_directory(directory, author):
     return output_file_path,output_file_name
 
 # Example function to handle a request
-def process_file(directory, author):
-    """Handle a directory upload and generate a combined summary."""
+def process_file(directory, author, workspace=None, output_dir=None):
+    """Handle a directory upload and generate a combined summary into output_dir (default: the author's results folder)."""
     try:
-        output_path, output_file_name = process_directory(directory, author)
+        output_path, output_file_name = process_directory(directory, author, workspace, output_dir)
         return {
             'summary_path': output_path,
             'summary_file_name': output_file_name}
@@ -2,6 +2,7 @@ from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from .models import SummaryNest, SummaryEntry
 from uploadMate.models import FileNest, FileEntry  # Import FileNest model to fetch uploaded code file
+from uploadMate.workspaces import WorkspaceGone, workspace_for
 from django.conf import settings
 from rest_framework import status
 from django.core.files import File  # Import Django's File object
@@ -34,7 +35,12 @@ def generate_summary_view(request, doc_id):
     language = file_nest.language
     directory = file_nest.dir_name
 
-    summary_result = process_file(directory, author)
+    try:
+        workspace = workspace_for(file_nest)
+    except WorkspaceGone as e:
+        return Response({'error': str(e)}, status=status.HTTP_410_GONE)
+
+    summary_result = process_file(directory, author, workspace)
 
     if 'error' in summary_result:
         return Response({'error':summary_result['error']}, status = status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -0,0 +1,148 @@
+import os
+import stat
+import hashlib
+import tarfile
+import zipfile
+import logging
+from typing import List
+from django.conf import settings
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+ARCHIVE_EXTENSIONS = ('.zip', '.tar.gz', '.tgz')
+SOURCE_EXTENSIONS = ('.py', '.pyw', '.java')
+COPY_CHUNK_SIZE = 64 * 1024
+
+
+class ArchiveError(ValueError):
+    pass
+
+
+def is_archive_name(name: str) -> bool:
+    return name.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def safe_member_path(name: str) -> str:
+    """Normalise an archive member name, rejecting anything that would land outside the upload."""
+    name = name.replace('\\', '/')
+    if name.startswith('/') or (len(name) > 1 and name[1] == ':'):
+        raise ArchiveError(f"Absolute paths are not allowed: {name}")
+    parts = [part for part in name.split('/') if part not in ('', '.')]
+    if '..' in parts:
+        raise ArchiveError(f"Path traversal is not allowed: {name}")
+    return '/'.join(parts)
+
+
+class ArchiveExtractor:
+    """
+    Streams the source files of an archive into a directory, one member at a time.
+    Only .py/.pyw/.java members are written; sizes are counted from the bytes
+    actually decompressed, so archive headers cannot be used to slip past the limits.
+    """
+
+    def __init__(self, destination: str):
+        self.destination = destination
+        self.max_files = settings.UPLOAD_MAX_FILES
+        self.max_file_bytes = settings.UPLOAD_MAX_FILE_BYTES
+        self.max_total_bytes = settings.UPLOAD_MAX_TOTAL_BYTES
+        self.total_bytes = 0
+        self.extracted: List[str] = []  # paths relative to destination
+        self.extracted_set = set()
+        self.hashes = {}  # relative path -> (sha256, size)
+        self.skipped = 0
+
+    def extract(self, uploaded_file) -> List[str]:
+        name = uploaded_file.name.lower()
+        uploaded_file.seek(0)
+        try:
+            if name.endswith('.zip'):
+                self.extract_zip(uploaded_file)
+            elif name.endswith(('.tar.gz', '.tgz')):
+                self.extract_tar(uploaded_file)
+            else:
+                raise ArchiveError(f"Unsupported archive type: {uploaded_file.name}")
+        except (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError) as e:
+            self.cleanup()
+            raise ArchiveError(f"Could not read archive {uploaded_file.name}: {e}")
+        except ArchiveError:
+            self.cleanup()
+            raise
+
+        if not self.extracted:
+            raise ArchiveError(f"No {', '.join(SOURCE_EXTENSIONS)} files found in {uploaded_file.name}")
+        logging.info(f"Extracted {len(self.extracted)} source files ({self.total_bytes} bytes) "
+                     f"from {uploaded_file.name}, skipped {self.skipped} other entries")
+        return self.extracted
+
+    def extract_zip(self, fileobj):
+        with zipfile.ZipFile(fileobj) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                # Symlinks are stored as regular entries with the link flag in the unix mode bits
+                if stat.S_ISLNK(info.external_attr >> 16):
+                    self.skipped += 1
+                    continue
+                relative_path = self.accept(info.filename)
+                if relative_path:
+                    with archive.open(info) as source:
+                        self.write_member(source, relative_path)
+
+    def extract_tar(self, fileobj):
+        # 'r|gz' reads the archive strictly forward, without buffering it first
+        with tarfile.open(fileobj=fileobj, mode='r|gz') as archive:
+            for member in archive:
+                if not member.isfile():  # directories, links and devices are never written
+                    if not member.isdir():
+                        self.skipped += 1
+                    continue
+                relative_path = self.accept(member.name)
+                if relative_path:
+                    source = archive.extractfile(member)
+                    self.write_member(source, relative_path)
+
+    def accept(self, member_name: str):
+        relative_path = safe_member_path(member_name)
+        if not relative_path.endswith(SOURCE_EXTENSIONS):
+            self.skipped += 1
+            return None
+        if len(self.extracted) >= self.max_files:
+            raise ArchiveError(f"Archive has more than {self.max_files} source files")
+        return relative_path
+
+    def write_member(self, source, relative_path: str):
+        target = os.path.join(self.destination, relative_path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        written = 0
+        digest = hashlib.sha256()
+        try:
+            with open(target, 'wb') as output:
+                for chunk in iter(lambda: source.read(COPY_CHUNK_SIZE), b''):
+                    written += len(chunk)
+                    digest.update(chunk)
+                    self.total_bytes += len(chunk)
+                    if written > self.max_file_bytes:
+                        raise ArchiveError(f"{relative_path} is larger than {self.max_file_bytes} bytes")
+                    if self.total_bytes > self.max_total_bytes:
+                        raise ArchiveError(f"Archive expands to more than {self.max_total_bytes} bytes")
+                    output.write(chunk)
+        except Exception:
+            os.remove(target)
+            raise
+        self.hashes[relative_path] = (digest.hexdigest(), written)
+        if relative_path not in self.extracted_set:  # a later duplicate member overwrites the earlier one
+            self.extracted_set.add(relative_path)
+            self.extracted.append(relative_path)
+
+    def cleanup(self):
+        """Remove whatever was written before the archive was rejected."""
+        for relative_path in self.extracted:
+            try:
+                os.remove(os.path.join(self.destination, relative_path))
+            except FileNotFoundError:
+                pass
+        self.extracted = []
+        self.extracted_set = set()
+        for root, _, _ in os.walk(self.destination, topdown=False):
+            if not os.listdir(root):
+                os.rmdir(root)
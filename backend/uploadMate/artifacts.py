@@ -0,0 +1,88 @@
+import os
+import re
+import logging
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from codeModel.cache import content_hash
+from .models import Artifact, ArtifactPointer
+from .retention import record_artifact, result_name, results_path
+from .storage import is_local, local_path, put_file
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Hex digits of the content hash put into artifact names
+NAME_HASH_LENGTH = 16
+IMMUTABLE_NAME = re.compile(r'\.[0-9a-f]{%d}\.[A-Za-z0-9]+$' % NAME_HASH_LENGTH)
+# Content-hashed artifacts never change, so browsers and CDNs may keep them for a year
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def immutable_name(file_name: str, sha256: str) -> str:
+    """class_diagram_proj.pdf -> class_diagram_proj.<hash>.pdf"""
+    stem, extension = os.path.splitext(file_name)
+    return f"{stem}.{sha256[:NAME_HASH_LENGTH]}{extension}"
+
+
+def is_immutable_name(file_name: str) -> bool:
+    return bool(IMMUTABLE_NAME.search(file_name))
+
+
+def artifact_url(author: str, file_name: str) -> str:
+    return f"{settings.MEDIA_URL}{author}/results/{file_name}"
+
+
+def job_output_dir(author: str, job_id) -> str:
+    """
+    A folder only this job writes to. Concurrent jobs for the same (author, dir_name) would
+    otherwise write and publish the same fixed name. It lives in the author's results folder,
+    so publishing locally is a rename on the same file system; the caller removes it.
+    """
+    path = results_path(author, f".job-{job_id}")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def point_latest(file_nest, file_url: str):
+    """Make the artifact behind file_url the latest one for the upload's (author, dir_name, docType)."""
+    artifact = Artifact.objects.filter(author=file_nest.author, file_name=os.path.basename(file_url)).first()
+    if artifact is None:
+        return
+    ArtifactPointer.objects.update_or_create(
+        author=file_nest.author, dir_name=file_nest.dir_name, docType=file_nest.docType,
+        defaults={'artifact': artifact, 'updated_at': timezone.now()}
+    )
+
+
+def catalog_fields(file_nest, source_hash: str = '') -> dict:
+    return {
+        'dir_name': file_nest.dir_name,
+        'docType': file_nest.docType,
+        'language': file_nest.language,
+        'source_hash': source_hash,
+    }
+
+
+def publish_artifact(file_nest, source: str, source_hash: str = '') -> str:
+    """
+    Move a document the generator wrote to the local path `source` to a content-hashed name,
+    record it and point "latest" at it. Returns the immutable URL. Earlier versions keep
+    their own names, so links handed out before stay valid until retention removes them.
+    """
+    author = file_nest.author
+    sha256 = content_hash(source)
+    file_name = immutable_name(os.path.basename(source), sha256)
+    name = result_name(author, file_name)
+    if default_storage.exists(name):
+        os.remove(source)  # the same document was published before
+    elif is_local():
+        os.replace(source, local_path(name))
+    else:
+        with open(source, 'rb') as document:
+            put_file(name, document)
+        os.remove(source)
+
+    file_url = artifact_url(author, file_name)
+    record_artifact(author, file_url, sha256=sha256, **catalog_fields(file_nest, source_hash))
+    point_latest(file_nest, file_url)
+    return file_url
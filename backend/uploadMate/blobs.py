@@ -0,0 +1,150 @@
+import os
+import re
+import hashlib
+import logging
+import tempfile
+from typing import Iterable, List, Tuple
+from django.core.files.storage import Storage, default_storage, storages
+from django.utils import timezone
+from .models import BlobOwner
+from .storage import COPY_CHUNK_SIZE, local_path, put_file
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+SHA256_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+# Hashes per query when collecting blobs, well under SQLite's bound parameter limit
+COLLECT_BATCH_SIZE = 500
+
+
+class BlobError(ValueError):
+    pass
+
+
+def blob_storage() -> Storage:
+    return storages['blobs']
+
+
+def blob_name(sha256: str) -> str:
+    if not SHA256_PATTERN.match(sha256):
+        raise BlobError(f"Not a sha256 digest: {sha256}")
+    return f"{sha256[:2]}/{sha256}"
+
+
+def has_blob(sha256: str) -> bool:
+    return blob_storage().exists(blob_name(sha256))
+
+
+def blob_size(sha256: str) -> int:
+    return blob_storage().size(blob_name(sha256))
+
+
+def delete_blob(sha256: str):
+    blob_storage().delete(blob_name(sha256))
+
+
+def missing_blobs(author: str, hashes: Iterable[str]) -> List[str]:
+    """
+    Hashes the author still has to send, each listed once, in first-seen order: those the
+    store lacks, and those only other authors have sent. A hash alone never proves the
+    caller has the file, so it cannot pull another author's source into its upload.
+    Blobs the author already owns are marked as used, which keeps them from collection.
+    """
+    hashes = list(dict.fromkeys(hashes))
+    owned = set()
+    for start in range(0, len(hashes), COLLECT_BATCH_SIZE):
+        owned.update(BlobOwner.objects.filter(
+            author=author, sha256__in=hashes[start:start + COLLECT_BATCH_SIZE]
+        ).values_list('sha256', flat=True))
+    missing = [sha256 for sha256 in hashes if sha256 not in owned or not has_blob(sha256)]
+    present = list(owned - set(missing))
+    for start in range(0, len(present), COLLECT_BATCH_SIZE):
+        BlobOwner.objects.filter(author=author, sha256__in=present[start:start + COLLECT_BATCH_SIZE]).update(
+            last_used_at=timezone.now()
+        )
+    return missing
+
+
+def own_blob(author: str, sha256: str):
+    """Record that the author sent the bytes of sha256."""
+    BlobOwner.objects.update_or_create(author=author, sha256=sha256, defaults={'last_used_at': timezone.now()})
+
+
+def collect_blobs(unused_since) -> int:
+    """
+    Forget the ownerships no manifest has used since the cutoff, then delete the blobs no
+    author owns any more; returns how many. Uploads placed from a blob keep their own
+    hardlink or copy, so deleting it never touches a workspace.
+    """
+    removed = 0
+    stale = BlobOwner.objects.filter(last_used_at__lt=unused_since)
+    while True:
+        batch = list(stale.values_list('id', 'sha256')[:COLLECT_BATCH_SIZE])
+        if not batch:
+            return removed
+        hashes = {sha256 for _, sha256 in batch}
+        BlobOwner.objects.filter(id__in=[row_id for row_id, _ in batch]).delete()
+        still_owned = set(BlobOwner.objects.filter(sha256__in=hashes).values_list('sha256', flat=True))
+        for sha256 in hashes - still_owned:
+            delete_blob(sha256)
+            removed += 1
+
+
+def store_blob(uploaded_file, max_bytes: int) -> Tuple[str, bool]:
+    """Copy an uploaded file into the store, hashing it on the way; returns (sha256, newly added)."""
+    storage = blob_storage()
+    store_dir = local_path('', storage)
+    if store_dir is not None:
+        os.makedirs(store_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    written = 0
+    # Spooled next to the blobs when they are local, so the final rename stays on one file system
+    fd, tmp_path = tempfile.mkstemp(dir=store_dir, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as output:
+            for chunk in uploaded_file.chunks(COPY_CHUNK_SIZE):
+                written += len(chunk)
+                if written > max_bytes:
+                    raise BlobError(f"{uploaded_file.name} is larger than {max_bytes} bytes")
+                digest.update(chunk)
+                output.write(chunk)
+        sha256 = digest.hexdigest()
+        name = blob_name(sha256)
+        if storage.exists(name):
+            os.remove(tmp_path)
+            return sha256, False
+        if store_dir is None:
+            with open(tmp_path, 'rb') as source:
+                put_file(name, source, storage)
+            os.remove(tmp_path)
+        else:
+            target = local_path(name, storage)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.chmod(tmp_path, 0o444)  # blobs are shared between uploads and must never be edited in place
+            os.replace(tmp_path, target)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return sha256, True
+
+
+def place_blob(sha256: str, name: str, storage: Storage = default_storage):
+    """
+    Place a blob in the upload storage under name: a hardlink when both stores are on this
+    machine (a copy across file systems), otherwise streamed from one store to the other.
+    """
+    source = local_path(blob_name(sha256), blob_storage())
+    target = local_path(name, storage)
+    if source is None or target is None:
+        with blob_storage().open(blob_name(sha256), 'rb') as blob:
+            put_file(name, blob, storage)
+        return
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    if os.path.lexists(target):
+        os.remove(target)
+    try:
+        os.link(source, target)
+    except OSError:
+        with open(source, 'rb') as blob, open(target, 'wb') as output:
+            for chunk in iter(lambda: blob.read(COPY_CHUNK_SIZE), b''):
+                output.write(chunk)
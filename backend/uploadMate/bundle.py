@@ -0,0 +1,108 @@
+import os
+import shutil
+import logging
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections
+from codeModel.builder import get_codebase_model
+from codeModel.sources import resolve_workspace
+from .generators import PART_GENERATORS, generate_part
+from .workspaces import WorkspaceGone, workspace_for
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+BUNDLE_DOC_TYPE = 'bundle'
+BUNDLE_FORMATS = ('pdf', 'zip')
+
+
+def warm_analysis(file_nest):
+    """Parse the upload once before the generators start, so they all share the memoized model."""
+    directory, sources = resolve_workspace(workspace_for(file_nest), file_nest.author, file_nest.dir_name)
+    if isinstance(sources, str) and not os.path.exists(directory):
+        return
+    if file_nest.language in ('python', 'java'):
+        get_codebase_model(sources, file_nest.language)
+
+
+def run_part(doc_type, file_nest, output_dir) -> dict:
+    """Run one generator of the bundle in a worker thread; never raises."""
+    try:
+        return generate_part(doc_type, file_nest, output_dir)
+    except Exception as e:
+        logging.exception(f"Bundle part {doc_type} of upload {file_nest.id} crashed")
+        return {'error': str(e)}
+    finally:
+        close_old_connections()
+
+
+def merge_pdfs(paths, titles, output_path):
+    from pypdf import PdfWriter  # only bundles need it
+
+    writer = PdfWriter()
+    for path, title in zip(paths, titles):
+        writer.append(path, outline_item=title)  # one bookmark per document
+    with open(output_path, 'wb') as output:
+        writer.write(output)
+    writer.close()
+
+
+def zip_documents(paths, output_path):
+    with zipfile.ZipFile(output_path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for path in paths:
+            archive.write(path, arcname=os.path.basename(path))
+
+
+def generate_bundle(file_nest, output_dir) -> dict:
+    """
+    Generate every document type for one upload into output_dir: the sources are parsed
+    once, the generators (LLM summaries, Graphviz and PlantUML renders) run concurrently,
+    and their documents are merged into one PDF or packed into one zip (BUNDLE_FORMAT).
+    The parts are written to a temp folder of their own and only live inside the bundle.
+    Parts that fail are reported in the diagnostics; the bundle fails only if all do.
+    """
+    try:
+        warm_analysis(file_nest)
+    except WorkspaceGone as e:
+        return {'error': str(e)}
+    parts_dir = tempfile.mkdtemp(prefix='parts-', dir=output_dir)
+    try:
+        with ThreadPoolExecutor(max_workers=settings.BUNDLE_WORKERS, thread_name_prefix='bundle') as pool:
+            futures = {doc_type: pool.submit(run_part, doc_type, file_nest, parts_dir) for doc_type in PART_GENERATORS}
+        results = {doc_type: future.result() for doc_type, future in futures.items()}
+
+        parts, titles, diagnostics = [], [], []
+        for doc_type, result in results.items():
+            for diagnostic in result.get('diagnostics', []):
+                if diagnostic not in diagnostics:  # the shared analysis reports the same files to every generator
+                    diagnostics.append(diagnostic)
+            if 'file_path' in result:
+                parts.append(result['file_path'])
+                titles.append(doc_type.title())
+            else:
+                diagnostics.append({'file': '', 'kind': 'bundle', 'message': f"{doc_type}: {result.get('error', result)}"})
+        if not parts:
+            return {'error': 'No document of the bundle could be generated', 'diagnostics': diagnostics}
+
+        bundle_format = settings.BUNDLE_FORMAT if settings.BUNDLE_FORMAT in BUNDLE_FORMATS else 'pdf'
+        output_path = os.path.join(output_dir, f"bundle_{file_nest.dir_name}.{bundle_format}")
+        if bundle_format == 'pdf':
+            merge_pdfs(parts, titles, output_path)
+        else:
+            zip_documents(parts, output_path)
+    finally:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+
+    return {
+        'file_path': output_path,
+        'message': f"Bundle of {len(parts)} of {len(PART_GENERATORS)} documents generated successfully",
+        'diagnostics': diagnostics,
+    }
+
+
+def generate_document(doc_type, file_nest, output_dir) -> dict:
+    """Write the upload's document of doc_type, a bundle included, into output_dir."""
+    if doc_type == BUNDLE_DOC_TYPE:
+        return generate_bundle(file_nest, output_dir)
+    return generate_part(doc_type, file_nest, output_dir)
@@ -0,0 +1,75 @@
+import json
+import base64
+import binascii
+from typing import List, Optional, Tuple
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from .models import Artifact
+
+# Orders history can be listed in; each has an index starting with author (plus the filtered field)
+SORT_FIELDS = ('created_at', 'size')
+FILTER_FIELDS = ('docType', 'dir_name', 'language')
+
+
+class CursorError(ValueError):
+    pass
+
+
+def encode_cursor(sort: str, artifact: Artifact) -> str:
+    value = getattr(artifact, sort.lstrip('-'))
+    position = [sort, value.isoformat() if hasattr(value, 'isoformat') else value, artifact.id]
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def is_integer(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def decode_cursor(cursor: str, sort: str):
+    """(sort value, artifact id) a page starts after; anything not made by encode_cursor raises CursorError."""
+    if not isinstance(cursor, str):
+        raise CursorError('Invalid cursor')
+    try:
+        cursor_sort, value, artifact_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, ValueError, TypeError):
+        raise CursorError('Invalid cursor')
+    if cursor_sort != sort:
+        raise CursorError('Cursor belongs to a different sort order')
+    if not is_integer(artifact_id):
+        raise CursorError('Invalid cursor')
+    if sort.lstrip('-') == 'created_at':
+        try:
+            value = parse_datetime(value) if isinstance(value, str) else None
+        except ValueError:  # well formed but not a real date, like month 13
+            value = None
+        if value is None:
+            raise CursorError('Invalid cursor')
+    elif not is_integer(value):
+        raise CursorError('Invalid cursor')
+    return value, artifact_id
+
+
+def history_page(author: str, filters: dict, sort: str = '-created_at', cursor: Optional[str] = None,
+                 limit: int = 50) -> Tuple[List[Artifact], Optional[str]]:
+    """
+    One page of the author's artifacts and the cursor of the next page (None on the last one).
+    Keyset pagination: the page starts right after the cursor's (sort value, id), so every
+    page is one index range scan, however deep the client has paged.
+    """
+    field = sort.lstrip('-')
+    if field not in SORT_FIELDS:
+        raise CursorError(f"sort must be one of {', '.join(SORT_FIELDS)}, optionally prefixed with '-'")
+    descending = sort.startswith('-')
+
+    artifacts = Artifact.objects.filter(author=author, **{key: filters[key] for key in FILTER_FIELDS if filters.get(key)})
+    if cursor:
+        value, artifact_id = decode_cursor(cursor, sort)
+        after = 'lt' if descending else 'gt'
+        artifacts = artifacts.filter(
+            Q(**{f'{field}__{after}': value}) | Q(**{field: value, f'id__{after}': artifact_id})
+        )
+    order = [f'-{field}', '-id'] if descending else [field, 'id']
+    page = list(artifacts.order_by(*order)[:limit + 1])
+    if len(page) > limit:
+        return page[:limit], encode_cursor(sort, page[limit - 1])
+    return page, None
@@ -0,0 +1,51 @@
+import logging
+from summaryGen.utils import process_file as summarize
+from classDiagram.utils import process_file as draw_class_diagram
+from sequenceDiagram.utils import process_file as draw_sequence_diagram
+from flowchart.utils import process_file as draw_flowcharts
+from .workspaces import WorkspaceGone, workspace_for
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def generate_summary(file_nest, workspace, output_dir) -> dict:
+    result = summarize(file_nest.dir_name, file_nest.author, workspace, output_dir)
+    if 'error' in result:
+        return result
+    return {'file_path': result['summary_path']}
+
+
+def diagram_generator(process_file):
+    def generate(file_nest, workspace, output_dir) -> dict:
+        return process_file(file_nest.dir_name, file_nest.author, file_nest.language, file_nest.id, workspace, output_dir)
+    return generate
+
+
+# Generator and success message of every single-document docType, in the order a bundle lists them
+PART_GENERATORS = {
+    'summary': (generate_summary, 'Summary generated successfully'),
+    'class diagram': (diagram_generator(draw_class_diagram), 'Class Diagram generated successfully'),
+    'sequence diagram': (diagram_generator(draw_sequence_diagram), 'Sequence Diagram generated successfully'),
+    'flowchart': (diagram_generator(draw_flowcharts), 'Flowchart generated successfully'),
+}
+
+
+def generate_part(doc_type, file_nest, output_dir) -> dict:
+    """
+    Write the upload's document of doc_type into output_dir, a folder private to the caller,
+    so concurrent jobs over the same (author, dir_name) never share a file. Returns its
+    file_path, message and diagnostics, or an error.
+    """
+    if doc_type not in PART_GENERATORS:
+        return {'error': f'{doc_type} is not a supported docType'}
+    if not file_nest.files.exists():
+        return {'error': 'No files found in the specified directory'}
+    try:
+        workspace = workspace_for(file_nest)
+    except WorkspaceGone as e:
+        return {'error': str(e)}
+    generate, message = PART_GENERATORS[doc_type]
+    result = generate(file_nest, workspace, output_dir)
+    if result.get('error'):
+        return {'error': result['error'], 'diagnostics': result.get('diagnostics', [])}
+    return {'file_path': result['file_path'], 'message': message, 'diagnostics': result.get('diagnostics', [])}
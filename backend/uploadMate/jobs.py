@@ -0,0 +1,197 @@
+import os
+import shutil
+import logging
+import tempfile
+import threading
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+from codeModel.cache import content_hash
+from .models import GenerationJob, ResultCacheEntry
+from .bundle import BUNDLE_DOC_TYPE, generate_document
+from .result_cache import lookup_result, store_result, result_cache_key, upload_tree_hash
+from .workspaces import release_workspace
+from .retention import process_owner, start_retention_service
+from .artifacts import job_output_dir, publish_artifact, point_latest, artifact_url, immutable_name
+from .usage import over_quota
+from .speculation import (
+    budget_left, cancel_speculation, real_work_finished, real_work_started, run_when_idle, speculative_doc_types
+)
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Process-wide pool of generation workers, created on first use
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor():
+    """Return the shared generation worker pool, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.GENERATION_WORKERS,
+                thread_name_prefix='generation'
+            )
+        return _executor
+
+def submit_job(job):
+    """Queue a generation job."""
+    submit_batch([[job]])
+
+def submit_batch(groups):
+    """Queue the jobs of a batch; each group runs on one worker, one job after the other."""
+    start_retention_service()
+    # Only this process's workers run the jobs; another process tells they are orphaned once it exits
+    GenerationJob.objects.filter(id__in=[job.id for group in groups for job in group]).update(owner=process_owner())
+    for group in groups:
+        for job in group:
+            # The real request will produce what speculation was about to
+            cancel_speculation(cache_key=job.cache_key)
+        real_work_started(len(group))
+        get_executor().submit(run_jobs, [job.id for job in group])
+
+def run_jobs(job_ids):
+    # Jobs over the same sources run in order, so later ones find the parse and result caches filled
+    for job_id in job_ids:
+        try:
+            run_job(job_id)
+        finally:
+            real_work_finished()
+
+def run_job(job_id):
+    """Run the generator for a queued job and record its outcome."""
+    close_old_connections()
+    try:
+        job = GenerationJob.objects.select_related('file_nest').get(id=job_id)
+    except GenerationJob.DoesNotExist:
+        logging.error(f"Generation job {job_id} no longer exists")
+        close_old_connections()
+        return
+
+    file_nest = job.file_nest
+    if job.status != GenerationJob.STATUS_QUEUED:
+        # Cancelled while it waited
+        release_workspace(file_nest)
+        close_old_connections()
+        return
+    job.status = GenerationJob.STATUS_RUNNING
+    job.started_at = timezone.now()
+    job.save(update_fields=['status', 'started_at'])
+
+    output_dir = None
+    try:
+        # Identical sources may have been documented while this job waited
+        cached_url = lookup_result(job.cache_key, file_nest) if job.cache_key else None
+        if cached_url:
+            job.status = GenerationJob.STATUS_DONE
+            job.file_url = cached_url
+            job.message = 'Served from result cache'
+            point_latest(file_nest, cached_url)
+            return
+
+        output_dir = job_output_dir(file_nest.author, job.id)
+        result = generate_document(file_nest.docType, file_nest, output_dir)
+        job.diagnostics = result.get('diagnostics', [])
+        if 'file_path' in result:
+            job.status = GenerationJob.STATUS_DONE
+            job.file_url = publish_artifact(file_nest, result['file_path'], source_hash=upload_tree_hash(file_nest))
+            job.message = result.get('message', '')
+            logging.info(f"Job {job_id} generated {job.file_url}")
+            store_result(job.cache_key, file_nest.docType, file_nest.language, file_nest.author, job.file_url)
+            # The next request is often another doc type of the same code
+            schedule_speculation(file_nest)
+        else:
+            job.status = GenerationJob.STATUS_FAILED
+            job.error = str(result.get('error', result))
+            logging.error(f"Job {job_id} failed: {job.error}")
+    except Exception as e:
+        job.status = GenerationJob.STATUS_FAILED
+        job.error = str(e)
+        logging.exception(f"Job {job_id} crashed")
+    finally:
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'file_url', 'message', 'error', 'diagnostics', 'finished_at'])
+        if output_dir:
+            # Whatever was not published: a failed document, sequence diagram images, ...
+            shutil.rmtree(output_dir, ignore_errors=True)
+        try:
+            release_workspace(file_nest)
+        except Exception as e:
+            logging.error(f"Error cleaning up workspace of upload {file_nest.id}: {e}")
+        close_old_connections()
+
+def schedule_speculation(file_nest):
+    """
+    Queue the upload's other doc types for pre-generation into the result cache, so a
+    follow-up request for them is served right away. The queued jobs keep the workspace
+    until they have run or were cancelled.
+    """
+    author = file_nest.author
+    if not settings.RESULT_CACHE_DIR or file_nest.docType == BUNDLE_DOC_TYPE:
+        return
+    if budget_left(author) <= 0 or over_quota(author):
+        return
+    root_hash = upload_tree_hash(file_nest)
+    for doc_type in speculative_doc_types(file_nest):
+        cache_key = result_cache_key(file_nest, root_hash, doc_type)
+        pending = GenerationJob.objects.filter(
+            cache_key=cache_key, status__in=[GenerationJob.STATUS_QUEUED, GenerationJob.STATUS_RUNNING]
+        )
+        if ResultCacheEntry.objects.filter(key=cache_key).exists() or pending.exists():
+            continue
+        job = GenerationJob.objects.create(file_nest=file_nest, cache_key=cache_key, speculative=True, docType=doc_type,
+                                           owner=process_owner())
+        run_when_idle(partial(run_speculative_job, job.id))
+
+def run_speculative_job(job_id):
+    """Generate a speculative job's document straight into the result cache; it is never published."""
+    try:
+        job = GenerationJob.objects.select_related('file_nest').get(id=job_id)
+    except GenerationJob.DoesNotExist:
+        return
+    file_nest = job.file_nest
+    author = file_nest.author
+    running = GenerationJob.objects.filter(id=job.id, status=GenerationJob.STATUS_RUNNING)
+    scratch_dir = None
+    try:
+        if job.status != GenerationJob.STATUS_QUEUED:
+            return
+        if budget_left(author) <= 0:
+            cancel_speculation(id=job.id)
+            logging.info(f"Speculation budget of {author} is used up, skipped {job.docType} of upload {file_nest.id}")
+            return
+        # Only claims the job if nothing cancelled it in the meantime
+        if not GenerationJob.objects.filter(id=job.id, status=GenerationJob.STATUS_QUEUED).update(
+                status=GenerationJob.STATUS_RUNNING, started_at=timezone.now()):
+            return
+
+        # Never the results folder: a real job for the same document may be writing there right now.
+        # Next to the cache, so store_result can hard-link the document instead of copying it.
+        os.makedirs(settings.RESULT_CACHE_DIR, exist_ok=True)
+        scratch_dir = tempfile.mkdtemp(prefix=f"speculation-{job.id}-", dir=settings.RESULT_CACHE_DIR)
+        result = generate_document(job.docType, file_nest, scratch_dir)
+        if 'file_path' not in result:
+            running.update(status=GenerationJob.STATUS_FAILED, finished_at=timezone.now(),
+                           error=str(result.get('error', result)))
+            return
+
+        output_path = result['file_path']
+        # A job cancelled while it ran is not cached
+        if running.exists():
+            file_url = artifact_url(author, immutable_name(os.path.basename(output_path), content_hash(output_path)))
+            store_result(job.cache_key, job.docType, file_nest.language, author, file_url, source_path=output_path)
+            running.update(status=GenerationJob.STATUS_DONE, finished_at=timezone.now(),
+                           message='Pre-generated into the result cache')
+    except Exception as e:
+        running.update(status=GenerationJob.STATUS_FAILED, finished_at=timezone.now(), error=str(e))
+        logging.exception(f"Speculative job {job_id} crashed")
+    finally:
+        if scratch_dir:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+        try:
+            release_workspace(file_nest)
+        except Exception as e:
+            logging.error(f"Error cleaning up workspace of upload {file_nest.id}: {e}")
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:22
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploadMate', '0007_alter_fileentry_file'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GenerationJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('message', models.CharField(blank=True, default='', max_length=500)),
+                ('file_url', models.CharField(blank=True, default='', max_length=5000)),
+                ('error', models.TextField(blank=True, default='')),
+                ('file_nest', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='uploadMate.filenest')),
+            ],
+        ),
+    ]
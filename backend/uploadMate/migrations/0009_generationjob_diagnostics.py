@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploadMate', '0008_generationjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generationjob',
+            name='diagnostics',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
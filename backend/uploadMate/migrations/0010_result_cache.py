@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:37
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploadMate', '0009_generationjob_diagnostics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResultCacheEntry',
+            fields=[
+                ('key', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('docType', models.CharField(max_length=100)),
+                ('language', models.CharField(max_length=100)),
+                ('file_name', models.CharField(max_length=5000)),
+                ('cached_path', models.CharField(max_length=5000)),
+                ('size', models.BigIntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_used_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='generationjob',
+            name='cache_key',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
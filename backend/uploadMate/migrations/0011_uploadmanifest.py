@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:40
+
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploadMate', '0010_result_cache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadManifest',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('language', models.CharField(max_length=100)),
+                ('author', models.CharField(max_length=100)),
+                ('docType', models.CharField(max_length=100)),
+                ('dir_name', models.CharField(max_length=5000)),
+                ('entries', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
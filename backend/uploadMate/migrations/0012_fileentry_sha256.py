@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploadMate', '0011_uploadmanifest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fileentry',
+            name='sha256',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='fileentry',
+            name='size',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:45
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploadMate', '0012_fileentry_sha256'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='filenest',
+            name='workspace',
+            field=models.UUIDField(default=uuid.uuid4, editable=False),
+        ),
+    ]
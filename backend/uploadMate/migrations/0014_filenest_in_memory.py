@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploadMate', '0013_filenest_workspace'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='filenest',
+            name='in_memory',
+            field=models.BooleanField(default=False),
+        ),
+    ]
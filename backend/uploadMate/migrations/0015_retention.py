@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:50
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def release_existing_workspaces(apps, schema_editor):
+    # Uploads from before usage tracking were never counted, so there is nothing to take off
+    apps.get_model('uploadMate', 'FileNest').objects.update(workspace_released=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploadMate', '0014_filenest_in_memory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorUsage',
+            fields=[
+                ('author', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('upload_bytes', models.BigIntegerField(default=0)),
+                ('result_bytes', models.BigIntegerField(default=0)),
+                ('result_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='filenest',
+            name='workspace_released',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+        migrations.RunPython(release_existing_workspaces, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='Artifact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('author', models.CharField(max_length=100)),
+                ('file_name', models.CharField(max_length=5000)),
+                ('size', models.BigIntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_used_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['author', 'last_used_at'], name='uploadMate__author_b31b4d_idx'), models.Index(fields=['last_used_at'], name='uploadMate__last_us_aca5ac_idx')],
+                'constraints': [models.UniqueConstraint(fields=('author', 'file_name'), name='unique_artifact_per_author')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:52
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploadMate', '0015_retention'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='artifact',
+            name='sha256',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.CreateModel(
+            name='ArtifactPointer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('author', models.CharField(max_length=100)),
+                ('dir_name', models.CharField(max_length=5000)),
+                ('docType', models.CharField(max_length=100)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('artifact', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pointers', to='uploadMate.artifact')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('author', 'dir_name', 'docType'), name='unique_latest_artifact')],
+            },
+        ),
+    ]
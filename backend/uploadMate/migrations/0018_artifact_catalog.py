@@ -0,0 +1,117 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:03
+
+import os
+import re
+from datetime import datetime, timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+# Generated names are <prefix><dir_name>[.<hash>].<extension>
+DOC_TYPE_PREFIXES = [
+    ('class_diagram_', 'class diagram'),
+    ('sequence_diagram_', 'sequence diagram'),
+    ('summary_', 'summary'),
+    ('flowchart_', 'flowchart'),
+    ('bundle_', 'bundle'),
+]
+NAME_HASH = re.compile(r'\.[0-9a-f]{16}$')
+
+
+def parse_result_name(file_name):
+    """(docType, dir_name) of a generated document's name, or blanks for names of no generator."""
+    stem = NAME_HASH.sub('', os.path.splitext(file_name)[0])
+    for prefix, doc_type in DOC_TYPE_PREFIXES:
+        if stem.startswith(prefix):
+            return doc_type, stem[len(prefix):]
+    return '', ''
+
+
+def catalog_existing_results(apps, schema_editor):
+    Artifact = apps.get_model('uploadMate', 'Artifact')
+    AuthorUsage = apps.get_model('uploadMate', 'AuthorUsage')
+    # Documents already tracked only lack what they are, which their names tell
+    for artifact in Artifact.objects.filter(docType='').iterator():
+        doc_type, dir_name = parse_result_name(artifact.file_name)
+        if doc_type:
+            Artifact.objects.filter(id=artifact.id).update(docType=doc_type, dir_name=dir_name)
+
+    # Documents generated before results were tracked are only known from the results folders
+    if not os.path.isdir(settings.MEDIA_ROOT):
+        return
+    for author in os.listdir(settings.MEDIA_ROOT):
+        results_dir = os.path.join(settings.MEDIA_ROOT, author, 'results')
+        if not os.path.isdir(results_dir):
+            continue
+        known = set(Artifact.objects.filter(author=author).values_list('file_name', flat=True))
+        artifacts = []
+        for entry in os.scandir(results_dir):
+            if not entry.is_file() or entry.name in known or entry.name.endswith('.png'):
+                continue
+            doc_type, dir_name = parse_result_name(entry.name)
+            stat = entry.stat()
+            generated_at = datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc)
+            artifacts.append(Artifact(
+                author=author, file_name=entry.name, size=stat.st_size, created_at=generated_at,
+                last_used_at=generated_at, docType=doc_type, dir_name=dir_name
+            ))
+        if not artifacts:
+            continue
+        Artifact.objects.bulk_create(artifacts, batch_size=500)
+        # Retention takes evicted documents off the usage, so they must be on it
+        AuthorUsage.objects.get_or_create(author=author)
+        AuthorUsage.objects.filter(author=author).update(
+            result_bytes=F('result_bytes') + sum(artifact.size for artifact in artifacts),
+            result_count=F('result_count') + len(artifacts),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploadMate', '0017_speculative_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='artifact',
+            name='dir_name',
+            field=models.CharField(blank=True, default='', max_length=5000),
+        ),
+        migrations.AddField(
+            model_name='artifact',
+            name='docType',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='artifact',
+            name='language',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='artifact',
+            name='source_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='artifact',
+            index=models.Index(fields=['author', 'created_at', 'id'], name='uploadMate__author_6219a5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='artifact',
+            index=models.Index(fields=['author', 'size', 'id'], name='uploadMate__author_c4087e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='artifact',
+            index=models.Index(fields=['author', 'docType', 'created_at', 'id'], name='uploadMate__author_62b40d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='artifact',
+            index=models.Index(fields=['author', 'dir_name', 'created_at', 'id'], name='uploadMate__author_b6a915_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='artifact',
+            index=models.Index(fields=['author', 'language', 'created_at', 'id'], name='uploadMate__author_2ba0a4_idx'),
+        ),
+        migrations.RunPython(catalog_existing_results, migrations.RunPython.noop),
+    ]
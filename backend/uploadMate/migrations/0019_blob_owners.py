@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:37
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def own_uploaded_blobs(apps, schema_editor):
+    # Authors keep the blobs of files they uploaded before ownership was tracked
+    BlobOwner = apps.get_model('uploadMate', 'BlobOwner')
+    FileEntry = apps.get_model('uploadMate', 'FileEntry')
+    pairs = FileEntry.objects.exclude(sha256='').values_list('file_nest__author', 'sha256').distinct()
+    BlobOwner.objects.bulk_create(
+        (BlobOwner(author=author, sha256=sha256) for author, sha256 in pairs.iterator()),
+        batch_size=500, ignore_conflicts=True
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploadMate', '0018_artifact_catalog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlobOwner',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('author', models.CharField(max_length=100)),
+                ('sha256', models.CharField(db_index=True, max_length=64)),
+                ('last_used_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('author', 'sha256'), name='unique_blob_owner')],
+            },
+        ),
+        migrations.RunPython(own_uploaded_blobs, migrations.RunPython.noop),
+    ]
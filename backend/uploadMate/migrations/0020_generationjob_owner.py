@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploadMate', '0019_blob_owners'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generationjob',
+            name='owner',
+            field=models.CharField(blank=True, default='', max_length=200),
+        ),
+    ]
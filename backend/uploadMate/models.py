@@ -1,12 +1,13 @@
 import os
+import uuid
 from django.db import models
 from django.utils import timezone
 from django.conf import settings
 
 # Function to handle file storage in a structured directory
 def upload_to_author(instance, filename):
-    # Structure: uploads/<author>/<dir_name>/<filename>
-    return os.path.join(settings.MEDIA_ROOT, instance.file_nest.author, instance.file_nest.dir_name, filename)
+    # Structure: uploads/<author>/workspaces/<workspace>/<dir_name>/<filename> (relative to MEDIA_ROOT, the storage adds the root)
+    return os.path.join(instance.file_nest.workspace_dir, filename)
 
 class FileNest(models.Model):
     language = models.CharField(max_length=100)  # Programming language
@@ -14,6 +15,19 @@ class FileNest(models.Model):
     docType = models.CharField(max_length=100)  # Documentation type (e.g., summary, class diagram)
     dateTime = models.DateTimeField(default=timezone.now)  # Time of upload
     dir_name = models.CharField(max_length=5000, default='default_directory')  # Directory name for structuring uploads
+    workspace = models.UUIDField(default=uuid.uuid4, editable=False)  # Private folder of this upload, so parallel uploads never share files
+    in_memory = models.BooleanField(default=False)  # Small upload analyzed from memory; its files never reach the disk
+    workspace_released = models.BooleanField(default=False, db_index=True)  # Workspace deleted and its bytes taken off the author's usage
+
+    @property
+    def workspace_root(self):
+        # Removed as a whole once the upload's jobs are finished
+        return os.path.join(self.author, 'workspaces', str(self.workspace))
+
+    @property
+    def workspace_dir(self):
+        # The uploaded directory itself, relative to MEDIA_ROOT; keeps dir_name as its last part
+        return os.path.join(self.workspace_root, self.dir_name)
 
     def __str__(self):
         return f"FileNest {self.id} - {self.docType} by {self.author}"
@@ -21,6 +35,145 @@ class FileNest(models.Model):
 class FileEntry(models.Model):
     file_nest = models.ForeignKey(FileNest, on_delete=models.CASCADE, related_name='files')  # Relationship with FileNest
     file = models.FileField(upload_to=upload_to_author, max_length=5000)  # File field for each file in the directory
+    sha256 = models.CharField(max_length=64, blank=True, default='', db_index=True)  # Content hash recorded while the file was received
+    size = models.BigIntegerField(null=True, blank=True)  # Bytes received
 
     def __str__(self):
         return f"FileEntry {self.id} for {self.file_nest}"
+
+
+class GenerationJob(models.Model):
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CANCELLED = 'cancelled'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+        (STATUS_CANCELLED, 'Cancelled'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)  # Job id handed back to the client
+    file_nest = models.ForeignKey(FileNest, on_delete=models.CASCADE, related_name='jobs')  # Upload the job generates docs for
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    created_at = models.DateTimeField(default=timezone.now)  # Time the job was queued
+    started_at = models.DateTimeField(null=True, blank=True)  # Time a worker picked the job up
+    finished_at = models.DateTimeField(null=True, blank=True)  # Time the job finished (done or failed)
+    message = models.CharField(max_length=500, blank=True, default='')  # Message returned by the generator
+    file_url = models.CharField(max_length=5000, blank=True, default='')  # URL of the generated document
+    error = models.TextField(blank=True, default='')  # Error reported by the generator, if any
+    diagnostics = models.JSONField(blank=True, default=list)  # Files skipped during analysis: [{file, kind, message}]
+    cache_key = models.CharField(max_length=64, blank=True, default='')  # Result cache key the output is stored under
+    speculative = models.BooleanField(default=False, db_index=True)  # Pre-generated into the result cache while workers are idle
+    docType = models.CharField(max_length=100, blank=True, default='')  # Documentation type generated, when not the upload's own
+    owner = models.CharField(max_length=200, blank=True, default='')  # Server process running the job: host:pid:boot token
+
+    @property
+    def doc_type(self):
+        return self.docType or self.file_nest.docType
+
+    def __str__(self):
+        return f"GenerationJob {self.id} ({self.status}) for {self.file_nest}"
+
+
+class UploadManifest(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)  # Handed back to the client for the second phase
+    language = models.CharField(max_length=100)
+    author = models.CharField(max_length=100)
+    docType = models.CharField(max_length=100)
+    dir_name = models.CharField(max_length=5000)
+    entries = models.JSONField(default=list)  # [{path, sha256, size}] describing the whole upload
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"UploadManifest {self.id} - {len(self.entries)} files by {self.author}"
+
+
+class BlobOwner(models.Model):
+    author = models.CharField(max_length=100)
+    sha256 = models.CharField(max_length=64, db_index=True)  # Blob the author has sent the bytes of
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)  # Uploaded or reused by a manifest; blobs idle for too long are collected
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['author', 'sha256'], name='unique_blob_owner'),
+        ]
+
+    def __str__(self):
+        return f"BlobOwner {self.author} of {self.sha256[:12]}"
+
+
+class ResultCacheEntry(models.Model):
+    key = models.CharField(max_length=64, primary_key=True)  # sha256 of tree hash, docType, language and generator version
+    docType = models.CharField(max_length=100)
+    language = models.CharField(max_length=100)
+    file_name = models.CharField(max_length=5000)  # Name the artifact is published under in an author's results folder
+    cached_path = models.CharField(max_length=5000)  # Copy of the artifact kept in RESULT_CACHE_DIR
+    size = models.BigIntegerField(default=0)  # Bytes on disk, counted against RESULT_CACHE_MAX_BYTES
+    created_at = models.DateTimeField(default=timezone.now)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)  # Least recently used entries are evicted first
+
+    def __str__(self):
+        return f"ResultCacheEntry {self.key[:12]} - {self.docType} ({self.file_name})"
+
+
+class Artifact(models.Model):
+    author = models.CharField(max_length=100)
+    file_name = models.CharField(max_length=5000)  # Name inside the author's results folder, content-hashed and never rewritten
+    sha256 = models.CharField(max_length=64, blank=True, default='')  # Hash of the document the name was derived from
+    size = models.BigIntegerField(default=0)  # Bytes on disk, counted against the author's quota
+    created_at = models.DateTimeField(default=timezone.now)  # Generation time
+    last_used_at = models.DateTimeField(default=timezone.now)  # Generated or served from cache; oldest are evicted first
+    # Catalog of what the document is, for the history listing
+    dir_name = models.CharField(max_length=5000, blank=True, default='')
+    docType = models.CharField(max_length=100, blank=True, default='')
+    language = models.CharField(max_length=100, blank=True, default='')
+    source_hash = models.CharField(max_length=64, blank=True, default='')  # Tree hash of the sources it was generated from
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['author', 'last_used_at']),
+            models.Index(fields=['last_used_at']),
+            # History pages: one index per filter and sort order, each ending in id for the keyset
+            models.Index(fields=['author', 'created_at', 'id']),
+            models.Index(fields=['author', 'size', 'id']),
+            models.Index(fields=['author', 'docType', 'created_at', 'id']),
+            models.Index(fields=['author', 'dir_name', 'created_at', 'id']),
+            models.Index(fields=['author', 'language', 'created_at', 'id']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['author', 'file_name'], name='unique_artifact_per_author'),
+        ]
+
+    def __str__(self):
+        return f"Artifact {self.file_name} by {self.author}"
+
+
+class AuthorUsage(models.Model):
+    author = models.CharField(max_length=100, primary_key=True)
+    upload_bytes = models.BigIntegerField(default=0)  # Uploads whose workspace is still held
+    result_bytes = models.BigIntegerField(default=0)  # Artifacts in the author's results folder
+    result_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"AuthorUsage {self.author}: {self.upload_bytes + self.result_bytes} bytes"
+
+
+class ArtifactPointer(models.Model):
+    author = models.CharField(max_length=100)
+    dir_name = models.CharField(max_length=5000)
+    docType = models.CharField(max_length=100)
+    artifact = models.ForeignKey(Artifact, on_delete=models.CASCADE, related_name='pointers')  # Latest version; evicting it drops the pointer
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['author', 'dir_name', 'docType'], name='unique_latest_artifact'),
+        ]
+
+    def __str__(self):
+        return f"Latest {self.docType} of {self.author}/{self.dir_name}: {self.artifact.file_name}"
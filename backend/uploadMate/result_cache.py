@@ -0,0 +1,187 @@
+import os
+import shutil
+import hashlib
+import logging
+from typing import Iterable, List, Optional, Tuple
+from django.conf import settings
+from django.db.models import Sum
+from django.utils import timezone
+from django.core.files.storage import default_storage
+from .models import ResultCacheEntry
+from .retention import record_artifact, result_name
+from .storage import COPY_CHUNK_SIZE, fetch_file, local_path, put_file
+from .artifacts import is_immutable_name, catalog_fields
+from .bundle import BUNDLE_DOC_TYPE, PART_GENERATORS
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Bump a docType's version whenever its generator output changes, so older artifacts are not served
+GENERATOR_VERSIONS = {
+    'summary': 1,
+    'class diagram': 4,
+    'sequence diagram': 1,
+    'flowchart': 2,
+    'bundle': 1,
+}
+
+
+def tree_hash(root_name: str, files: Iterable[Tuple[str, str]]) -> str:
+    """
+    Merkle hash of a file tree given as (relative path, sha256) pairs: every file
+    contributes its name and content hash, every directory its name and tree hash,
+    and the root its own name, which the generated documents print.
+    """
+    tree = {}
+    for relative_path, sha256 in files:
+        *dirs, name = relative_path.split('/')
+        node = tree
+        for part in dirs:
+            node = node.setdefault(part, {})
+        node[name] = sha256
+
+    def node_hash(node: dict) -> str:
+        digest = hashlib.sha256()
+        for name in sorted(node):
+            child = node[name]
+            if isinstance(child, dict):
+                digest.update(f"d {name} {node_hash(child)}\n".encode())
+            else:
+                digest.update(f"f {name} {child}\n".encode())
+        return digest.hexdigest()
+
+    return hashlib.sha256(f"{root_name}\n{node_hash(tree)}".encode()).hexdigest()
+
+
+def upload_files(file_nest) -> List[Tuple[str, str]]:
+    """(relative path, sha256) for every file of an upload, hashing from disk only what was not recorded on receipt."""
+    upload_dir = file_nest.workspace_dir
+    files = []
+    for entry in file_nest.files.all():
+        relative_path = os.path.relpath(entry.file.name, upload_dir).replace(os.sep, '/')
+        files.append((relative_path, entry.sha256 or stored_hash(entry.file.name)))
+    return files
+
+
+def stored_hash(name: str) -> str:
+    digest = hashlib.sha256()
+    with default_storage.open(name, 'rb') as stored:
+        for chunk in stored.chunks(COPY_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def upload_tree_hash(file_nest) -> str:
+    return tree_hash(file_nest.dir_name, upload_files(file_nest))
+
+
+def recorded_tree_hash(file_nest) -> Optional[str]:
+    """The upload's tree hash from the hashes recorded on receipt only, or None if any file lacks one."""
+    upload_dir = file_nest.workspace_dir
+    files = []
+    for name, sha256 in file_nest.files.values_list('file', 'sha256'):
+        if not sha256:
+            return None  # e.g. uploads from before hashes were recorded, whose files may be gone
+        files.append((os.path.relpath(name, upload_dir).replace(os.sep, '/'), sha256))
+    return tree_hash(file_nest.dir_name, files)
+
+
+def generator_version(doc_type: str) -> str:
+    """Version of a generator's output, including the settings that change it."""
+    version = str(GENERATOR_VERSIONS.get(doc_type, 0))
+    if doc_type == 'class diagram':
+        layout = (settings.CLASS_DIAGRAM_MODE, settings.CLASS_DIAGRAM_CORE_SIZE, settings.CLASS_DIAGRAM_NODE_BUDGET,
+                  settings.CLASS_DIAGRAM_EXTERNAL_TYPES)
+        version = '.'.join([version] + [str(value) for value in layout])
+    elif doc_type == BUNDLE_DOC_TYPE:
+        # A bundle changes with any of its parts and with its format
+        version = '.'.join([version, settings.BUNDLE_FORMAT] + [generator_version(part) for part in PART_GENERATORS])
+    return version
+
+
+def result_cache_key(file_nest, root_hash: Optional[str] = None, doc_type: Optional[str] = None) -> str:
+    """Key of the upload's document of doc_type (default: the upload's own docType)."""
+    doc_type = doc_type or file_nest.docType
+    version = generator_version(doc_type)
+    root_hash = root_hash or upload_tree_hash(file_nest)
+    return hashlib.sha256(f"{root_hash}:{doc_type}:{file_nest.language}:{version}".encode()).hexdigest()
+
+
+def lookup_result(key: str, file_nest) -> Optional[str]:
+    """Publish a cached artifact into the upload author's results folder and return its URL, or None on a miss."""
+    if not settings.RESULT_CACHE_DIR:
+        return None
+    entry = ResultCacheEntry.objects.filter(key=key).first()
+    if entry is None:
+        return None
+
+    author = file_nest.author
+    name = result_name(author, entry.file_name)
+    try:
+        # A content-hashed name already there holds the same bytes
+        if not (is_immutable_name(entry.file_name) and default_storage.exists(name)):
+            with open(entry.cached_path, 'rb') as cached:
+                put_file(name, cached)
+    except FileNotFoundError:
+        logging.warning(f"Result cache entry {key} lost its file, dropping it")
+        entry.delete()
+        return None
+
+    ResultCacheEntry.objects.filter(key=key).update(last_used_at=timezone.now())
+    file_url = f"{settings.MEDIA_URL}{author}/results/{entry.file_name}"
+    record_artifact(author, file_url, **catalog_fields(file_nest, upload_tree_hash(file_nest)))
+    return file_url
+
+
+def store_result(key: str, doc_type: str, language: str, author: str, file_url: str, source_path: Optional[str] = None):
+    """
+    Keep a copy of a freshly generated artifact under its cache key. The artifact is read
+    from the published file_url, or from source_path when it was never published.
+    """
+    if not settings.RESULT_CACHE_DIR or not key:
+        return
+    file_name = os.path.basename(file_url)
+    name = result_name(author, file_name)
+    source_path = source_path or local_path(name)
+    cached_path = os.path.join(settings.RESULT_CACHE_DIR, key + os.path.splitext(file_name)[1])
+    try:
+        os.makedirs(settings.RESULT_CACHE_DIR, exist_ok=True)
+        # Published artifacts are never rewritten, so the cache can share their bytes
+        if os.path.exists(cached_path):
+            os.remove(cached_path)
+        if source_path is None:
+            fetch_file(name, cached_path)
+        else:
+            try:
+                os.link(source_path, cached_path)
+            except OSError:
+                shutil.copyfile(source_path, cached_path)
+    except OSError as e:
+        logging.error(f"Could not cache result {file_name}: {e}")
+        return
+
+    ResultCacheEntry.objects.update_or_create(key=key, defaults={
+        'docType': doc_type,
+        'language': language,
+        'file_name': file_name,
+        'cached_path': cached_path,
+        'size': os.path.getsize(cached_path),
+        'last_used_at': timezone.now(),
+    })
+    evict_results()
+
+
+def evict_results():
+    """Drop least recently used artifacts until the cache fits in RESULT_CACHE_MAX_BYTES."""
+    total = ResultCacheEntry.objects.aggregate(total=Sum('size'))['total'] or 0
+    if total <= settings.RESULT_CACHE_MAX_BYTES:
+        return
+    for entry in ResultCacheEntry.objects.order_by('last_used_at').iterator():
+        if total <= settings.RESULT_CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(entry.cached_path)
+        except FileNotFoundError:
+            pass
+        total -= entry.size
+        entry.delete()
+    logging.info(f"Result cache trimmed to {total} bytes")
@@ -0,0 +1,228 @@
+import os
+import uuid
+import socket
+import logging
+import threading
+from datetime import timedelta
+from typing import Optional
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Artifact, AuthorUsage, FileNest, GenerationJob
+from .usage import adjust_usage, over_quota
+from .workspaces import release_workspace
+from .blobs import collect_blobs
+from .speculation import cancel_speculation
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# An author over quota is trimmed to this share of it, so the next few results fit without another pass
+QUOTA_TARGET_RATIO = 0.9
+
+# Process-wide collector thread, started on first use
+_collector = None
+_collector_lock = threading.Lock()
+_wakeup = threading.Event()
+_orphans_failed = False
+# Identity of this server process as recorded on the jobs it runs, per pid so forked workers get their own
+_process_owner = (None, '')
+
+
+def results_path(author: str, file_name: str) -> str:
+    """Where generators write a document on this machine, before it is published to the storage."""
+    return os.path.join(settings.MEDIA_ROOT, author, 'results', file_name)
+
+
+def result_name(author: str, file_name: str) -> str:
+    """Name of a published document in the storage."""
+    return f"{author}/results/{file_name}"
+
+
+def record_artifact(author: str, file_url: str, sha256: str = '', **catalog) -> Optional[Artifact]:
+    """
+    Track a document just written to (or served again from) the author's results folder.
+    `catalog` holds what the document is: dir_name, docType, language and source_hash.
+    """
+    file_name = os.path.basename(file_url)
+    try:
+        size = default_storage.size(result_name(author, file_name))
+    except Exception as e:  # OSError locally, botocore errors from S3-compatible storages
+        logging.error(f"Could not record artifact {file_name}: {e}")
+        return None
+
+    now = timezone.now()
+    with transaction.atomic():
+        artifact, created = Artifact.objects.select_for_update().get_or_create(
+            author=author, file_name=file_name,
+            defaults={'sha256': sha256, 'size': size, 'created_at': now, 'last_used_at': now, **catalog}
+        )
+        if created:
+            adjust_usage(author, result_bytes=size, result_count=1)
+        else:
+            # Regenerated or served again: only the difference in size changes the usage
+            adjust_usage(author, result_bytes=size - artifact.size)
+            Artifact.objects.filter(id=artifact.id).update(size=size, last_used_at=now, **catalog)
+
+    if over_quota(author):
+        request_collection()
+    return artifact
+
+
+def remove_artifact(artifact: Artifact):
+    default_storage.delete(result_name(artifact.author, artifact.file_name))
+    if Artifact.objects.filter(id=artifact.id).delete()[0]:
+        adjust_usage(artifact.author, result_bytes=-artifact.size, result_count=-1)
+
+
+def trim_author(author: str) -> int:
+    """Evict the author's least recently used results until usage is back under the quota target."""
+    usage = AuthorUsage.objects.filter(author=author).first()
+    if usage is None:
+        return 0
+    total = usage.upload_bytes + usage.result_bytes
+    target = settings.AUTHOR_QUOTA_BYTES * QUOTA_TARGET_RATIO
+    removed = 0
+    for artifact in Artifact.objects.filter(author=author).order_by('last_used_at').iterator():
+        if total <= target:
+            break
+        remove_artifact(artifact)
+        total -= artifact.size
+        removed += 1
+    return removed
+
+
+def process_owner() -> str:
+    """host:pid:boot token of this process; the token tells it apart from an earlier process that had its pid."""
+    global _process_owner
+    pid = os.getpid()
+    if _process_owner[0] != pid:
+        _process_owner = (pid, f"{socket.gethostname()}:{pid}:{uuid.uuid4().hex[:12]}")
+    return _process_owner[1]
+
+
+def owner_exited(owner: str) -> bool:
+    """
+    Whether the process that owned a job is known to be gone. Processes on other hosts, and
+    jobs queued before owners were recorded, are never known to be: the WORKSPACE_MAX_AGE_HOURS
+    sweep of collect_garbage fails those once they are old enough.
+    """
+    host, _, rest = owner.partition(':')
+    pid, _, _ = rest.partition(':')
+    if host != socket.gethostname() or not pid.isdigit() or os.name != 'posix':
+        return False
+    if int(pid) == os.getpid():
+        return owner != process_owner()
+    try:
+        os.kill(int(pid), 0)  # signal 0 only checks that the process exists
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        return False  # exists, under another user
+    return False
+
+
+def fail_jobs(jobs, reason: str) -> int:
+    """
+    Fail the queued and running jobs among `jobs`, which no worker will finish, so release_workspace
+    no longer waits for them; then release their uploads' workspaces.
+    """
+    stale = jobs.filter(status__in=[GenerationJob.STATUS_QUEUED, GenerationJob.STATUS_RUNNING])
+    file_nest_ids = set(stale.values_list('file_nest_id', flat=True))
+    failed = stale.update(status=GenerationJob.STATUS_FAILED, finished_at=timezone.now(), error=reason)
+    for file_nest in FileNest.objects.filter(id__in=file_nest_ids, workspace_released=False).iterator():
+        release_workspace(file_nest)
+    if failed:
+        logging.warning(f"Failed {failed} stale jobs: {reason}")
+    return failed
+
+
+def fail_stale_jobs(created_before, reason: str) -> int:
+    """Fail the unfinished jobs created before the given time, whichever process owns them."""
+    return fail_jobs(GenerationJob.objects.filter(created_at__lt=created_before), reason)
+
+
+def fail_orphaned_jobs() -> int:
+    """Fail the unfinished jobs of server processes on this host that have exited, such as before a restart."""
+    unfinished = GenerationJob.objects.filter(
+        status__in=[GenerationJob.STATUS_QUEUED, GenerationJob.STATUS_RUNNING]
+    ).exclude(owner='')
+    exited = [owner for owner in unfinished.values_list('owner', flat=True).distinct() if owner_exited(owner)]
+    if not exited:
+        return 0
+    return fail_jobs(unfinished.filter(owner__in=exited), 'The server process running the job exited, generate it again')
+
+
+def collect_garbage() -> dict:
+    """One pass of every retention policy: expired results, authors over quota, stale jobs, abandoned workspaces, idle blobs."""
+    now = timezone.now()
+    stats = {'expired': 0, 'evicted': 0, 'stale_jobs': 0, 'workspaces': 0, 'blobs': 0}
+
+    if settings.RESULT_MAX_AGE_DAYS:
+        cutoff = now - timedelta(days=settings.RESULT_MAX_AGE_DAYS)
+        for artifact in Artifact.objects.filter(last_used_at__lt=cutoff).iterator():
+            remove_artifact(artifact)
+            stats['expired'] += 1
+
+    if settings.AUTHOR_QUOTA_BYTES:
+        authors = AuthorUsage.objects.annotate(
+            total=F('upload_bytes') + F('result_bytes')
+        ).filter(total__gt=settings.AUTHOR_QUOTA_BYTES).values_list('author', flat=True)
+        for author in list(authors):
+            stats['evicted'] += trim_author(author)
+
+    if settings.WORKSPACE_MAX_AGE_HOURS:
+        cutoff = now - timedelta(hours=settings.WORKSPACE_MAX_AGE_HOURS)
+        # A job this old died with the process that ran it, and would keep its workspace forever
+        stats['stale_jobs'] = fail_stale_jobs(
+            cutoff, f'No worker finished the job within {settings.WORKSPACE_MAX_AGE_HOURS} hours, upload again'
+        )
+        for file_nest in FileNest.objects.filter(workspace_released=False, dateTime__lt=cutoff).iterator():
+            # Pre-generation can be dropped; still skipped while a real job is queued or running
+            cancel_speculation(file_nest=file_nest)
+            stats['workspaces'] += release_workspace(file_nest)
+
+    if settings.BLOB_MAX_AGE_DAYS:
+        stats['blobs'] = collect_blobs(now - timedelta(days=settings.BLOB_MAX_AGE_DAYS))
+
+    if any(stats.values()):
+        logging.info(f"Retention pass: {stats}")
+    return stats
+
+
+def run_collector():
+    while True:
+        _wakeup.wait(settings.RETENTION_INTERVAL_SECONDS)
+        _wakeup.clear()
+        close_old_connections()
+        try:
+            collect_garbage()
+        except Exception:
+            logging.exception("Retention pass failed")
+        finally:
+            close_old_connections()
+
+
+def start_retention_service():
+    """
+    Fail the jobs orphaned by server processes that exited, then start the background
+    collector once per process; RETENTION_INTERVAL_SECONDS = 0 turns the collector off.
+    """
+    global _collector, _orphans_failed
+    with _collector_lock:
+        if not _orphans_failed:
+            _orphans_failed = True
+            fail_orphaned_jobs()
+    if not settings.RETENTION_INTERVAL_SECONDS:
+        return
+    with _collector_lock:
+        if _collector is None or not _collector.is_alive():
+            _collector = threading.Thread(target=run_collector, name='retention', daemon=True)
+            _collector.start()
+
+
+def request_collection():
+    """Ask the collector for a pass now instead of at its next interval; never blocks the caller."""
+    start_retention_service()
+    _wakeup.set()
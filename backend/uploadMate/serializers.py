@@ -1,22 +1,37 @@
 from rest_framework import serializers
-from .models import FileNest, FileEntry
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.core.files.utils import validate_file_name
+from django.conf import settings
+from django.db import transaction
+from .models import FileNest, FileEntry, GenerationJob, UploadManifest
+from .archives import ArchiveExtractor, ArchiveError, is_archive_name, safe_member_path, ARCHIVE_EXTENSIONS, SOURCE_EXTENSIONS
+from .blobs import SHA256_PATTERN
+from .workspaces import hold_in_memory
+from .usage import count_upload
+from .storage import local_path, put_file
 import os
+import shutil
+import hashlib
+import tempfile
 
 class DocumentUploadSerializer(serializers.ModelSerializer):
     files = serializers.ListField(
         child=serializers.FileField(),
-        write_only=True
+        write_only=True,
+        required=False
     )
+    archive = serializers.FileField(write_only=True, required=False)  # one .zip/.tar.gz instead of many files
     dir_name = serializers.CharField(required=True)
     docType = serializers.ChoiceField(
-        choices=['summary', 'class diagram', 'sequence diagram', 'flowchart'],
+        choices=['summary', 'class diagram', 'sequence diagram', 'flowchart', 'bundle'],
         required=True
     )
     author = serializers.CharField(required=True)
 
     class Meta:
         model = FileNest
-        fields = ['language', 'docType', 'author', 'dir_name', 'files']
+        fields = ['language', 'docType', 'author', 'dir_name', 'files', 'archive']
 
     def validate_files(self, files):
         # Ensure only allowed file extensions are uploaded
@@ -27,9 +42,171 @@ class DocumentUploadSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError(f"Unsupported file type: {file.name}")
         return files
 
+    def validate_archive(self, archive):
+        if not is_archive_name(archive.name):
+            raise serializers.ValidationError(f"Unsupported archive type: {archive.name} (use {', '.join(ARCHIVE_EXTENSIONS)})")
+        return archive
+
+    def validate(self, attrs):
+        if bool(attrs.get('files')) == bool(attrs.get('archive')):
+            raise serializers.ValidationError("Upload either files or a single archive")
+        return attrs
+
     def create(self, validated_data):
-        files = validated_data.pop('files')
-        file_nest = FileNest.objects.create(**validated_data)
-        for file in files:
-            FileEntry.objects.create(file_nest=file_nest, file=file)
+        files = validated_data.pop('files', None)
+        archive = validated_data.pop('archive', None)
+        with transaction.atomic():
+            in_memory = not archive and self.fits_in_memory(files)
+            file_nest = FileNest.objects.create(in_memory=in_memory, **validated_data)
+            if archive:
+                self.extract_archive(file_nest, archive)
+            elif in_memory:
+                self.hold_files(file_nest, files)
+            else:
+                self.store_files(file_nest, files)
+            count_upload(file_nest)
         return file_nest
+
+    def fits_in_memory(self, files):
+        # Small uploads are analyzed from the upload buffers; clashing names need the storage to rename them
+        names = [default_storage.get_valid_name(file.name) for file in files]
+        total = sum(getattr(file, 'hashed_size', file.size) for file in files)
+        return 0 < total <= settings.UPLOAD_IN_MEMORY_MAX_BYTES and len(set(names)) == len(names)
+
+    def hold_files(self, file_nest, files):
+        # The entries name the files as they would be stored, but nothing is written
+        contents = {}
+        entries = []
+        for file in files:
+            name = default_storage.get_valid_name(file.name)
+            data = b''.join(file.chunks())
+            contents[name] = data
+            entries.append(FileEntry(
+                file_nest=file_nest, file=os.path.join(file_nest.workspace_dir, name),
+                sha256=getattr(file, 'sha256', '') or hashlib.sha256(data).hexdigest(), size=len(data)
+            ))
+        FileEntry.objects.bulk_create(entries, batch_size=settings.UPLOAD_BULK_BATCH_SIZE)
+        transaction.on_commit(lambda: hold_in_memory(file_nest, contents))
+
+    def store_files(self, file_nest, files):
+        # Write every file to storage first, then insert all entries in batches instead of one INSERT per file
+        entries = []
+        try:
+            for file in files:
+                # sha256 is set by the validating upload handler while the file streamed in
+                entry = FileEntry(
+                    file_nest=file_nest,
+                    sha256=getattr(file, 'sha256', ''), size=getattr(file, 'hashed_size', file.size)
+                )
+                entry.file.save(file.name, file, save=False)
+                entries.append(entry)
+            FileEntry.objects.bulk_create(entries, batch_size=settings.UPLOAD_BULK_BATCH_SIZE)
+        except Exception:
+            # The transaction drops the rows; remove the files already written
+            for entry in entries:
+                entry.file.storage.delete(entry.file.name)
+            raise
+
+    def extract_archive(self, file_nest, archive):
+        # Members are streamed straight into the upload folder; the entries point at the extracted files
+        relative_dir = file_nest.workspace_dir
+        upload_dir = local_path(relative_dir)  # rejects paths outside MEDIA_ROOT
+        # Remote storage: extract to a local folder first, then stream every member into the bucket
+        extract_dir = upload_dir or tempfile.mkdtemp(prefix='archive-')
+        try:
+            extractor = ArchiveExtractor(extract_dir)
+            extracted = extractor.extract(archive)
+            if upload_dir is None:
+                for relative_path in extracted:
+                    with open(os.path.join(extract_dir, relative_path), 'rb') as member:
+                        put_file(f"{relative_dir}/{relative_path}", member)
+        except (ArchiveError, SuspiciousFileOperation) as e:
+            raise serializers.ValidationError({'archive': [str(e)]})
+        finally:
+            if upload_dir is None:
+                shutil.rmtree(extract_dir, ignore_errors=True)
+        FileEntry.objects.bulk_create([
+            FileEntry(
+                file_nest=file_nest, file=os.path.join(relative_dir, relative_path),
+                sha256=extractor.hashes[relative_path][0], size=extractor.hashes[relative_path][1]
+            )
+            for relative_path in extracted
+        ], batch_size=settings.UPLOAD_BULK_BATCH_SIZE)
+
+
+class ManifestEntrySerializer(serializers.Serializer):
+    path = serializers.CharField(max_length=5000)
+    sha256 = serializers.RegexField(SHA256_PATTERN)
+    size = serializers.IntegerField(min_value=0)
+
+    def validate_path(self, path):
+        try:
+            path = safe_member_path(path)
+        except ArchiveError as e:
+            raise serializers.ValidationError(str(e))
+        if not path.endswith(SOURCE_EXTENSIONS):
+            raise serializers.ValidationError(f"Unsupported file type: {path}")
+        return path
+
+    def validate_size(self, size):
+        if size > settings.UPLOAD_MAX_FILE_BYTES:
+            raise serializers.ValidationError(f"File is larger than {settings.UPLOAD_MAX_FILE_BYTES} bytes")
+        return size
+
+
+class UploadManifestSerializer(serializers.ModelSerializer):
+    docType = serializers.ChoiceField(
+        choices=['summary', 'class diagram', 'sequence diagram', 'flowchart', 'bundle'],
+        required=True
+    )
+    entries = ManifestEntrySerializer(many=True, allow_empty=False)
+
+    class Meta:
+        model = UploadManifest
+        fields = ['language', 'docType', 'author', 'dir_name', 'entries']
+
+    def validate_entries(self, entries):
+        if len(entries) > settings.UPLOAD_MAX_FILES:
+            raise serializers.ValidationError(f"Upload has more than {settings.UPLOAD_MAX_FILES} files")
+        if sum(entry['size'] for entry in entries) > settings.UPLOAD_MAX_TOTAL_BYTES:
+            raise serializers.ValidationError(f"Upload is larger than {settings.UPLOAD_MAX_TOTAL_BYTES} bytes")
+        if len({entry['path'] for entry in entries}) != len(entries):
+            raise serializers.ValidationError("Manifest lists the same path more than once")
+        return entries
+
+    def validate(self, attrs):
+        try:
+            validate_file_name(os.path.join(attrs['author'], attrs['dir_name']), allow_relative_path=True)
+        except SuspiciousFileOperation as e:
+            raise serializers.ValidationError({'dir_name': [str(e)]})
+        return attrs
+
+    def create(self, validated_data):
+        validated_data['entries'] = [dict(entry) for entry in validated_data['entries']]
+        return UploadManifest.objects.create(**validated_data)
+
+
+class GenerationJobSerializer(serializers.ModelSerializer):
+    job_id = serializers.UUIDField(source='id', read_only=True)
+    doc_id = serializers.IntegerField(source='file_nest_id', read_only=True)
+    docType = serializers.CharField(source='doc_type', read_only=True)
+    dir_name = serializers.CharField(source='file_nest.dir_name', read_only=True)
+    queued_seconds = serializers.SerializerMethodField()
+    run_seconds = serializers.SerializerMethodField()
+
+    class Meta:
+        model = GenerationJob
+        fields = ['job_id', 'doc_id', 'docType', 'dir_name', 'speculative', 'status', 'message', 'file_url', 'error',
+                  'diagnostics', 'created_at', 'started_at', 'finished_at', 'queued_seconds', 'run_seconds']
+
+    def get_queued_seconds(self, job):
+        # Time spent waiting for a free worker
+        if job.started_at is None:
+            return None
+        return round((job.started_at - job.created_at).total_seconds(), 3)
+
+    def get_run_seconds(self, job):
+        # Time spent inside the generator
+        if job.started_at is None or job.finished_at is None:
+            return None
+        return round((job.finished_at - job.started_at).total_seconds(), 3)
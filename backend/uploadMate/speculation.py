@@ -0,0 +1,89 @@
+import os
+import queue
+import logging
+import threading
+from datetime import timedelta
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import DurationField, ExpressionWrapper, F, Sum
+from django.utils import timezone
+from .models import GenerationJob
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Speculative work waiting for idle workers, run by one low-priority thread per process
+_tasks = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+
+# Real jobs submitted and not finished yet; speculation only starts while there are none
+_real_jobs = 0
+_idle = threading.Condition()
+
+
+def real_work_started(count: int = 1):
+    global _real_jobs
+    with _idle:
+        _real_jobs += count
+
+
+def real_work_finished():
+    global _real_jobs
+    with _idle:
+        _real_jobs -= 1
+        _idle.notify_all()
+
+
+def run_when_idle(task):
+    """Run task on the speculation thread once no real job is queued or running."""
+    global _worker
+    _tasks.put(task)
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=run_idle_tasks, name='speculation', daemon=True)
+            _worker.start()
+
+
+def lower_priority():
+    # Linux applies a thread id's nice value to that thread only, and Graphviz/PlantUML children inherit it
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), settings.SPECULATION_NICE)
+    except (AttributeError, OSError) as e:
+        logging.warning(f"Could not lower the priority of speculative generation: {e}")
+
+
+def run_idle_tasks():
+    lower_priority()
+    while True:
+        task = _tasks.get()
+        # Real requests go first: wait until they are all done before starting the next task
+        with _idle:
+            _idle.wait_for(lambda: _real_jobs <= 0)
+        close_old_connections()
+        try:
+            task()
+        except Exception:
+            logging.exception("Speculative task failed")
+        finally:
+            close_old_connections()
+
+
+def speculative_doc_types(file_nest):
+    """The doc types worth pre-generating after the upload's own one."""
+    return [doc_type for doc_type in settings.SPECULATION_DOC_TYPES if doc_type and doc_type != file_nest.docType]
+
+
+def budget_left(author: str) -> float:
+    """Seconds of speculative generation the author may still use in the last 24 hours."""
+    since = timezone.now() - timedelta(days=1)
+    used = GenerationJob.objects.filter(
+        speculative=True, file_nest__author=author, started_at__gte=since, finished_at__isnull=False
+    ).aggregate(total=Sum(ExpressionWrapper(F('finished_at') - F('started_at'), output_field=DurationField())))['total']
+    return settings.SPECULATION_BUDGET_SECONDS - (used.total_seconds() if used else 0)
+
+
+def cancel_speculation(**filters) -> int:
+    """Cancel the queued speculative jobs matching the filters; returns how many."""
+    return GenerationJob.objects.filter(
+        speculative=True, status=GenerationJob.STATUS_QUEUED, **filters
+    ).update(status=GenerationJob.STATUS_CANCELLED, finished_at=timezone.now(), message='Cancelled')
@@ -0,0 +1,34 @@
+import os
+from typing import Optional
+from django.core.files import File
+from django.core.files.storage import Storage, default_storage
+
+# Everything moves between storages and local files in chunks of this size, never whole
+COPY_CHUNK_SIZE = 64 * 1024
+
+
+def local_path(name: str, storage: Storage = default_storage) -> Optional[str]:
+    """Where the storage keeps `name` on this machine, or None for remote (S3-compatible) storages."""
+    try:
+        return storage.path(name)
+    except NotImplementedError:
+        return None
+
+
+def is_local(storage: Storage = default_storage) -> bool:
+    return local_path('', storage) is not None
+
+
+def put_file(name: str, fileobj, storage: Storage = default_storage) -> str:
+    """Stream a local file object into the storage under exactly `name`, replacing what was there."""
+    if storage.exists(name):
+        storage.delete(name)
+    return storage.save(name, File(fileobj, name=os.path.basename(name)))
+
+
+def fetch_file(name: str, path: str, storage: Storage = default_storage):
+    """Stream a stored file to a local path."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with storage.open(name, 'rb') as source, open(path, 'wb') as output:
+        for chunk in source.chunks(COPY_CHUNK_SIZE):
+            output.write(chunk)
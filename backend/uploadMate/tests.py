@@ -1,3 +1,294 @@
-from django.test import TestCase
+import io
+import os
+import sys
+import json
+import base64
+import shutil
+import socket
+import subprocess
+import tempfile
+import zipfile
+from datetime import timedelta
+from unittest import mock
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from .models import Artifact, BlobOwner, FileEntry, FileNest, GenerationJob
+from .artifacts import is_immutable_name
+from .archives import ArchiveError, ArchiveExtractor, safe_member_path
+from .catalog import CursorError, decode_cursor, encode_cursor
+from .blobs import collect_blobs, has_blob, missing_blobs, own_blob, store_blob
+from .generators import generate_part
+from .jobs import run_job
+from . import retention
+from .retention import collect_garbage, fail_stale_jobs, process_owner, record_artifact, result_name
+from .workspaces import scratch_root
 
-# Create your tests here.
+
+@override_settings(RESULT_MAX_AGE_DAYS=0, AUTHOR_QUOTA_BYTES=0, WORKSPACE_MAX_AGE_HOURS=24)
+class StaleJobTests(TestCase):
+    def setUp(self):
+        self.file_nest = FileNest.objects.create(
+            language='python', author='alice', docType='summary', dir_name='proj', in_memory=True,
+            dateTime=timezone.now() - timedelta(days=2)
+        )
+
+    def test_orphaned_jobs_fail_and_release_the_workspace(self):
+        job = GenerationJob.objects.create(file_nest=self.file_nest, status=GenerationJob.STATUS_RUNNING)
+        self.assertEqual(fail_stale_jobs(timezone.now(), 'restarted'), 1)
+        job.refresh_from_db()
+        self.file_nest.refresh_from_db()
+        self.assertEqual(job.status, GenerationJob.STATUS_FAILED)
+        self.assertEqual(job.error, 'restarted')
+        self.assertTrue(self.file_nest.workspace_released)
+
+    def test_newer_jobs_are_left_alone(self):
+        job = GenerationJob.objects.create(file_nest=self.file_nest)
+        self.assertEqual(fail_stale_jobs(timezone.now() - timedelta(hours=1), 'restarted'), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, GenerationJob.STATUS_QUEUED)
+
+    def test_collection_fails_jobs_older_than_the_workspace_age(self):
+        old = GenerationJob.objects.create(file_nest=self.file_nest, created_at=timezone.now() - timedelta(hours=30))
+        stats = collect_garbage()
+        old.refresh_from_db()
+        self.file_nest.refresh_from_db()
+        self.assertEqual(stats['stale_jobs'], 1)
+        self.assertEqual(old.status, GenerationJob.STATUS_FAILED)
+        self.assertTrue(self.file_nest.workspace_released)
+
+
+@override_settings(RETENTION_INTERVAL_SECONDS=0)
+class OrphanedJobTests(TestCase):
+    def setUp(self):
+        self.file_nest = FileNest.objects.create(language='python', author='alice', docType='summary', dir_name='proj', in_memory=True)
+        sweep = mock.patch.object(retention, '_orphans_failed', False)
+        sweep.start()
+        self.addCleanup(sweep.stop)
+
+    def job(self, owner):
+        # Queued before this process started, like every job of a process that was already serving
+        return GenerationJob.objects.create(file_nest=self.file_nest, status=GenerationJob.STATUS_RUNNING, owner=owner,
+                                            created_at=timezone.now() - timedelta(hours=1))
+
+    def exited_pid(self):
+        process = subprocess.Popen([sys.executable, '-c', 'pass'])
+        process.wait()
+        return process.pid
+
+    def test_jobs_of_other_live_processes_survive_the_startup_sweep(self):
+        # Another worker of the same server, started earlier and still running its job
+        live = self.job(f"{socket.gethostname()}:{os.getppid()}:0a1b2c3d4e5f")
+        elsewhere = self.job(f"other-host:{self.exited_pid()}:0a1b2c3d4e5f")
+        unowned = self.job('')
+        retention.start_retention_service()
+        for job in (live, elsewhere, unowned):
+            job.refresh_from_db()
+            self.assertEqual(job.status, GenerationJob.STATUS_RUNNING)
+        self.file_nest.refresh_from_db()
+        self.assertFalse(self.file_nest.workspace_released)
+
+    def test_jobs_of_exited_processes_fail_at_startup(self):
+        exited = self.job(f"{socket.gethostname()}:{self.exited_pid()}:0a1b2c3d4e5f")
+        # An earlier process that had this process's pid, as after a container restart
+        reused_pid = self.job(f"{socket.gethostname()}:{os.getpid()}:0a1b2c3d4e5f")
+        mine = self.job(process_owner())
+        retention.start_retention_service()
+        for job in (exited, reused_pid, mine):
+            job.refresh_from_db()
+        self.assertEqual([exited.status, reused_pid.status], [GenerationJob.STATUS_FAILED] * 2)
+        self.assertEqual(mine.status, GenerationJob.STATUS_RUNNING)
+
+
+class BatchTests(TestCase):
+    def test_released_upload_without_recorded_hashes_asks_for_a_new_upload(self):
+        # Uploaded before hashes were recorded; its files were deleted with the workspace
+        file_nest = FileNest.objects.create(
+            language='python', author='alice', docType='summary', dir_name='proj', workspace_released=True
+        )
+        FileEntry.objects.create(file_nest=file_nest, file=f"{file_nest.workspace_dir}/main.py", sha256='', size=10)
+
+        response = APIClient().post(reverse('generate-batch'), {'doc_ids': [file_nest.id]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        [result] = response.data['results']
+        self.assertEqual(result['status'], GenerationJob.STATUS_FAILED)
+        self.assertIn('upload them again', result['error'])
+
+
+class WorkspaceTests(TestCase):
+    def test_in_memory_upload_held_by_no_process_fails_with_upload_again(self):
+        # Received by another server process, or before a restart
+        file_nest = FileNest.objects.create(language='python', author='alice', docType='class diagram', dir_name='proj', in_memory=True)
+        FileEntry.objects.create(file_nest=file_nest, file=f"{file_nest.workspace_dir}/main.py", sha256='0' * 64, size=10)
+
+        result = generate_part('class diagram', file_nest, '/nonexistent')
+
+        self.assertNotIn('file_path', result)
+        self.assertIn('upload them again', result['error'])
+
+
+class BlobTests(TestCase):
+    def setUp(self):
+        blob_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, blob_dir, ignore_errors=True)
+        storages_setting = override_settings(STORAGES={
+            'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+            'blobs': {'BACKEND': 'django.core.files.storage.FileSystemStorage', 'OPTIONS': {'location': blob_dir}},
+            'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+        })
+        storages_setting.enable()
+        self.addCleanup(storages_setting.disable)
+
+    def store(self, author, content):
+        sha256, _ = store_blob(SimpleUploadedFile('a.py', content), 1024)
+        own_blob(author, sha256)
+        return sha256
+
+    def test_a_hash_counts_as_present_only_for_authors_who_sent_it(self):
+        sha256 = self.store('alice', b'print(1)\n')
+        self.assertEqual(missing_blobs('alice', [sha256, sha256]), [])
+        self.assertEqual(missing_blobs('mallory', [sha256]), [sha256])
+
+    def test_blobs_are_deleted_once_no_owner_used_them_recently(self):
+        shared = self.store('alice', b'shared\n')
+        self.store('bob', b'shared\n')
+        alone = self.store('alice', b'alone\n')
+        BlobOwner.objects.filter(author='alice').update(last_used_at=timezone.now() - timedelta(days=40))
+
+        self.assertEqual(collect_blobs(timezone.now() - timedelta(days=30)), 1)
+        self.assertFalse(has_blob(alone))
+        self.assertTrue(has_blob(shared))
+        self.assertEqual(missing_blobs('alice', [shared]), [shared])
+
+
+S3_OPTIONS = {'bucket_name': 'devcanvas-test', 'region_name': 'us-east-1', 'access_key': 'test', 'secret_key': 'test',
+              'file_overwrite': False}
+
+
+@override_settings(UPLOAD_IN_MEMORY_MAX_BYTES=0, RESULT_CACHE_DIR='', PARSE_CACHE_DIR='',
+                   RETENTION_INTERVAL_SECONDS=0, SPECULATION_BUDGET_SECONDS=0, ANALYSIS_POOL_START_METHOD='fork')
+class S3StorageTests(TestCase):
+    """Upload, job, publish, serve and release against an S3 bucket (moto's in-process stand-in)."""
+
+    def setUp(self):
+        try:
+            import boto3
+            from moto import mock_aws
+        except ImportError:
+            self.skipTest('moto is not installed')
+        aws = mock_aws()
+        aws.start()
+        self.addCleanup(aws.stop)
+        boto3.client('s3', region_name='us-east-1').create_bucket(Bucket=S3_OPTIONS['bucket_name'])
+
+        local_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, local_dir, ignore_errors=True)
+        s3_settings = override_settings(
+            MEDIA_ROOT=local_dir, WORKSPACE_SCRATCH_DIR=os.path.join(local_dir, 'scratch'),
+            STORAGES={
+                'default': {'BACKEND': 'storages.backends.s3.S3Storage', 'OPTIONS': {**S3_OPTIONS, 'location': 'uploads'}},
+                'blobs': {'BACKEND': 'storages.backends.s3.S3Storage', 'OPTIONS': {**S3_OPTIONS, 'location': 'blobs'}},
+                'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+            },
+        )
+        s3_settings.enable()
+        self.addCleanup(s3_settings.disable)
+
+    def test_upload_generate_publish_serve_and_release(self):
+        source = b'class Shop:\n    def checkout(self, items):\n        for item in items:\n            print(item)\n'
+        client = APIClient()
+        with mock.patch('uploadMate.jobs.get_executor'):  # the job is run below, in this thread
+            response = client.post(reverse('uplink'), {
+                'language': 'python', 'docType': 'flowchart', 'author': 'alice', 'dir_name': 'shop',
+                'files': [SimpleUploadedFile('shop.py', source)],
+            }, format='multipart')
+        self.assertEqual(response.status_code, 202, response.data)
+        job = GenerationJob.objects.get(id=response.data['job_id'])
+        file_nest = job.file_nest
+        [stored] = file_nest.files.values_list('file', flat=True)
+        self.assertTrue(default_storage.exists(stored))
+
+        with mock.patch('classDiagram.rendering.render_graph', return_value=None):  # no Graphviz needed
+            run_job(job.id)
+        job.refresh_from_db()
+        self.assertEqual(job.status, GenerationJob.STATUS_DONE, job.error)
+
+        # Published under its content-hashed name in the bucket, and counted
+        file_name = os.path.basename(job.file_url)
+        self.assertTrue(is_immutable_name(file_name))
+        self.assertTrue(default_storage.exists(result_name('alice', file_name)))
+        artifact = Artifact.objects.get(author='alice', file_name=file_name)
+        self.assertEqual(artifact.size, default_storage.size(result_name('alice', file_name)))
+
+        response = client.get(job.file_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content)[:5], b'%PDF-')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(client.get(job.file_url.replace(file_name, 'missing.pdf')).status_code, 404)
+
+        # The job released the workspace: uploaded files and the local scratch copy are gone
+        file_nest.refresh_from_db()
+        self.assertTrue(file_nest.workspace_released)
+        self.assertFalse(default_storage.exists(stored))
+        self.assertFalse(os.path.exists(scratch_root(file_nest)))
+
+    def test_storage_errors_while_recording_are_logged_not_raised(self):
+        from botocore.exceptions import ClientError
+        self.assertIsNone(record_artifact('alice', '/uploads/alice/results/missing.pdf'))
+        denied = ClientError({'Error': {'Code': '403', 'Message': 'Forbidden'}}, 'HeadObject')
+        with mock.patch.object(default_storage, 'size', side_effect=denied):
+            self.assertIsNone(record_artifact('alice', '/uploads/alice/results/report.pdf'))
+        self.assertFalse(Artifact.objects.exists())
+
+
+class CursorTests(SimpleTestCase):
+    def cursor(self, *position):
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def test_cursors_round_trip(self):
+        created_at = timezone.now()
+        artifact = Artifact(id=7, size=120, created_at=created_at)
+        self.assertEqual(decode_cursor(encode_cursor('-size', artifact), '-size'), (120, 7))
+        self.assertEqual(decode_cursor(encode_cursor('created_at', artifact), 'created_at'), (created_at, 7))
+
+    def test_malformed_cursors_are_rejected(self):
+        for cursor, sort in [
+            (123, '-size'), (['a'], '-size'), ('not base64!', '-size'),
+            (self.cursor('size', 120, 7), '-size'),  # another sort order
+            (self.cursor('-size', '120', 7), '-size'), (self.cursor('-size', True, 7), '-size'),
+            (self.cursor('-size', 120, '7'), '-size'),
+            (self.cursor('created_at', 5, 7), 'created_at'),
+            (self.cursor('created_at', '2026-13-01T00:00:00', 7), 'created_at'),
+        ]:
+            with self.subTest(cursor=cursor), self.assertRaises(CursorError):
+                decode_cursor(cursor, sort)
+
+
+class ArchiveTests(SimpleTestCase):
+    def test_member_paths_are_normalised(self):
+        self.assertEqual(safe_member_path('src/./app/app.py'), 'src/app/app.py')
+        self.assertEqual(safe_member_path('src\\pkg\\main.py'), 'src/pkg/main.py')
+        self.assertEqual(safe_member_path('./src//main.py'), 'src/main.py')
+
+    def test_paths_leaving_the_upload_are_rejected(self):
+        for name in ['../evil.py', 'src/../../evil.py', 'src/..', '..\\evil.py', '/etc/evil.py', '\\evil.py',
+                     'C:/evil.py', 'c:evil.py']:
+            with self.subTest(name=name), self.assertRaises(ArchiveError):
+                safe_member_path(name)
+
+    def test_a_traversing_member_rejects_the_whole_archive(self):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zip_file:
+            zip_file.writestr('proj/main.py', 'print(1)\n')
+            zip_file.writestr('proj/../../evil.py', 'print(2)\n')
+        destination = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, destination, ignore_errors=True)
+
+        with self.assertRaises(ArchiveError):
+            ArchiveExtractor(destination).extract(SimpleUploadedFile('proj.zip', archive.getvalue()))
+        self.assertFalse(os.path.exists(os.path.join(destination, 'proj', 'main.py')))
+        self.assertFalse(os.path.exists(os.path.join(os.path.dirname(destination), 'evil.py')))
@@ -0,0 +1,104 @@
+import hashlib
+import logging
+from typing import Dict, List, Tuple
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+from django.http import QueryDict
+from django.utils.datastructures import MultiValueDict
+from .archives import ARCHIVE_EXTENSIONS, SOURCE_EXTENSIONS
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Leading bytes of the archive formats we accept
+ARCHIVE_SIGNATURES = (b'PK\x03\x04', b'PK\x05\x06', b'\x1f\x8b')
+# Bytes of each source file inspected for binary content
+SNIFF_BYTES = 8 * 1024
+# Allowance for multipart boundaries and part headers when checking Content-Length
+PART_OVERHEAD_BYTES = 1024
+
+
+class ValidatingUploadHandler(FileUploadHandler):
+    """
+    Runs ahead of Django's own upload handlers on the upload endpoints. It hashes every
+    file as it streams in and stops the upload as soon as a file breaks a rule, instead
+    of letting the whole request land on disk first. Chunks are passed on unchanged,
+    so the default handlers still build the uploaded files.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.rejection = None
+        self.total_bytes = 0
+        self.file_hashes: Dict[str, List[Tuple[str, int]]] = {}  # field name -> [(sha256, size)] in upload order
+        self.digest = None
+        self.file_bytes = 0
+        self.is_archive = False
+
+    def reject(self, reason: str, connection_reset: bool = False):
+        """
+        Abort the upload. Size violations reset the connection so the rest of the body
+        is never read; other violations drain it without writing anything, so the
+        client still gets a readable 400.
+        """
+        self.rejection = reason
+        logging.warning(f"Upload rejected: {reason}")
+        raise StopUpload(connection_reset=connection_reset)
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        allowance = settings.UPLOAD_MAX_TOTAL_BYTES + PART_OVERHEAD_BYTES * settings.UPLOAD_MAX_FILES
+        if content_length and content_length > allowance:
+            # Refuse before reading a single byte; the view answers with the rejection
+            self.rejection = f"Upload of {content_length} bytes is larger than the {settings.UPLOAD_MAX_TOTAL_BYTES} byte limit"
+            logging.warning(f"Upload rejected: {self.rejection}")
+            return QueryDict(encoding=encoding), MultiValueDict()
+        return None
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        self.is_archive = field_name == 'archive'
+        allowed_extensions = ARCHIVE_EXTENSIONS if self.is_archive else SOURCE_EXTENSIONS
+        if not file_name.lower().endswith(allowed_extensions):
+            self.reject(f"Unsupported file type: {file_name}")
+        if not self.is_archive and content_length and content_length > settings.UPLOAD_MAX_FILE_BYTES:
+            self.reject(f"{file_name} is larger than {settings.UPLOAD_MAX_FILE_BYTES} bytes", connection_reset=True)
+        self.digest = hashlib.sha256()
+        self.file_bytes = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        if start == 0:
+            self.sniff(raw_data)
+        self.file_bytes += len(raw_data)
+        self.total_bytes += len(raw_data)
+        if not self.is_archive and self.file_bytes > settings.UPLOAD_MAX_FILE_BYTES:
+            self.reject(f"{self.file_name} is larger than {settings.UPLOAD_MAX_FILE_BYTES} bytes", connection_reset=True)
+        if self.total_bytes > settings.UPLOAD_MAX_TOTAL_BYTES:
+            self.reject(f"Upload is larger than {settings.UPLOAD_MAX_TOTAL_BYTES} bytes", connection_reset=True)
+        self.digest.update(raw_data)
+        return raw_data
+
+    def sniff(self, head: bytes):
+        if self.is_archive:
+            if not head.startswith(ARCHIVE_SIGNATURES):
+                self.reject(f"{self.file_name} is not a zip or gzip archive")
+        elif b'\x00' in head[:SNIFF_BYTES]:
+            self.reject(f"{self.file_name} looks like a binary file")
+
+    def file_complete(self, file_size):
+        self.file_hashes.setdefault(self.field_name, []).append((self.digest.hexdigest(), file_size))
+        return None  # the next handler returns the uploaded file object
+
+
+def install_upload_handler(request) -> ValidatingUploadHandler:
+    """Put the validating handler in front of the default ones; must run before the body is read."""
+    django_request = getattr(request, '_request', request)  # DRF wraps the Django request
+    handler = ValidatingUploadHandler(django_request)
+    django_request.upload_handlers.insert(0, handler)
+    return handler
+
+
+def attach_hashes(handler: ValidatingUploadHandler, files: MultiValueDict):
+    """Record each uploaded file's sha256 and size on the file object, matched by upload order."""
+    for field_name, hashes in handler.file_hashes.items():
+        for uploaded_file, (sha256, size) in zip(files.getlist(field_name), hashes):
+            uploaded_file.sha256 = sha256
+            uploaded_file.hashed_size = size
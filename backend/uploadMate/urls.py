@@ -3,5 +3,12 @@ from . import views
 
 urlpatterns = [
     path('uplink/',views.upload_codebase, name='uplink'),
+    path('uplink/manifest/', views.upload_manifest, name='uplink-manifest'),
+    path('uplink/manifest/<uuid:manifest_id>/', views.upload_manifest_files, name='uplink-manifest-files'),
     path('history/', views.history, name='history'),
+    path('latest/', views.latest_artifact, name='latest-artifact'),
+    path('batch/', views.generate_batch, name='generate-batch'),
+    path('jobs/', views.job_list, name='job-list'),
+    path('jobs/<uuid:job_id>/', views.job_status, name='job-status'),
+    path('jobs/<uuid:job_id>/cancel/', views.cancel_job, name='job-cancel'),
 ]
\ No newline at end of file
@@ -0,0 +1,48 @@
+from typing import Optional
+from django.conf import settings
+from django.db.models import F, Sum
+from django.utils import timezone
+from .models import AuthorUsage, FileEntry
+
+
+def adjust_usage(author: str, upload_bytes: int = 0, result_bytes: int = 0, result_count: int = 0):
+    """Move an author's usage counters by the given deltas, in the database so concurrent updates add up."""
+    AuthorUsage.objects.get_or_create(author=author)
+    AuthorUsage.objects.filter(author=author).update(
+        upload_bytes=F('upload_bytes') + upload_bytes,
+        result_bytes=F('result_bytes') + result_bytes,
+        result_count=F('result_count') + result_count,
+        updated_at=timezone.now(),
+    )
+
+
+def upload_size(file_nest) -> int:
+    return FileEntry.objects.filter(file_nest=file_nest).aggregate(total=Sum('size'))['total'] or 0
+
+
+def count_upload(file_nest):
+    """Charge a freshly stored upload to its author until its workspace is released."""
+    adjust_usage(file_nest.author, upload_bytes=upload_size(file_nest))
+
+
+def quota_error(author: str, incoming_bytes: int) -> Optional[str]:
+    """
+    Why an upload must be refused, or None. Only uploads still being processed count here:
+    results can be evicted to make room, uploads in flight cannot.
+    """
+    if not settings.AUTHOR_QUOTA_BYTES:
+        return None
+    usage = AuthorUsage.objects.filter(author=author).first()
+    held = usage.upload_bytes if usage else 0
+    if held + incoming_bytes > settings.AUTHOR_QUOTA_BYTES:
+        return (f"Upload of {incoming_bytes} bytes would exceed the {settings.AUTHOR_QUOTA_BYTES} byte quota "
+                f"of {author} ({held} bytes of earlier uploads are still being processed)")
+    return None
+
+
+def over_quota(author: str) -> bool:
+    if not settings.AUTHOR_QUOTA_BYTES:
+        return False
+    return AuthorUsage.objects.filter(author=author).annotate(
+        total=F('upload_bytes') + F('result_bytes')
+    ).filter(total__gt=settings.AUTHOR_QUOTA_BYTES).exists()
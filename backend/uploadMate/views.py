@@ -1,68 +1,250 @@
 from rest_framework.response import Response
 from rest_framework.decorators import api_view
 from rest_framework import status
-from .serializers import DocumentUploadSerializer
-from summaryGen.views import generate_summary_view
-from classDiagram.views import generate_class_diagram_view
-from sequenceDiagram.views import generate_sequence_diagram_view
-from flowchart.views import generate_flowchart_view
-from django.http import HttpRequest
+from .serializers import DocumentUploadSerializer, GenerationJobSerializer, UploadManifestSerializer
+from .models import FileNest, FileEntry, GenerationJob, UploadManifest, ArtifactPointer
+from .blobs import BlobError, blob_size, delete_blob, missing_blobs, own_blob, place_blob, store_blob
+from .jobs import submit_batch, submit_job
+from .workspaces import release_workspace
+from .usage import count_upload, quota_error
+from .retention import result_name
+from .catalog import CursorError, FILTER_FIELDS, history_page
+from .storage import is_local
+from .artifacts import point_latest, artifact_url, is_immutable_name, IMMUTABLE_CACHE_CONTROL
+from .upload_handlers import install_upload_handler, attach_hashes
+from .result_cache import result_cache_key, lookup_result, recorded_tree_hash, upload_tree_hash
+from django.db import transaction
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from django.utils import timezone
+from django.views.static import serve
+from django.http import FileResponse, Http404
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.utils import validate_file_name
 import os
-import shutil
 from django.conf import settings
-from datetime import datetime
-
-# Helper to call appropriate generator view
-def call_generator_view(doc_type, request, doc_id):
-    view_mapping = {
-        'summary': generate_summary_view,
-        'class diagram': generate_class_diagram_view,
-        'sequence diagram': generate_sequence_diagram_view,
-        'flowchart': generate_flowchart_view
-    }
-    return view_mapping[doc_type](request, doc_id)
 
-def delete_folders_except_results(author):
-    """Delete all folders in /settings.MEDIA_ROOT/{author} except the 'results' folder."""
-    author_dir = os.path.join(settings.MEDIA_ROOT, author)
-    results_dir = os.path.join(author_dir, 'results')
+def start_generation(doc_upload, cache_key):
+    """A finished job when the result cache has the document, otherwise a queued job the caller submits."""
+    # Identical sources were documented before: hand back the stored artifact
+    file_url = lookup_result(cache_key, doc_upload)
+    if file_url:
+        point_latest(doc_upload, file_url)
+        now = timezone.now()
+        job = GenerationJob.objects.create(
+            file_nest=doc_upload, status=GenerationJob.STATUS_DONE, cache_key=cache_key,
+            started_at=now, finished_at=now, file_url=file_url, message='Served from result cache'
+        )
+        # Nothing will read the uploaded files
+        transaction.on_commit(lambda: release_workspace(doc_upload))
+        return job
+    return GenerationJob.objects.create(file_nest=doc_upload, cache_key=cache_key)
 
-    # Ensure the results folder exists
-    os.makedirs(results_dir, exist_ok=True)
+def queue_generation(doc_upload):
+    """Answer from the result cache when possible, otherwise queue a generation job for the upload."""
+    job = start_generation(doc_upload, result_cache_key(doc_upload))
+    if job.status == GenerationJob.STATUS_DONE:
+        return Response({
+            'message': 'Documentation served from cache',
+            'job_id': str(job.id),
+            'doc_id': doc_upload.id,
+            'status': job.status,
+            'status_url': reverse('job-status', kwargs={'job_id': job.id}),
+            'file_url': job.file_url,
+        }, status=status.HTTP_200_OK)
 
-    # Iterate over all subdirectories in the author directory
-    for folder_name in os.listdir(author_dir):
-        folder_path = os.path.join(author_dir, folder_name)
+    # Queue the documentation generator; the client polls the job status
+    transaction.on_commit(lambda: submit_job(job))
 
-        # Check if it's a directory and not the 'results' directory
-        if os.path.isdir(folder_path) and folder_path != results_dir:
-            shutil.rmtree(folder_path)  # Delete the folder
+    return Response({
+        'message': 'Documentation generation queued',
+        'job_id': str(job.id),
+        'doc_id': doc_upload.id,
+        'status': job.status,
+        'status_url': reverse('job-status', kwargs={'job_id': job.id}),
+    }, status=status.HTTP_202_ACCEPTED)
 
 @api_view(['POST'])
 def upload_codebase(request):
     if request.method == 'POST':
+        upload_handler = install_upload_handler(request)
         print("request: ", request.data)
+        if upload_handler.rejection:
+            return Response({'error': upload_handler.rejection}, status=status.HTTP_400_BAD_REQUEST)
+        # Refuse before anything is stored; the files are still in the upload buffers
+        over_quota = quota_error(request.data.get('author', ''), upload_handler.total_bytes)
+        if over_quota:
+            return Response({'error': over_quota}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        attach_hashes(upload_handler, request.FILES)
         serializer = DocumentUploadSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
             doc_upload = serializer.save()  # Save FileNest and associated FileEntry instances
+            return queue_generation(doc_upload)
+        print(serializer.errors)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+@api_view(['POST'])
+def upload_manifest(request):
+    """First phase of a delta upload: record the manifest and answer with the hashes the server lacks."""
+    serializer = UploadManifestSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    # The manifest lists every size, so an upload over quota is refused before any file is sent
+    over_quota = quota_error(serializer.validated_data['author'], sum(entry['size'] for entry in serializer.validated_data['entries']))
+    if over_quota:
+        return Response({'error': over_quota}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    manifest = serializer.save()
+    missing = missing_blobs(manifest.author, (entry['sha256'] for entry in manifest.entries))
 
-            # Prepare raw request for generator view
-            raw_request = HttpRequest()
-            raw_request.method = request.method
-            raw_request.POST = request.data
+    return Response({
+        'manifest_id': str(manifest.id),
+        'missing': missing,
+        'upload_url': reverse('uplink-manifest-files', kwargs={'manifest_id': manifest.id}),
+    }, status=status.HTTP_201_CREATED)
 
-            # Call the documentation generator view
-            response = call_generator_view(doc_upload.docType, raw_request, doc_upload.id)
-            if 'file_url' in response.data:
-                print(response.data['file_url'])
-            else:
-                print("file_url not found in response:", response.data)
+@api_view(['POST'])
+def upload_manifest_files(request, manifest_id):
+    """Second phase of a delta upload: take the missing files, then build the upload from the blob store."""
+    upload_handler = install_upload_handler(request)
+    try:
+        manifest = UploadManifest.objects.get(id=manifest_id)
+    except UploadManifest.DoesNotExist:
+        return Response({'error': f'Manifest {manifest_id} not found'}, status=status.HTTP_404_NOT_FOUND)
+    uploaded_files = request.FILES.getlist('files')
+    if upload_handler.rejection:
+        return Response({'error': upload_handler.rejection}, status=status.HTTP_400_BAD_REQUEST)
 
-            delete_folders_except_results(doc_upload.author)
+    hashes = {entry['sha256'] for entry in manifest.entries}
+    for uploaded_file in uploaded_files:
+        try:
+            sha256, added = store_blob(uploaded_file, settings.UPLOAD_MAX_FILE_BYTES)
+        except BlobError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if sha256 not in hashes:
+            if added:
+                delete_blob(sha256)
+            return Response({'error': f'{uploaded_file.name} is not part of manifest {manifest_id}'}, status=status.HTTP_400_BAD_REQUEST)
+        own_blob(manifest.author, sha256)
 
-            return Response(response.data, status=response.status_code)
-        print(serializer.errors)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    # The manifest is kept until every blob is present, so the client can retry the missing ones
+    missing = missing_blobs(manifest.author, (entry['sha256'] for entry in manifest.entries))
+    if missing:
+        return Response({'error': f'{len(missing)} files are still missing', 'missing': missing}, status=status.HTTP_400_BAD_REQUEST)
+    for entry in manifest.entries:
+        if blob_size(entry['sha256']) != entry['size']:
+            return Response({'error': f"Size of {entry['path']} does not match the manifest"}, status=status.HTTP_400_BAD_REQUEST)
+
+    with transaction.atomic():
+        doc_upload = FileNest.objects.create(
+            language=manifest.language, author=manifest.author, docType=manifest.docType, dir_name=manifest.dir_name
+        )
+        relative_dir = doc_upload.workspace_dir
+        for entry in manifest.entries:
+            place_blob(entry['sha256'], f"{relative_dir}/{entry['path']}")
+        FileEntry.objects.bulk_create([
+            FileEntry(
+                file_nest=doc_upload, file=os.path.join(relative_dir, entry['path']),
+                sha256=entry['sha256'], size=entry['size']
+            )
+            for entry in manifest.entries
+        ], batch_size=settings.UPLOAD_BULK_BATCH_SIZE)
+        count_upload(doc_upload)
+        manifest.delete()
+        response = queue_generation(doc_upload)
+    return response
+
+@api_view(['POST'])
+def generate_batch(request):
+    """
+    Generate the documents of many earlier uploads in one call, e.g. a nightly refresh.
+    Every doc_id is handled once: uploads with a job still in flight keep it, documents
+    the result cache holds are served from it, and the rest are queued grouped by source
+    tree, so uploads of the same code (for different doc types) run one after the other
+    on one worker and share its parsed files and results. Answers with one result per doc_id.
+    """
+    doc_ids = request.data.get('doc_ids')
+    if not isinstance(doc_ids, list) or not doc_ids:
+        return Response({'error': 'doc_ids must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(doc_ids) > settings.BATCH_MAX_DOC_IDS:
+        return Response({'error': f'A batch takes at most {settings.BATCH_MAX_DOC_IDS} doc_ids'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        doc_ids = list(dict.fromkeys(int(doc_id) for doc_id in doc_ids))
+    except (TypeError, ValueError):
+        return Response({'error': 'doc_ids must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+
+    file_nests = FileNest.objects.in_bulk(doc_ids)
+    in_flight = {
+        job.file_nest_id: job for job in GenerationJob.objects.select_related('file_nest').filter(
+            file_nest_id__in=doc_ids, speculative=False,
+            status__in=[GenerationJob.STATUS_QUEUED, GenerationJob.STATUS_RUNNING]
+        )
+    }
+    results = []
+    groups = {}
+    with transaction.atomic():
+        for doc_id in doc_ids:
+            doc_upload = file_nests.get(doc_id)
+            if doc_upload is None:
+                results.append({'doc_id': doc_id, 'error': f'Uploaded directory with id {doc_id} not found'})
+                continue
+            job = in_flight.get(doc_id)
+            if job is None:
+                # Released files are gone: only hashes recorded on receipt can still find the document in the cache
+                root_hash = recorded_tree_hash(doc_upload) if doc_upload.workspace_released else upload_tree_hash(doc_upload)
+                if root_hash is None:
+                    job = GenerationJob.objects.create(file_nest=doc_upload)
+                else:
+                    job = start_generation(doc_upload, result_cache_key(doc_upload, root_hash))
+                if job.status == GenerationJob.STATUS_QUEUED:
+                    if doc_upload.workspace_released:
+                        # Nothing left to generate from
+                        job.status = GenerationJob.STATUS_FAILED
+                        job.error = f'Files of upload {doc_id} were already deleted, upload them again'
+                        job.finished_at = timezone.now()
+                        job.save(update_fields=['status', 'error', 'finished_at'])
+                    else:
+                        groups.setdefault((root_hash, doc_upload.language), []).append(job)
+            result = GenerationJobSerializer(job).data
+            result['status_url'] = reverse('job-status', kwargs={'job_id': job.id})
+            results.append(result)
+        transaction.on_commit(lambda: submit_batch(list(groups.values())))
+
+    return Response({'results': results}, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+def job_status(request, job_id):
+    try:
+        job = GenerationJob.objects.select_related('file_nest').get(id=job_id)
+    except GenerationJob.DoesNotExist:
+        return Response({'error': f'Job {job_id} not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(GenerationJobSerializer(job).data, status=status.HTTP_200_OK)
+
+@api_view(['POST'])
+def cancel_job(request, job_id):
+    """Cancel a job still waiting for a worker, or drop the result of a running speculative one."""
+    try:
+        job = GenerationJob.objects.select_related('file_nest').get(id=job_id)
+    except GenerationJob.DoesNotExist:
+        return Response({'error': f'Job {job_id} not found'}, status=status.HTTP_404_NOT_FOUND)
+    cancellable = [GenerationJob.STATUS_QUEUED]
+    if job.speculative:
+        cancellable.append(GenerationJob.STATUS_RUNNING)
+    cancelled = GenerationJob.objects.filter(id=job.id, status__in=cancellable).update(
+        status=GenerationJob.STATUS_CANCELLED, finished_at=timezone.now(), message='Cancelled'
+    )
+    job.refresh_from_db()
+    if not cancelled:
+        return Response({'error': f'Job {job_id} is {job.status} and can no longer be cancelled'}, status=status.HTTP_409_CONFLICT)
+    return Response(GenerationJobSerializer(job).data, status=status.HTTP_200_OK)
+
+@api_view(['POST'])
+def job_list(request):
+    author = request.data.get('author', None)
+    if not author:
+        return Response({'error': 'Author is required'}, status=400)
+
+    jobs = GenerationJob.objects.select_related('file_nest').filter(file_nest__author=author, speculative=False).order_by('-created_at')[:50]
+    return Response({'jobs': GenerationJobSerializer(jobs, many=True).data}, status=200)
     
 @api_view(['POST'])
 def history(request):
@@ -71,23 +253,76 @@ def history(request):
         if not author:
             return Response({'error': 'Author is required'}, status=400)
 
-        results_dir = os.path.join(settings.MEDIA_ROOT, author, 'results')
+        # Served from the artifact catalog, one indexed page at a time
+        try:
+            limit = min(int(request.data.get('limit', settings.HISTORY_PAGE_SIZE)), settings.HISTORY_MAX_PAGE_SIZE)
+        except (TypeError, ValueError):
+            return Response({'error': 'limit must be an integer'}, status=400)
+        if limit < 1:
+            return Response({'error': 'limit must be positive'}, status=400)
+        cursor = request.data.get('cursor')
+        filters = {field: request.data.get(field) for field in FILTER_FIELDS}
+        try:
+            artifacts, next_cursor = history_page(author, filters, request.data.get('sort') or '-created_at', cursor, limit)
+        except CursorError as e:
+            return Response({'error': str(e)}, status=400)
 
-        if not os.path.exists(results_dir):
+        if not artifacts and not cursor and not any(filters.values()):
             return Response({'error': 'No results found for this author'}, status=404)
 
         files = []
-        for file_name in os.listdir(results_dir):
-            file_path = os.path.join(results_dir, file_name)
-            if os.path.isfile(file_path):
-                # Get the file's last modification time
-                date_of_generation = datetime.fromtimestamp(os.path.getmtime(file_path)).strftime('%Y-%m-%d %H:%M:%S')
-                files.append({
-                    'file_url': f"{settings.MEDIA_URL}{author}/results/{file_name}",
-                    'file_name': file_name,
-                    'dateOfGeneration': date_of_generation,
-                })
+        for artifact in artifacts:
+            files.append({
+                'file_url': artifact_url(author, artifact.file_name),
+                'file_name': artifact.file_name,
+                'dateOfGeneration': timezone.localtime(artifact.created_at).strftime('%Y-%m-%d %H:%M:%S'),
+                'docType': artifact.docType,
+                'dir_name': artifact.dir_name,
+                'language': artifact.language,
+                'size': artifact.size,
+                'sha256': artifact.sha256,
+                'source_hash': artifact.source_hash,
+            })
+
+        return Response({'files': files, 'next_cursor': next_cursor}, status=200)
+
 
-        return Response({'files': files}, status=200)
+@api_view(['GET'])
+def latest_artifact(request):
+    """The current version of an (author, dir_name, docType) document; its URL changes with every new version."""
+    author = request.query_params.get('author')
+    dir_name = request.query_params.get('dir_name')
+    doc_type = request.query_params.get('docType')
+    if not (author and dir_name and doc_type):
+        return Response({'error': 'author, dir_name and docType are required'}, status=status.HTTP_400_BAD_REQUEST)
 
+    pointer = ArtifactPointer.objects.select_related('artifact').filter(
+        author=author, dir_name=dir_name, docType=doc_type
+    ).first()
+    if pointer is None:
+        return Response({'error': f'No {doc_type} generated for {dir_name}'}, status=status.HTTP_404_NOT_FOUND)
+    response = Response({
+        'file_url': artifact_url(author, pointer.artifact.file_name),
+        'file_name': pointer.artifact.file_name,
+        'sha256': pointer.artifact.sha256,
+        'updated_at': pointer.updated_at,
+    }, status=status.HTTP_200_OK)
+    response['Cache-Control'] = 'no-cache'
+    return response
 
+def serve_artifact(request, author, file_name):
+    """Serve a generated document; content-hashed names never change, so they are cached for a year."""
+    if is_local():
+        response = serve(request, os.path.join(author, 'results', file_name), document_root=settings.MEDIA_ROOT)
+    else:
+        # Streamed from the bucket in chunks; names are checked like the local route does
+        name = result_name(author, file_name)
+        try:
+            validate_file_name(name, allow_relative_path=True)
+        except SuspiciousFileOperation:
+            raise Http404(f'{file_name} not found')
+        if not default_storage.exists(name):
+            raise Http404(f'{file_name} not found')
+        response = FileResponse(default_storage.open(name, 'rb'), filename=file_name)
+    response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if is_immutable_name(file_name) else 'no-cache'
+    return response
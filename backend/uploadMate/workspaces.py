@@ -0,0 +1,104 @@
+import os
+import shutil
+import logging
+import threading
+from typing import Dict, Union
+from django.conf import settings
+from django.core.files.storage import default_storage
+from codeModel.sources import MemoryTree
+from .models import FileNest, GenerationJob
+from .usage import adjust_usage, upload_size
+from .storage import fetch_file, is_local, local_path
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Files of in-memory uploads by FileNest id; jobs run in this process, so they read them from here
+_memory_uploads: Dict[int, MemoryTree] = {}
+_memory_uploads_lock = threading.Lock()
+# One lock per upload kept in remote storage, so concurrent jobs fetch its files only once
+_fetch_locks: Dict[int, threading.Lock] = {}
+_fetch_locks_lock = threading.Lock()
+
+
+class WorkspaceGone(Exception):
+    """The upload's files can no longer be read; the client has to upload them again."""
+
+
+def hold_in_memory(file_nest, files: Dict[str, bytes]) -> MemoryTree:
+    """Keep a small upload's files in memory until its jobs are done; paths are relative to the upload."""
+    tree = MemoryTree(f"memory://{file_nest.workspace_dir}", files)
+    with _memory_uploads_lock:
+        _memory_uploads[file_nest.id] = tree
+    return tree
+
+
+def workspace_for(file_nest) -> Union[str, MemoryTree]:
+    """
+    What the generators read the upload from: its in-memory files, its folder under MEDIA_ROOT,
+    or, with remote storage, a local copy of its files under WORKSPACE_SCRATCH_DIR.
+    Raises WorkspaceGone when the files are not available any more, rather than
+    handing the generators a folder that was never written.
+    """
+    if file_nest.workspace_released:
+        raise WorkspaceGone(f'Files of upload {file_nest.id} were already deleted, upload them again')
+    if file_nest.in_memory:
+        with _memory_uploads_lock:
+            tree = _memory_uploads.get(file_nest.id)
+        if tree is None:
+            # Only the process that received the upload holds it, and only until it restarts
+            raise WorkspaceGone(f'Files of upload {file_nest.id} are no longer held by this server, upload them again')
+        return tree
+    if is_local():
+        return file_nest.workspace_dir
+    return fetch_workspace(file_nest)
+
+
+def scratch_root(file_nest) -> str:
+    return os.path.join(settings.WORKSPACE_SCRATCH_DIR, str(file_nest.workspace))
+
+
+def fetch_workspace(file_nest) -> str:
+    """Stream the upload's files from remote storage into a local folder, once; returns its absolute path."""
+    root = scratch_root(file_nest)
+    complete_marker = os.path.join(root, '.complete')
+    with _fetch_locks_lock:
+        lock = _fetch_locks.setdefault(file_nest.id, threading.Lock())
+    with lock:
+        if not os.path.exists(complete_marker):
+            os.makedirs(root, exist_ok=True)
+            for name in file_nest.files.values_list('file', flat=True):
+                relative_path = os.path.relpath(name, file_nest.workspace_root)
+                fetch_file(name, os.path.join(root, relative_path))
+            open(complete_marker, 'w').close()
+    return os.path.join(root, file_nest.dir_name)
+
+
+def release_workspace(file_nest) -> bool:
+    """
+    Delete the upload's private workspace once none of its jobs is queued or running; True if it was deleted.
+    Only this upload's folder is touched, so other uploads of the same author keep their files.
+    Every job saves its final status before calling this, so the last one to finish removes it.
+    """
+    active = GenerationJob.objects.filter(
+        file_nest=file_nest, status__in=[GenerationJob.STATUS_QUEUED, GenerationJob.STATUS_RUNNING]
+    )
+    if active.exists():
+        return False
+    # Claim the release, so the upload comes off the author's usage exactly once
+    if not FileNest.objects.filter(id=file_nest.id, workspace_released=False).update(workspace_released=True):
+        return False
+    adjust_usage(file_nest.author, upload_bytes=-upload_size(file_nest))
+    if file_nest.in_memory:
+        with _memory_uploads_lock:
+            _memory_uploads.pop(file_nest.id, None)
+        return True
+    workspace_root = local_path(file_nest.workspace_root)
+    if workspace_root is not None:
+        shutil.rmtree(workspace_root, ignore_errors=True)
+        return True
+    for name in file_nest.files.values_list('file', flat=True):
+        default_storage.delete(name)
+    shutil.rmtree(scratch_root(file_nest), ignore_errors=True)
+    with _fetch_locks_lock:
+        _fetch_locks.pop(file_nest.id, None)
+    return True
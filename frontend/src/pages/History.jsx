@@ -10,58 +10,61 @@ const History = () => {
   const [filteredHistory, setFilteredHistory] = useState([]);
   const [searchItem, setSearchItem] = useState("");
   const [filterType, setFilterType] = useState("");
+  const [nextCursor, setNextCursor] = useState(null);
 
   const user = useSelector((state) => state.user);
   const navigate = useNavigate();
 
   const filterMap = {
     Summary: "summary",
-    "Class Diagram": "class_diagram",
+    "Class Diagram": "class diagram",
     Flowchart: "flowchart",
-    "Sequence Diagram": "sequence_diagram",
+    "Sequence Diagram": "sequence diagram",
+    Bundle: "bundle",
   };
 
-  useEffect(() => {
-    if (user) {
-      const fetchHistory = async () => {
-        try {
-          const response = await axios.post(
-            "http://127.0.0.1:8000/docify/history/",
-            {
-              author: user,
-            }
-          );
-
-          if (response.data && Array.isArray(response.data.files)) {
-            const filteredFiles = response.data.files.filter(
-              (file) => !file.file_name.toLowerCase().endsWith(".png")
-            );
-            setHistory(filteredFiles);
-            setFilteredHistory(filteredFiles);
-          } else {
-            console.error("Received data is not an array:", response.data);
-            setHistory([]);
-            setFilteredHistory([]);
-          }
-        } catch (error) {
-          console.error("Error fetching history:", error);
+  // The server sends the history one page at a time, newest first
+  const fetchHistory = async (cursor) => {
+    try {
+      const response = await axios.post(
+        "http://127.0.0.1:8000/docify/history/",
+        {
+          author: user,
+          ...(filterType && { docType: filterType }),
+          ...(cursor && { cursor }),
         }
-      };
+      );
+
+      if (response.data && Array.isArray(response.data.files)) {
+        const files = response.data.files.filter(
+          (file) => !file.file_name.toLowerCase().endsWith(".png")
+        );
+        setHistory((previous) => (cursor ? [...previous, ...files] : files));
+        setNextCursor(response.data.next_cursor || null);
+      } else {
+        console.error("Received data is not an array:", response.data);
+        setHistory([]);
+        setNextCursor(null);
+      }
+    } catch (error) {
+      console.error("Error fetching history:", error);
+      if (!cursor) {
+        setHistory([]);
+        setNextCursor(null);
+      }
+    }
+  };
 
-      fetchHistory();
+  useEffect(() => {
+    if (user) {
+      fetchHistory(null);
     }
-  }, [user]);
+  }, [user, filterType]);
 
   useEffect(() => {
     const filterAndSearchFiles = () => {
       let files = history;
 
-      if (filterType) {
-        files = files.filter((file) =>
-          file.file_name.toLowerCase().includes(filterType)
-        );
-      }
-
       if (searchItem) {
         files = files.filter((file) =>
           file.file_name.toLowerCase().includes(searchItem.toLowerCase())
@@ -72,7 +75,7 @@ const History = () => {
     };
 
     filterAndSearchFiles();
-  }, [history, searchItem, filterType]);
+  }, [history, searchItem]);
 
   const handleFilterToggle = (type) => {
     const newFilterType = filterMap[type];
@@ -162,6 +165,12 @@ const History = () => {
         ) : (
           <p>No history available.</p>
         )}
+
+        {nextCursor && (
+          <button className="btn history-btn" onClick={() => fetchHistory(nextCursor)}>
+            Load more
+          </button>
+        )}
       </div>
       <Footer />
     </div>
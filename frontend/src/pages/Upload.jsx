@@ -10,6 +10,7 @@ import { ToastContainer, Zoom } from "react-toastify";
 
 const Upload = () => {
   const [files, setFiles] = useState([]);
+  const [archive, setArchive] = useState(null);
   const [language, setLanguage] = useState("");
   const [docType, setDocType] = useState("");
   const [dirName, setDirName] = useState("");
@@ -34,6 +35,16 @@ const Upload = () => {
     setFiles((prevFiles) => [...prevFiles, ...selectedFiles]);
   };
 
+  const handleArchiveChange = (e) => {
+    const selectedArchive = e.target.files[0];
+    if (selectedArchive) {
+      // Default the directory name to the archive name without its extension
+      const archiveName = selectedArchive.name.replace(/\.(zip|tar\.gz|tgz)$/i, "");
+      setDirName(archiveName);
+    }
+    setArchive(selectedArchive || null);
+  };
+
   const handleRemoveFile = (index) => {
     setFiles(files.filter((_, i) => i !== index));
   };
@@ -46,45 +57,130 @@ const Upload = () => {
     setDocType(e.target.value);
   };
 
-  const handleSubmit = async (e) => {
-    e.preventDefault();
+  // Poll the generation job until the worker reports done or failed
+  const waitForJob = async (jobId) => {
+    for (;;) {
+      const response = await fetch(
+        `http://127.0.0.1:8000/docify/jobs/${jobId}/`
+      );
+      const job = await response.json();
+      if (!response.ok || job.status === "done" || job.status === "failed") {
+        return job;
+      }
+      await new Promise((resolve) => setTimeout(resolve, 2000));
+    }
+  };
 
-    if (files.length === 0 || !language || !docType || !dirName) {
-      showAlert("Please fill all fields and upload a file");
-      return;
+  // sha256 of a file as lowercase hex, used to build the upload manifest
+  const sha256Hex = async (file) => {
+    const digest = await crypto.subtle.digest("SHA-256", await file.arrayBuffer());
+    return Array.from(new Uint8Array(digest))
+      .map((byte) => byte.toString(16).padStart(2, "0"))
+      .join("");
+  };
+
+  // Delta upload: send a manifest first, then only the files the server does not have yet
+  const uploadWithManifest = async () => {
+    const sources = files.filter((file) => /\.(py|pyw|java)$/i.test(file.name));
+    const entries = await Promise.all(
+      sources.map(async (file) => ({
+        file,
+        // Paths are relative to the selected folder
+        path: file.webkitRelativePath
+          ? file.webkitRelativePath.split("/").slice(1).join("/")
+          : file.name,
+        sha256: await sha256Hex(file),
+        size: file.size,
+      }))
+    );
+
+    const manifestResponse = await fetch(
+      "http://127.0.0.1:8000/docify/uplink/manifest/",
+      {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({
+          language,
+          docType,
+          author: user,
+          dir_name: dirName,
+          entries: entries.map(({ path, sha256, size }) => ({ path, sha256, size })),
+        }),
+      }
+    );
+    const manifest = await manifestResponse.json();
+    if (!manifestResponse.ok) {
+      return { response: manifestResponse, data: manifest };
     }
 
+    const missing = new Set(manifest.missing);
+    const formData = new FormData();
+    entries.forEach((entry) => {
+      if (missing.delete(entry.sha256)) {
+        formData.append("files", entry.file);
+      }
+    });
+    const response = await fetch(`http://127.0.0.1:8000${manifest.upload_url}`, {
+      method: "POST",
+      body: formData,
+    });
+    return { response, data: await response.json() };
+  };
+
+  // Plain upload of every file, or of the selected archive
+  const uploadFormData = async () => {
     const formData = new FormData();
     formData.append("language", language);
     formData.append("docType", docType);
     formData.append("author", user);
     formData.append("dir_name", dirName);
 
-    files.forEach((file) => {
-      formData.append("files", file);
+    if (archive) {
+      formData.append("archive", archive);
+    } else {
+      files.forEach((file) => {
+        formData.append("files", file);
+      });
+    }
+
+    const response = await fetch("http://127.0.0.1:8000/docify/uplink/", {
+      method: "POST",
+      body: formData,
     });
+    return { response, data: await response.json() };
+  };
+
+  const handleSubmit = async (e) => {
+    e.preventDefault();
+
+    if ((files.length === 0 && !archive) || !language || !docType || !dirName) {
+      showAlert("Please fill all fields and upload a file");
+      return;
+    }
 
     try {
       setLoading(true);
-      const response = await fetch("http://127.0.0.1:8000/docify/uplink/", {
-        method: "POST",
-        body: formData,
-      });
-
-      const data = await response.json();
+      // crypto.subtle is only available on secure origins such as localhost
+      const { response, data } =
+        !archive && window.crypto && window.crypto.subtle
+          ? await uploadWithManifest()
+          : await uploadFormData();
       console.log(data);
 
-      if (response.ok) {
-        if (data.message && data.file_url) {
-          showSuccess(data.message);
-          setTimeout(() => {
-            const fileUrl = `${import.meta.env.VITE_API_URL}${data.file_url}`;
-            navigate("/documentation", {
-              state: { fileUrl },
-            });
-          }, 1500); // Delay navigation by 2 seconds
+      if (response.ok && data.job_id) {
+        showSuccess(data.message);
+        // Cached results come back already done
+        const job = data.status === "done" ? data : await waitForJob(data.job_id);
+        if (job.diagnostics && job.diagnostics.length > 0) {
+          console.warn("Files skipped during analysis:", job.diagnostics);
+        }
+        if (job.status === "done" && job.file_url) {
+          const fileUrl = `${import.meta.env.VITE_API_URL}${job.file_url}`;
+          navigate("/documentation", {
+            state: { fileUrl },
+          });
         } else {
-          const errorMessage = data.error || "Unexpected error occurred";
+          const errorMessage = job.error || "Unexpected error occurred";
           showError(`Error: ${errorMessage}`);
         }
       } else {
@@ -116,7 +212,7 @@ const Upload = () => {
                   className="input-div"
                   accept=".txt, .docx, .pdf, .cpp, .java, .py"
                   webkitdirectory="true"
-                  required
+                  required={!archive}
                   style={{ display: "none" }}
                 />
                 <button
@@ -127,6 +223,24 @@ const Upload = () => {
                   {folderName}
                 </button>
               </div>
+              <div className="input-sec">
+                <label htmlFor="archiveInput">Or Upload Archive:</label>
+                <input
+                  type="file"
+                  id="archiveInput"
+                  onChange={handleArchiveChange}
+                  className="input-div"
+                  accept=".zip, .tar.gz, .tgz"
+                  style={{ display: "none" }}
+                />
+                <button
+                  type="button"
+                  onClick={() => document.getElementById("archiveInput").click()}
+                  className="btn"
+                >
+                  {archive ? archive.name : "No archive selected"}
+                </button>
+              </div>
             </div>
             {files.length > 0 && (
               <div className="file-list">
@@ -180,6 +294,7 @@ const Upload = () => {
                 <option value="class diagram">Class Diagram</option>
                 <option value="sequence diagram">Sequence Diagram</option>
                 <option value="flowchart">Flowchart</option>
+                <option value="bundle">All Documents (Bundle)</option>
               </select>
             </div>
 